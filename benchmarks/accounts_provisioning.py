@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Compares provisioning many accounts with one `uanew` per account against writing
+the `accounts` file and having baresip load it in one step.
+
+No baresip is needed. The instance is simulated by an interface that serialises
+commands, the way baresip's single-threaded main loop does, spending --command-ms
+on each command and, for `conf_reload`, --parse-us per line of the accounts file.
+
+    python benchmarks/accounts_provisioning.py --accounts 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import pybaresip.baresip as pbs
+import pybaresip.identity as pbs_id
+import pybaresip.provisioning as pbs_prov
+
+
+class SimulatedInstance:
+    def __init__(self, accounts_path: str, command: float, parse: float) -> None:
+        self.accounts_path = accounts_path
+        self.command = command
+        self.parse = parse
+        self.lock = asyncio.Lock()
+        self.aors: list[str] = []
+
+    async def call_invoke(self, action: str) -> str:
+        async with self.lock:
+            delay = self.command
+            if action == "conf_reload":
+                with open(self.accounts_path) as f:
+                    self.aors = [line.split(";", 1)[0] for line in f]
+                delay += len(self.aors) * self.parse
+            await asyncio.sleep(delay)
+        if action == "reginfo":
+            lines = [f"--- User Agents ({len(self.aors)}) ---"]
+            lines.extend(f"  {aor}  zzz" for aor in self.aors)
+            return "\n".join(lines)
+        return "OK"
+
+
+def identities(count: int):
+    for n in range(count):
+        yield pbs_id.Identity(
+            user=f"bench{n}", password="secret", gateway="sip.example.com"
+        )
+
+
+async def run(accounts: int, threshold: int, args: argparse.Namespace) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        client = pbs.PyBareSIP()
+        client._interface = SimulatedInstance(
+            os.path.join(directory, "accounts"),
+            args.command_ms / 1000.0,
+            args.parse_us / 1e6,
+        )
+        provisioner = pbs_prov.AccountsProvisioner(
+            client,
+            directory,
+            threshold=threshold,
+            rate=1e9,
+            concurrency=args.concurrency,
+        )
+        start = time.perf_counter()
+        await provisioner.provision(identities(accounts))
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--accounts", type=int, default=10000)
+    parser.add_argument("--command-ms", type=float, default=1.0)
+    parser.add_argument("--parse-us", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    incremental = asyncio.run(run(args.accounts, args.accounts + 1, args))
+    reload = asyncio.run(run(args.accounts, 0, args))
+    print(f"{'method':>12} {'seconds':>9} {'accounts/s':>11}")
+    for name, elapsed in (("incremental", incremental), ("file", reload)):
+        print(f"{name:>12} {elapsed:>9.2f} {args.accounts / elapsed:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Measures how many concurrent calls AmdDetector keeps up with on one core.
+
+Synthesizes --calls calls, alternately a human (short greeting, then a pause) and
+a machine (a long greeting), and feeds each call's audio in --chunk second pieces
+round-robin, as AmdMonitor does every poll. Reports CPU time per poll round, the
+number of calls one core could serve in real time, and detection accuracy.
+
+    python benchmarks/amd_detection.py --calls 100 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy
+
+import pybaresip.amd as pbs_amd
+
+RATE = 8000
+
+
+def synthesize(rng: numpy.random.Generator, human: bool) -> numpy.ndarray:
+    def voice(seconds: float) -> numpy.ndarray:
+        t = numpy.arange(int(RATE * seconds)) / RATE
+        pitch = rng.uniform(100, 250)
+        wave = sum(numpy.sin(2 * numpy.pi * pitch * k * t) / k for k in range(1, 5))
+        # Syllables: a 4 Hz envelope.
+        envelope = 0.6 + 0.4 * numpy.sin(2 * numpy.pi * 4 * t)
+        return rng.uniform(2000, 8000) * wave * envelope
+
+    def quiet(seconds: float) -> numpy.ndarray:
+        return rng.normal(0, 20, int(RATE * seconds))
+
+    if human:
+        parts = [quiet(rng.uniform(0.2, 0.8)), voice(rng.uniform(0.3, 1.0)), quiet(2)]
+    else:
+        parts = [quiet(rng.uniform(0.2, 0.8)), voice(rng.uniform(2.0, 4.0)), quiet(1)]
+    return numpy.concatenate(parts).astype("<i2")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--chunk", type=float, default=0.1)
+    args = parser.parse_args()
+    rng = numpy.random.default_rng(1)
+    step = int(RATE * args.chunk)
+    print(
+        f"{'calls':>6} {'rounds':>7} {'ms/round':>9} {'realtime calls':>15}"
+        f" {'accuracy':>9}"
+    )
+    for count in args.calls:
+        audio = [synthesize(rng, i % 2 == 0) for i in range(count)]
+        detectors = [pbs_amd.AmdDetector(RATE) for _ in range(count)]
+        results: list[pbs_amd.AmdResult | None] = [None] * count
+        rounds = 0
+        cpu = time.process_time()
+        for position in range(0, max(map(len, audio)), step):
+            if all(r is not None for r in results):
+                break
+            for i, detector in enumerate(detectors):
+                if results[i] is None:
+                    chunk = audio[i][position:][:step]
+                    if len(chunk):
+                        results[i] = detector.feed(chunk)
+            rounds += 1
+        elapsed = time.process_time() - cpu
+        expected = [
+            pbs_amd.Verdict.HUMAN if i % 2 == 0 else pbs_amd.Verdict.MACHINE
+            for i in range(count)
+        ]
+        correct = sum(
+            r is not None and r.verdict is e for r, e in zip(results, expected)
+        )
+        per_round = elapsed / rounds
+        print(
+            f"{count:>6} {rounds:>7} {per_round * 1000:>9.2f}"
+            f" {count * args.chunk / per_round:>15.0f} {correct / count:>9.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Measures how many CDRs per second CdrWriter sustains, and what write() costs the caller.
+
+Writes --records records as fast as write() accepts them, for each --batch-size,
+into a fresh database, then waits for the writer thread to commit them. Reported
+are the time per write() call, the end-to-end rate, the number of transactions,
+and how many records a --max-queued queue dropped.
+
+    python benchmarks/cdr_writer.py --records 100000 --batch-size 1 100 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+import pybaresip.cdr as pbs_cdr
+
+
+def record(i: int) -> pbs_cdr.Cdr:
+    return pbs_cdr.Cdr(
+        call_id=str(i),
+        aor=f"sip:{i % 50}@example.com",
+        peer=f"sip:{i}@gw{i % 4}.example.com",
+        direction="outgoing",
+        setup=1.7e9 + i,
+        answered=1.7e9 + i + 5,
+        ended=1.7e9 + i + 65,
+        duration=60.0,
+        disposition=pbs_cdr.Disposition.ANSWERED,
+        reason="Connection reset by user",
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1, 100, 500])
+    parser.add_argument("--max-queued", type=int, default=100000)
+    args = parser.parse_args()
+    records = [record(i) for i in range(args.records)]
+    print(f"{'batch':>6} {'write us':>9} {'CDRs/s':>10} {'commits':>8} {'dropped':>8}")
+    for batch_size in args.batch_size:
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = pbs_cdr.CdrWriter(
+                os.path.join(tmp, "cdr.db"), batch_size, args.max_queued
+            )
+            start = time.perf_counter()
+            for cdr in records:
+                writer.write(cdr)
+            queued = time.perf_counter() - start
+            writer.flush()
+            elapsed = time.perf_counter() - start
+            writer.close()
+            stats = writer.stats
+            print(
+                f"{batch_size:>6} {queued / len(records) * 1e6:>9.2f}"
+                f" {stats.written / elapsed:>10.0f} {stats.batches:>8}"
+                f" {stats.dropped:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Measures the client's own cost per event signal and per command.
+
+Feeds --events call events through PyBareSIP._changed_event() with the stock
+handle_event() routing, and runs --commands invoke() calls against an interface
+that answers at once, with the log at WARNING (as in production) and at DEBUG,
+and with a LoopMonitor running. Reported is the time per event and per command,
+flight recorder included.
+
+    python benchmarks/event_dispatch.py --events 100000 --commands 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import pybaresip.baresip as pbs
+import pybaresip.loopmon as pbs_loopmon
+
+
+class InstantInterface:
+    async def call_invoke(self, action: str) -> str:
+        return "OK"
+
+
+async def measure(level: int, events: int, commands: int, monitor: bool) -> None:
+    logging.getLogger("pybaresip").setLevel(level)
+    # The feed below holds the loop itself; only the monitor's idle cost is wanted.
+    loopmon = pbs_loopmon.LoopMonitor(threshold=60.0)
+    if monitor:
+        loopmon.start()
+    client = pbs.PyBareSIP()
+    client._interface = InstantInterface()  # type: ignore[attr-defined]
+    params = [
+        json.dumps(
+            {
+                "class": "call",
+                "type": "CALL_OUTGOING",
+                "id": str(i),
+                "accountaor": "sip:a@example.com",
+                "peeruri": f"sip:{i}@gw.example.com",
+            }
+        )
+        for i in range(events)
+    ]
+    start = time.perf_counter()
+    for param in params:
+        client._changed_event("call", "CALL_OUTGOING", param)
+    per_event = (time.perf_counter() - start) / events
+    start = time.perf_counter()
+    for _ in range(commands):
+        await client.invoke("uastat")
+    per_command = (time.perf_counter() - start) / commands
+    loopmon.close()
+    print(
+        f"{logging.getLevelName(level):>8} {'on' if monitor else 'off':>8}"
+        f" {per_event * 1e6:>10.2f} {per_command * 1e6:>12.2f}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--commands", type=int, default=20000)
+    args = parser.parse_args()
+    # No handlers are configured, so debug records are built and then dropped.
+    print(f"{'log':>8} {'loopmon':>8} {'event us':>10} {'command us':>12}")
+    for level, monitor in (
+        (logging.WARNING, False),
+        (logging.WARNING, True),
+        (logging.DEBUG, False),
+    ):
+        await measure(level, args.events, args.commands, monitor)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
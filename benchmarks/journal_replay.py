@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Measures what EventJournal costs per signal, and how fast replay() feeds handlers.
+
+Journals --calls synthetic calls (outgoing, ringing, established, closed) through
+a client, as the D-Bus signals would arrive, then replays the journal as fast as
+possible into a fresh client with a CallTracker, compressed and not. Reported are
+the time per journalled signal, the journal's size, and the replay rate.
+
+    python benchmarks/journal_replay.py --calls 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import pybaresip.baresip as pbs
+import pybaresip.calls as pbs_calls
+import pybaresip.journal as pbs_journal
+
+
+class QuietClient(pbs.PyBareSIP):
+    def handle_event(self, klass: str, event_type: str, event: pbs.EventParams) -> None:
+        pass
+
+
+def signals(calls: int) -> list[tuple[str, str, str]]:
+    out = []
+    for i in range(calls):
+        for evtype in (
+            "CALL_OUTGOING",
+            "CALL_RINGING",
+            "CALL_ESTABLISHED",
+            "CALL_CLOSED",
+        ):
+            event = {
+                "class": "call",
+                "type": evtype,
+                "id": f"{i:x}",
+                "accountaor": f"sip:{i % 50}@example.com",
+                "peeruri": f"sip:{i}@gw.example.com",
+                "direction": "outgoing",
+                "param": "",
+            }
+            out.append(("call", evtype, json.dumps(event)))
+    return out
+
+
+async def measure(calls: int, compress: bool) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, "journal")
+        journal = pbs_journal.EventJournal(
+            directory, max_bytes=4 * 1024 * 1024, compress=compress
+        )
+        events = signals(calls)
+        start = time.perf_counter()
+        for klass, evtype, param in events:
+            journal.event(klass, evtype, param)
+        appended = time.perf_counter() - start
+        journal.close()
+        size = sum(os.path.getsize(p) for p in pbs_journal.segments(directory))
+
+        client = QuietClient()
+        tracker = pbs_calls.CallTracker()
+        client.add_event_listener(tracker)
+        start = time.perf_counter()
+        count = await pbs_journal.replay(client, directory)
+        replayed = time.perf_counter() - start
+        print(
+            f"{calls:>8} {'gzip' if compress else 'raw':>5}"
+            f" {appended / len(events) * 1e6:>10.2f} {size / len(events):>8.0f}"
+            f" {count / replayed:>10.0f}"
+        )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+    print(f"{'calls':>8} {'':>5} {'append us':>10} {'bytes':>8} {'replay/s':>10}")
+    for calls in args.calls:
+        for compress in (False, True):
+            await measure(calls, compress)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Measures how outbound call setup rate (CPS) scales with the number of baresip
+instances behind a BaresipPool.
+
+No baresip is needed. Each instance is simulated by an interface that serialises
+commands, the way baresip's single-threaded main loop does, and spends
+--service-ms handling each dial. It emits CALL_OUTGOING/CALL_ESTABLISHED/CALL_CLOSED
+events so the pool balances on live call counts, as it would in production.
+
+    python benchmarks/pool_dial_rate.py --instances 1 2 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+import pybaresip.baresip as pbs
+import pybaresip.pool as pbs_pool
+
+
+class SimulatedInstance:
+    def __init__(self, client: pbs.PyBareSIP, service: float, hold: float) -> None:
+        self.client = client
+        self.service = service
+        self.hold = hold
+        self.lock = asyncio.Lock()
+        self.ids = itertools.count()
+
+    def emit(self, evtype: str, call_id: str) -> None:
+        event = {"class": "call", "type": evtype, "id": call_id}
+        event.update(accountaor="sip:bench@localhost", peeruri="sip:peer@localhost")
+        self.client._changed_event("call", evtype, json.dumps(event))
+
+    async def call_invoke(self, action: str) -> str:
+        async with self.lock:
+            await asyncio.sleep(self.service)
+        if action.startswith("dial "):
+            call_id = f"{self.client.bus_name}-{next(self.ids)}"
+            self.emit("CALL_OUTGOING", call_id)
+            asyncio.get_running_loop().call_later(
+                self.hold, self.emit, "CALL_CLOSED", call_id
+            )
+        return "OK"
+
+
+class QuietClient(pbs.PyBareSIP):
+    def handle_event(self, klass: str, event_type: str, event: pbs.EventParams) -> None:
+        pass
+
+
+async def run(instances: int, dials: int, concurrency: int, service: float) -> float:
+    clients = [QuietClient(bus_name=f"bench.Baresip{i}") for i in range(instances)]
+    for client in clients:
+        client._interface = SimulatedInstance(client, service, hold=0.05)
+    pool = pbs_pool.BaresipPool(clients)
+    remaining = iter(range(dials))
+
+    async def worker() -> None:
+        for n in remaining:
+            await pool.dial(f"sip:{n}@localhost")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await pool.close()
+    return dials / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--instances", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--dials", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--service-ms", type=float, default=1.0)
+    args = parser.parse_args()
+    baseline = None
+    print(f"{'instances':>9} {'CPS':>10} {'speed-up':>9}")
+    for n in args.instances:
+        cps = asyncio.run(
+            run(n, args.dials, args.concurrency, args.service_ms / 1000.0)
+        )
+        baseline = baseline or cps
+        print(f"{n:>9} {cps:>10.0f} {cps / baseline:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Measures PromptLibrary scan times: the first scan, and rescans with nothing changed.
+
+Writes --files short WAV files (half at 16 kHz stereo, which need converting, half
+already at 8 kHz mono) into a temporary directory, scans them with the default
+process pool, then scans again from a fresh library using the saved manifest.
+
+    python benchmarks/prompt_library.py --files 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import wave
+
+import pybaresip.prompts as pbs_prompts
+
+
+def write(path: str, rate: int, channels: int, seconds: float) -> None:
+    with wave.open(path, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(os.urandom(int(rate * seconds) * channels * 2))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--seconds", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source")
+        output = os.path.join(tmp, "output")
+        for i in range(args.files):
+            directory = os.path.join(source, f"{i // 1000:03}")
+            os.makedirs(directory, exist_ok=True)
+            rate, channels = (16000, 2) if i % 2 else (8000, 1)
+            write(os.path.join(directory, f"{i}.wav"), rate, channels, args.seconds)
+
+        for label in ("first scan", "rescan"):
+            library = pbs_prompts.PromptLibrary(source, output, workers=args.workers)
+            start = time.perf_counter()
+            report = await library.scan()
+            elapsed = time.perf_counter() - start
+            print(
+                f"{label:>10}: {elapsed:.2f}s for {report.total} files,"
+                f" {report.normalised} normalised, {report.unchanged} unchanged"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
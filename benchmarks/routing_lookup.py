@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Measures RoutingTable build and longest-prefix lookup times on large tables.
+
+Routes get random prefixes of 1 to --max-length digits, plus a default route, so
+every lookup walks the full range of prefix lengths before it can miss.
+
+    python benchmarks/routing_lookup.py --routes 1000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+import pybaresip.routing as pbs_routing
+
+
+def build(routes: int, max_length: int) -> pbs_routing.RoutingTable:
+    targets = [pbs_routing.Target(gateway=f"gw{i}.example") for i in range(16)]
+    rows = [("", targets[0])]
+    rows.extend(
+        (
+            "".join(random.choices("0123456789", k=random.randint(1, max_length))),
+            random.choice(targets),
+        )
+        for _ in range(routes)
+    )
+    return pbs_routing.RoutingTable(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--routes", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--max-length", type=int, default=10)
+    parser.add_argument("--lookups", type=int, default=200000)
+    args = parser.parse_args()
+    random.seed(1)
+    numbers = [
+        "".join(random.choices("0123456789", k=random.randint(8, 15)))
+        for _ in range(args.lookups)
+    ]
+    print(f"{'routes':>8} {'build ms':>9} {'lookup us':>10} {'lookups/s':>11}")
+    for count in args.routes:
+        start = time.perf_counter()
+        table = build(count, args.max_length)
+        built = time.perf_counter() - start
+        lookup = table.lookup
+        start = time.perf_counter()
+        for number in numbers:
+            lookup(number)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{count:>8} {built * 1000:>9.1f} {elapsed / len(numbers) * 1e6:>10.2f}"
+            f" {len(numbers) / elapsed:>11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
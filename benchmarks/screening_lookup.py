@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Measures screening list build time, file size and lookup time.
+
+Builds a number file from --numbers random E.164 numbers, then times lookups of
+numbers on the list (which go through the Bloom filter and the binary search) and
+of numbers that are not (which the Bloom filter rejects almost always).
+
+    python benchmarks/screening_lookup.py --numbers 5000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import pybaresip.screening as pbs_screening
+
+
+def timed_lookups(numbers: pbs_screening.NumberSet, queries: list[int]) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        query in numbers
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--numbers", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--false-positive-rate", type=float, default=0.001)
+    args = parser.parse_args()
+    random.seed(1)
+    listed = [random.randrange(10**10, 10**12) for _ in range(args.numbers)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "numbers")
+        start = time.perf_counter()
+        count = pbs_screening.build_number_file(
+            path, listed, false_positive_rate=args.false_positive_rate
+        )
+        built = time.perf_counter() - start
+        numbers = pbs_screening.NumberSet(path)
+        hits = random.sample(listed, min(args.lookups, len(listed)))
+        misses = [random.randrange(10**12, 10**13) for _ in range(args.lookups)]
+        print(f"numbers      {count}")
+        print(f"file size    {os.path.getsize(path) / 2**20:.1f} MiB")
+        print(f"build        {built:.1f} s")
+        print(f"hit lookup   {timed_lookups(numbers, hits):.2f} us")
+        print(f"miss lookup  {timed_lookups(numbers, misses):.2f} us")
+        numbers.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Compares per-object loop.call_later() handles with TimerScheduler and TimerWheel.
+
+Each run schedules --timers timeouts spread over --spread seconds, as a ring timeout
+or watchdog per call or account would be, cancels --cancel of them (most calls end
+before they time out), then lets the loop run for --run seconds. Reported are the
+time to schedule and cancel, the memory held while the timers are pending, and
+the loop's CPU time while idling on them.
+
+    python benchmarks/timer_wheel.py --timers 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, List
+
+import pybaresip.timers as pbs_timers
+
+
+def noop() -> None:
+    pass
+
+
+async def measure(
+    name: str,
+    call_later: Callable[..., Any],
+    delays: List[float],
+    cancel: float,
+    run: float,
+) -> None:
+    tracemalloc.start()
+    handles = [call_later(delay, noop) for delay in delays]
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    for handle in handles:
+        handle.cancel()
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    handles = [call_later(delay, noop) for delay in delays]
+    scheduled = time.perf_counter() - start
+    start = time.perf_counter()
+    for handle in handles[: int(len(handles) * cancel)]:
+        handle.cancel()
+    cancelled = time.perf_counter() - start
+    cpu = time.process_time()
+    await asyncio.sleep(run)
+    idle = time.process_time() - cpu
+    for handle in handles:
+        handle.cancel()
+    print(
+        f"{name:>10} {len(delays):>8} {scheduled / len(delays) * 1e6:>12.2f}"
+        f" {cancelled / len(delays) * 1e6:>10.2f} {memory / len(delays):>10.0f}"
+        f" {idle * 1000:>8.1f}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--timers", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--spread", type=float, default=3600.0)
+    parser.add_argument("--cancel", type=float, default=0.9)
+    parser.add_argument("--run", type=float, default=2.0)
+    args = parser.parse_args()
+    random.seed(1)
+    loop = asyncio.get_running_loop()
+    print(
+        f"{'':>10} {'timers':>8} {'schedule us':>12} {'cancel us':>10}"
+        f" {'bytes':>10} {'idle ms':>8}"
+    )
+    for count in args.timers:
+        delays = [random.uniform(1.0, args.spread) for _ in range(count)]
+        scheduler = pbs_timers.TimerScheduler()
+        wheel = pbs_timers.TimerWheel()
+        for name, call_later in (
+            ("call_later", loop.call_later),
+            ("heap", scheduler.call_later),
+            ("wheel", wheel.call_later),
+        ):
+            await measure(name, call_later, delays, args.cancel, args.run)
+        scheduler.close()
+        wheel.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses as dc
+import enum
+import logging
+import time
+from typing import IO, TYPE_CHECKING, Callable, Dict
+
+import pybaresip.prompts as pbs_prompts
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    import pybaresip.baresip as pbs
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class Verdict(enum.Enum):
+    HUMAN = "human"
+    MACHINE = "machine"
+    UNKNOWN = "unknown"
+
+
+@dc.dataclass(frozen=True)
+class AmdResult:
+    """
+    after: Seconds of call audio heard before the verdict.
+    """
+
+    verdict: Verdict
+    reason: str
+    after: float
+
+
+@dc.dataclass(frozen=True)
+class AmdParams:
+    """
+    Thresholds for answering-machine detection, in seconds unless noted.
+
+    A human typically answers with a short greeting ("Hello?") and then waits; a
+    machine plays a long greeting, or several sentences, without a pause.
+
+    window: The analysis window. Each window is voiced or not.
+    threshold: The energy, in dBFS, above which a window may be voiced.
+    max_zcr: The zero-crossing rate (crossings per sample) above which a window
+    is taken as noise rather than voice.
+    initial_silence: Silence before anyone speaks longer than this is a MACHINE.
+    greeting: A greeting longer than this is a MACHINE.
+    after_greeting_silence: Silence this long after speech is a HUMAN waiting.
+    min_word: The shortest voiced run counted as a word.
+    max_words: This many words without a pause is a MACHINE.
+    total: Give up, with UNKNOWN, after this much audio.
+    """
+
+    window: float = 0.02
+    threshold: float = -40.0
+    max_zcr: float = 0.5
+    initial_silence: float = 2.5
+    greeting: float = 1.5
+    after_greeting_silence: float = 0.8
+    min_word: float = 0.1
+    max_words: int = 4
+    total: float = 5.0
+
+
+class AmdDetector:
+    """
+    Classifies one call from its audio, fed as it arrives.
+
+    Samples are cut into windows and each chunk is analysed in a few vectorised
+    numpy operations: mean energy and zero-crossing rate per window give a voiced
+    flag per window, and the flags are run-length encoded so the decision rules
+    only look at each run of speech or silence, not at each window.
+    """
+
+    def __init__(self, sample_rate: int, params: AmdParams | None = None) -> None:
+        self.params = params or AmdParams()
+        self.sample_rate = sample_rate
+        self.result: AmdResult | None = None
+        self._np = pbs_prompts.require_numpy("Answering-machine detection")
+        self._size = max(1, round(sample_rate * self.params.window))
+        self._pending = self._np.zeros(0, dtype=self._np.float32)
+        self._windows = 0
+        # The run in progress: voiced or not, and its length in windows.
+        self._voiced = False
+        self._run = 0
+        self._counted = False
+        self._spoken = False
+        self._greeting_start = 0
+        self._words = 0
+
+    def feed(self, samples: np.ndarray) -> AmdResult | None:
+        """
+        Analyses more 16-bit samples (or floats on the same scale) and returns the
+        verdict once there is one.
+        """
+        if self.result is not None:
+            return self.result
+        numpy = self._np
+        if len(self._pending):
+            samples = numpy.concatenate((self._pending, samples))
+        count = len(samples) // self._size
+        if not count:
+            self._pending = numpy.asarray(samples, dtype=numpy.float32)
+            return None
+        used = count * self._size
+        frames = numpy.asarray(samples[:used], dtype=numpy.float32).reshape(
+            count, self._size
+        )
+        self._pending = numpy.asarray(samples[used:], dtype=numpy.float32)
+
+        energy = numpy.einsum("ij,ij->i", frames, frames) / self._size
+        level = 10 * numpy.log10(energy / 32768.0**2 + 1e-12)
+        signs = numpy.signbit(frames)
+        zcr = numpy.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / self._size
+        voiced = (level > self.params.threshold) & (zcr < self.params.max_zcr)
+
+        # Run-length encode the voiced flags.
+        edges = numpy.flatnonzero(voiced[1:] != voiced[:-1]) + 1
+        starts = numpy.concatenate(([0], edges))
+        lengths = numpy.diff(numpy.concatenate((starts, [count])))
+        for start, length in zip(starts.tolist(), lengths.tolist()):
+            self.result = self._run_of(bool(voiced[start]), length)
+            if self.result is not None:
+                return self.result
+        return None
+
+    def finish(self, reason: str = "no verdict") -> AmdResult:
+        """
+        Ends detection, with UNKNOWN if there was no verdict yet.
+        """
+        if self.result is None:
+            self.result = AmdResult(
+                Verdict.UNKNOWN, reason, self._seconds(self._windows)
+            )
+        return self.result
+
+    def _seconds(self, windows: int) -> float:
+        return windows * self._size / self.sample_rate
+
+    def _run_of(self, voiced: bool, length: int) -> AmdResult | None:
+        p = self.params
+        if voiced == self._voiced:
+            self._run += length
+        else:
+            self._voiced = voiced
+            self._run = length
+            self._counted = False
+        self._windows += length
+        elapsed = self._seconds(self._windows)
+        run = self._seconds(self._run)
+
+        if voiced:
+            if not self._spoken:
+                self._spoken = True
+                self._greeting_start = self._windows - self._run
+            if not self._counted and run >= p.min_word:
+                self._counted = True
+                self._words += 1
+                if self._words >= p.max_words:
+                    return AmdResult(Verdict.MACHINE, "too many words", elapsed)
+            greeting = self._seconds(self._windows - self._greeting_start)
+            if greeting > p.greeting:
+                return AmdResult(Verdict.MACHINE, "long greeting", elapsed)
+        elif not self._spoken:
+            if run > p.initial_silence:
+                return AmdResult(Verdict.MACHINE, "long initial silence", elapsed)
+        elif run >= p.after_greeting_silence:
+            return AmdResult(Verdict.HUMAN, "silence after greeting", elapsed)
+        if elapsed >= p.total:
+            return AmdResult(Verdict.UNKNOWN, "no decision in time", elapsed)
+        return None
+
+
+class _Stream:
+    __slots__ = (
+        "call_id",
+        "path",
+        "started",
+        "file",
+        "detector",
+        "channels",
+        "leftover",
+        "future",
+    )
+
+    def __init__(self, call_id: str, path: str, future: asyncio.Future) -> None:
+        self.call_id = call_id
+        self.path = path
+        self.started = time.monotonic()
+        self.file: IO[bytes] | None = None
+        self.detector: AmdDetector | None = None
+        self.channels = 1
+        self.leftover = b""
+        self.future = future
+
+
+class AmdMonitor:
+    """
+    Detects answering machines on many calls at once, from the WAV files baresip's
+    sndfile module writes as a call goes on.
+
+    `watch()` starts detection on a file and returns a future of the AmdResult;
+    `verdict()` waits for it by call id, until the call closes. Registered with
+    `PyBareSIP.add_event_listener()` and given `path_for`, which maps a
+    CALL_ESTABLISHED event to the file holding the remote party's audio, the
+    monitor starts watching each answered call by itself; a call that closes before
+    a verdict gets UNKNOWN.
+
+    One task serves every call: every `poll_interval` it reads what each file has
+    grown by since the last poll and feeds it to the call's AmdDetector. Files
+    are expected to be 16-bit PCM WAV; stereo is mixed down.
+
+    on_verdict: Called with the call id and result as each verdict is reached.
+    """
+
+    def __init__(
+        self,
+        params: AmdParams | None = None,
+        poll_interval: float = 0.1,
+        path_for: Callable[[pbs.EventParams], str | None] | None = None,
+        on_verdict: Callable[[str, AmdResult], None] | None = None,
+    ) -> None:
+        self.params = params or AmdParams()
+        self.poll_interval = poll_interval
+        self._path_for = path_for
+        self._on_verdict = on_verdict
+        self._streams: Dict[str, _Stream] = {}
+        # Kept after the verdict, until the call closes, for verdict().
+        self._futures: Dict[str, asyncio.Future[AmdResult]] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def watch(self, call_id: str, path: str) -> asyncio.Future[AmdResult]:
+        future = self._futures.get(call_id)
+        if future is not None:
+            return future
+        future = asyncio.get_running_loop().create_future()
+        self._futures[call_id] = future
+        self._streams[call_id] = _Stream(call_id, path, future)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        return future
+
+    async def verdict(self, call_id: str) -> AmdResult:
+        future = self._futures.get(call_id)
+        if future is None:
+            raise KeyError(f"Call {call_id} is not being watched")
+        return await asyncio.shield(future)
+
+    def __call__(self, client: pbs.PyBareSIP, event: pbs.EventParams) -> None:
+        if event.get("class") != "call":
+            return
+        evtype = event.get("type")
+        call_id = event.get("id", "")
+        if evtype == "CALL_ESTABLISHED" and self._path_for is not None:
+            path = self._path_for(event)
+            if path:
+                self.watch(call_id, path)
+        elif evtype == "CALL_CLOSED":
+            stream = self._streams.get(call_id)
+            if stream is not None:
+                self._decide(stream, None, "call closed")
+            self._futures.pop(call_id, None)
+
+    async def close(self) -> None:
+        for stream in list(self._streams.values()):
+            self._decide(stream, None, "monitor closed")
+        self._futures.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        try:
+            while self._streams:
+                for stream in list(self._streams.values()):
+                    try:
+                        self._poll(stream)
+                    except Exception as e:
+                        logger.warning(f"AMD on {stream.call_id} failed: {e}")
+                        self._decide(stream, None, f"error: {e}")
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            self._task = None
+
+    def _poll(self, stream: _Stream) -> None:
+        if stream.detector is None:
+            # Until the header parses there is no audio to time out on, so the
+            # wait for it is bounded by the whole detection window.
+            if time.monotonic() - stream.started > self.params.total:
+                self._decide(stream, None, "no audio")
+                return
+        if stream.file is None:
+            try:
+                stream.file = open(stream.path, "rb", buffering=0)
+            except FileNotFoundError:
+                return
+        data = stream.leftover + (stream.file.read() or b"")
+        if stream.detector is None:
+            try:
+                tag, channels, rate, bits, offset, _ = pbs_prompts.wav_layout(data)
+            except pbs_prompts.PromptError:
+                # The header is not written yet.
+                stream.leftover = data
+                return
+            if bits != 16:
+                raise pbs_prompts.PromptError(f"{stream.path} is not 16-bit audio")
+            stream.detector = AmdDetector(rate, self.params)
+            stream.channels = channels
+            data = data[offset:]
+        detector = stream.detector
+        channels = stream.channels
+        usable = len(data) - len(data) % (2 * channels)
+        stream.leftover = data[usable:]
+        if not usable:
+            return
+        numpy = detector._np
+        samples = numpy.frombuffer(data, dtype="<i2", count=usable // 2)
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        result = detector.feed(samples)
+        if result is not None:
+            self._decide(stream, result, "")
+
+    def _decide(self, stream: _Stream, result: AmdResult | None, reason: str) -> None:
+        del self._streams[stream.call_id]
+        if stream.file is not None:
+            stream.file.close()
+        if result is None:
+            if stream.detector is not None:
+                result = stream.detector.finish(reason)
+            else:
+                result = AmdResult(Verdict.UNKNOWN, reason, 0.0)
+        if not stream.future.done():
+            stream.future.set_result(result)
+        logger.debug("AMD verdict for %s: %s", stream.call_id, result)
+        if self._on_verdict is not None:
+            try:
+                self._on_verdict(stream.call_id, result)
+            except Exception:
+                logger.exception(f"AMD verdict callback failed for {stream.call_id}")
@@ -1,21 +1,62 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import asyncio
+import contextvars
 import dataclasses as dc
 import functools
 import json
 import logging
 import re
-from typing import Callable, Dict
+from typing import Awaitable, Callable, Dict, Iterable, List
 
 import dbus_next.aio as aio_dn
 import dbus_next.errors as dn_err
 
 import pybaresip.exceptions as pbs_ex
+import pybaresip.flight as pbs_flight
+import pybaresip.identity as pbs_id
+import pybaresip.journal as pbs_journal
+import pybaresip.loopmon as pbs_loopmon
+import pybaresip.provisioning as pbs_prov
+import pybaresip.ratelimit as pbs_rl
+import pybaresip.reconnect as pbs_rc
+import pybaresip.scheduler as pbs_sched
+import pybaresip.session as pbs_session
+import pybaresip.tts as pbs_tts
 
 logger: logging.Logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 EventParams = Dict[str, str]
+EventListener = Callable[["PyBareSIP", EventParams], None]
+
+# Seconds a command may take, including time spent queued in a scheduler, before
+# BaresipTimeoutError is raised. Commands not listed use DEFAULT_TIMEOUT.
+DEFAULT_TIMEOUT: float = 10.0
+COMMAND_TIMEOUTS: dict[str, float] = {
+    "accept": 2.0,
+    "callfind": 2.0,
+    "hangup": 2.0,
+    "dial": 5.0,
+    "config": 30.0,
+    "help": 30.0,
+}
+
+
+def deadline_after(seconds: float) -> float:
+    """
+    Returns a deadline `seconds` from now, suitable for the `deadline=` parameter.
+
+    Deadlines are absolute times on the running event loop's clock, so one deadline
+    can be handed down through several commands.
+    """
+    return asyncio.get_running_loop().time() + seconds
+
+
+# Set while a client is re-establishing its connection, so that version detection
+# and state replay are not held behind the outage gate they are trying to open.
+_reconnecting: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "_reconnecting", default=False
+)
 
 
 @dc.dataclass
@@ -50,16 +91,61 @@ def requires_version(fn: Callable) -> Callable:
 
 class PyBareSIP:
     def __init__(
-        self, bus_name: str = "com.github.Baresip", path: str = "/baresip"
+        self,
+        bus_name: str = "com.github.Baresip",
+        path: str = "/baresip",
+        scheduler: pbs_sched.CommandScheduler | None = None,
+        timeouts: dict[str, float] | None = None,
+        reconnect: pbs_rc.ReconnectPolicy | None = None,
+        tts: pbs_tts.TextToSpeech | None = None,
+        journal: pbs_journal.EventJournal | None = None,
+        recorder: pbs_session.SessionRecorder | None = None,
+        flight: pbs_flight.FlightRecorder | None = None,
     ) -> None:
+        """
+        scheduler: Optional CommandScheduler that orders commands by priority class.
+        Without one, every command is sent to baresip as soon as it is invoked.
+
+        timeouts: Per-command timeouts in seconds, merged over COMMAND_TIMEOUTS.
+
+        reconnect: Enables resilient mode. The client watches the bus for baresip
+        going away and coming back, reconnects with backoff, and optionally replays
+        the state it created.
+
+        tts: Renders the prompts given to `play(text=...)`.
+
+        journal: Records every event and message signal as it arrives, for replay.
+
+        recorder: Records every command, its response and its latencies, for
+        replaying against a stand-in with `pybaresip.session.replay()`.
+
+        flight: Keeps the last commands, responses and events in memory, and dumps
+        them to the log when a command or listener fails or baresip leaves the bus.
+        By default, a FlightRecorder of 1024 entries.
+        """
+        self.bus_name = bus_name
+        self.path = path
         self._baresip_version = BaresipVersion(0, 0, 0)
+        self._scheduler = scheduler
+        self._timeouts = {**COMMAND_TIMEOUTS, **(timeouts or {})}
+        self._reconnect = reconnect
+        self.tts = tts
+        self.journal = journal
+        self.recorder = recorder
+        self.flight = pbs_flight.FlightRecorder() if flight is None else flight
+        self._state = pbs_rc.ClientState()
+        self._available: asyncio.Event | None = None
+        self._queued = 0
+        self._reconnect_task: asyncio.Future | None = None
+        self._event_listeners: List[EventListener] = []
+        self._ua_lock: asyncio.Lock | None = None
 
     @property
     def ver(self) -> BaresipVersion:
         return self._baresip_version
 
     def handle_event_application_create(self, event: EventParams) -> None:
-        logger.debug(event)
+        logger.debug("%s", event)
 
     def handle_event_application_exit(self, event: EventParams) -> None:
         """
@@ -73,23 +159,23 @@ class PyBareSIP:
 
         This shows up when a User-Agent is shut down.
         """
-        logger.debug(f"handle_event_application_shutdown for {event['accountaor']}")
+        logger.debug("handle_event_application_shutdown for %s", event["accountaor"])
 
     def handle_event_call_call_outgoing(self, event: EventParams) -> None:
-        logger.debug(f"Outbound call to {event['peeruri']}")
+        logger.debug("Outbound call to %s", event["peeruri"])
 
     def handle_event_create(self, event: EventParams) -> None:
-        logger.debug(f"handle_event_create {event}")
+        logger.debug("handle_event_create %s", event)
 
     def handle_event_other_call_local_sdp(self, event: EventParams) -> None:
-        logger.debug(f"handle_event_other_call_local_sdp {event['type']}")
+        logger.debug("handle_event_other_call_local_sdp %s", event["type"])
 
     def handle_event_other_module(self, event: EventParams) -> None:
         """
         Called on things like baresip starting up when this library is already listening
         on the bus.
         """
-        logger.debug(f"handle_event_other_module {event['param']}")
+        logger.debug("handle_event_other_module %s", event["param"])
 
     def handle_event_register_registering(self, event: EventParams) -> None:
         """
@@ -97,7 +183,7 @@ class PyBareSIP:
 
         This shows up when a User-Agent is shut down.
         """
-        logger.debug(f"handle_event_register_registering {event['accountaor']}")
+        logger.debug("handle_event_register_registering %s", event["accountaor"])
 
     def handle_event_register_unregistering(self, event: EventParams) -> None:
         """
@@ -105,7 +191,7 @@ class PyBareSIP:
 
         This shows up when a User-Agent is unregistered.
         """
-        logger.debug(f"handle_event_register_unregistering for {event['accountaor']}")
+        logger.debug("handle_event_register_unregistering for %s", event["accountaor"])
 
     def handle_event_register_register_fail(self, event: EventParams) -> None:
         """
@@ -114,8 +200,9 @@ class PyBareSIP:
         This shows up when a User-Agent registration attempt fails.
         """
         logger.debug(
-            f"handle_event_register_register_fail {event['accountaor']}: "
-            f"{event['param']}"
+            "handle_event_register_register_fail %s: %s",
+            event["accountaor"],
+            event["param"],
         )
 
     def handle_event(self, klass: str, event_type: str, event: EventParams) -> None:
@@ -125,34 +212,162 @@ class PyBareSIP:
         klass = event["class"].lower()
         evtype = event["type"].lower()
         func = f"handle_event_{klass}_{evtype}"
-        print(f"Calling self.{func}(event={event})")
-        try:
-            getattr(self, func)(event=event)
-        except KeyError:
-            logger.error(f"Could not find function '{func}' to handle request.")
+        handler = getattr(self, func, None)
+        if handler is None:
+            logger.debug("Could not find function '%s' to handle request.", func)
+            return
+        pbs_loopmon.marker.current = handler
+        handler(event=event)
+
+    def add_event_listener(self, listener: EventListener) -> None:
+        """
+        Registers a callable that is given every event after the handle_event_* method
+        has run, for components that observe events rather than subclassing.
+        """
+        self._event_listeners.append(listener)
+
+    def remove_event_listener(self, listener: EventListener) -> None:
+        self._event_listeners.remove(listener)
 
     def _changed_event(self, klass: str, evtype: str, param: str) -> None:
         """
         Callback for the dbus_next on_<signal> handlers, where signal is 'event'
         """
-        self.handle_event(klass=klass, event_type=evtype, event=json.loads(param))
+        self.flight.record("event", klass, evtype, param)
+        if self.journal is not None:
+            # A journal that cannot write, e.g. on a full disk, must not cost the
+            # listeners their events.
+            try:
+                self.journal.event(klass, evtype, param)
+            except Exception:
+                logger.exception("Journaling a %s event failed", evtype)
+        event = json.loads(param)
+        # Tells a LoopMonitor which handler or listener holds the loop.
+        marker = pbs_loopmon.marker
+        try:
+            marker.current = self.handle_event
+            self.handle_event(klass=klass, event_type=evtype, event=event)
+            for listener in self._event_listeners:
+                marker.current = listener
+                try:
+                    listener(self, event)
+                except Exception:
+                    logger.exception("Event listener %r failed", listener)
+                    self.flight.trigger(f"event listener {listener!r} failed")
+        finally:
+            marker.current = None
 
     def _changed_message(self, ua: str, peer: str, ctype: str, body: str) -> None:
         """
         Callback for the dbus_next on_<signal> handlers, where signal is 'message'
         """
+        self.flight.record("message", ua, peer, ctype, body)
+        if self.journal is not None:
+            try:
+                self.journal.message(ua, peer, ctype, body)
+            except Exception:
+                logger.exception("Journaling a message failed")
         logger.error(
             f"Cannot handle messages. ua={ua} peer={peer} ctype={ctype} body={body}"
         )
 
-    async def invoke(self, action: str) -> str:
+    async def invoke(self, action: str, deadline: float | None = None) -> str:
         """
         Directly invoke a method over DBus.
 
         Class methods like `dial()` wrap this method.
+
+        If a scheduler was provided, the command waits for a slot in its priority
+        class before it is sent.
+
+        The command is abandoned with BaresipTimeoutError when its per-command timeout
+        expires, or at `deadline` (see `deadline_after()`) if that comes first. A
+        command whose deadline has already passed is not sent at all.
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Invoking %s", pbs_id.redact(action))
+        self.flight.record("invoke", action)
+        try:
+            if self.recorder is not None:
+                response = await self.recorder.record(
+                    action, self._invoke_until(action, deadline)
+                )
+            else:
+                response = await self._invoke_until(action, deadline)
+        except Exception as e:
+            self.flight.record("error", action, e)
+            self.flight.trigger(pbs_id.redact(f"'{action}' failed: {e}"))
+            raise
+        self.flight.record("response", action, response)
+        if pbs_loopmon.marker.active:
+            pbs_loopmon.marker.resumed(f"after invoke {action.split(' ', 1)[0]}")
+        return response
+
+    async def _invoke_until(self, action: str, deadline: float | None) -> str:
+        timeout = self._timeouts.get(action.split(" ", 1)[0], DEFAULT_TIMEOUT)
+        if deadline is not None:
+            timeout = min(timeout, deadline - asyncio.get_running_loop().time())
+            if timeout <= 0:
+                raise pbs_ex.BaresipTimeoutError(action, 0.0)
+        try:
+            response = await asyncio.wait_for(self._invoke(action), timeout)
+        except asyncio.TimeoutError as e:
+            raise pbs_ex.BaresipTimeoutError(action, timeout) from e
+        self._state.record(action)
+        return response
+
+    async def _invoke(self, action: str) -> str:
+        available = self._available
+        if available is not None and not available.is_set() and not _reconnecting.get():
+            await self._wait_until_available(action, available)
+        return await self._send(action)
+
+    async def _wait_until_available(
+        self, action: str, available: asyncio.Event
+    ) -> None:
+        """
+        Holds a command until baresip is back on the bus. Realtime commands, and any
+        command arriving when the queue is full, fail straight away.
+        """
+        assert self._reconnect is not None
+        if pbs_sched.command_priority(action) is pbs_sched.Priority.REALTIME:
+            raise pbs_ex.BaresipUnavailableError(
+                f"baresip is not on the bus; not queueing '{action}'"
+            )
+        if self._queued >= self._reconnect.max_queued:
+            raise pbs_ex.BaresipUnavailableError(
+                f"baresip is not on the bus and {self._queued} commands are queued"
+            )
+        self._queued += 1
+        try:
+            await available.wait()
+        finally:
+            self._queued -= 1
+
+    async def _send(self, action: str) -> str:
+        if self._scheduler is None:
+            return await self._call(action)
+        async with self._scheduler.slot(action):
+            return await self._call(action)
+
+    def _call(self, action: str) -> Awaitable[str]:
+        sent = self._interface.call_invoke(action)  # type: ignore[attr-defined]
+        if self.recorder is not None:
+            return self.recorder.record_bus(sent)
+        return sent
+
+    @property
+    def scheduler(self) -> pbs_sched.CommandScheduler | None:
+        return self._scheduler
+
+    def _ua_locked(self) -> asyncio.Lock:
+        """
+        The lock held around command pairs that rely on baresip's current
+        User-Agent or call, created lazily so it binds to the running loop.
         """
-        logger.debug(f"Invoking {action}")
-        return await self._interface.call_invoke(action)  # type: ignore[attr-defined]
+        if self._ua_lock is None:
+            self._ua_lock = asyncio.Lock()
+        return self._ua_lock
 
     async def wait_for_disconnect(self) -> None:
         """
@@ -162,6 +377,24 @@ class PyBareSIP:
 
     async def connect(self) -> None:
         bus = await aio_dn.MessageBus().connect()
+        self._bus = bus
+        try:
+            await self._attach()
+            if self._reconnect is not None:
+                self._available = asyncio.Event()
+                self._available.set()
+                await self._watch_name_owner()
+            await self.version()
+        except BaseException:
+            # Also when cancelled, so that retrying connect() leaks no connections.
+            bus.disconnect()
+            raise
+
+    async def _attach(self) -> None:
+        """
+        Introspects the baresip endpoint and subscribes to its signals.
+        """
+        bus = self._bus
         try:
             api = await bus.introspect(self.bus_name, self.path)
         except dn_err.DBusError as e:
@@ -179,112 +412,231 @@ class PyBareSIP:
         interface = proxy_object.get_interface(self.bus_name)
         # These are dynamically defined methods that come from the introspection. mypy has to
         # be told to ignore them.
+        old = getattr(self, "_interface", None)
+        if old is not None:
+            old.off_event(self._changed_event)  # type: ignore[attr-defined]
+            old.off_message(self._changed_message)  # type: ignore[attr-defined]
         interface.on_event(self._changed_event)  # type: ignore[attr-defined]
         interface.on_message(self._changed_message)  # type: ignore[attr-defined]
         self._interface = interface
-        self._bus = bus
-        await self.version()
 
-    async def about(self) -> str:
+    async def _watch_name_owner(self) -> None:
+        """
+        Subscribes to NameOwnerChanged from the bus daemon, which is how baresip
+        leaving and re-joining the bus is noticed.
+        """
+        path = "/org/freedesktop/DBus"
+        name = "org.freedesktop.DBus"
+        api = await self._bus.introspect(name, path)
+        dbus = self._bus.get_proxy_object(name, path, api).get_interface(name)
+        dbus.on_name_owner_changed(self._name_owner_changed)  # type: ignore[attr-defined]
+
+    def _name_owner_changed(self, name: str, old_owner: str, new_owner: str) -> None:
+        if name != self.bus_name or self._available is None:
+            return
+        if old_owner:
+            logger.warning(f"{self.bus_name} left the bus")
+            self.flight.dump(f"{self.bus_name} left the bus")
+            self._available.clear()
+            self.handle_disconnected()
+        if new_owner and self._reconnect_task is None:
+            self._reconnect_task = asyncio.ensure_future(self._reestablish())
+
+    async def _reestablish(self) -> None:
+        """
+        Reattaches to a restarted baresip, re-detects its version and replays client
+        state, retrying with jittered exponential backoff.
+        """
+        assert self._reconnect is not None and self._available is not None
+        _reconnecting.set(True)
+        try:
+            for delay in self._reconnect.delays():
+                try:
+                    await self._attach()
+                    await self.version()
+                    break
+                except Exception as e:
+                    logger.warning(
+                        f"Reconnecting to {self.bus_name} failed ({e}); "
+                        f"retrying in {delay:.2f}s"
+                    )
+                    await asyncio.sleep(delay)
+            if self._reconnect.replay_state:
+                # One command failing, e.g. a module baresip loaded from its own
+                # config, must not hold back the rest or the queued commands.
+                for action in self._state.replay_commands():
+                    try:
+                        await self.invoke(action)
+                    except Exception as e:
+                        logger.warning(
+                            pbs_id.redact(f"Replaying '{action}' failed: {e}")
+                        )
+        finally:
+            self._reconnect_task = None
+            self._available.set()
+        logger.info(f"Reconnected to {self.bus_name}, baresip {self.ver}")
+        self.handle_reconnected()
+
+    def handle_disconnected(self) -> None:
+        """
+        Called in resilient mode when baresip leaves the bus.
+        """
+
+    def handle_reconnected(self) -> None:
+        """
+        Called in resilient mode once baresip is back and client state is replayed.
+        """
+
+    async def about(self, deadline: float | None = None) -> str:
         """
         Fetches the 'about' details from the baresip program.
 
         Does not trigger any DBus messages.
         """
-        return await self.invoke("about")
+        return await self.invoke("about", deadline=deadline)
 
-    async def accept(self) -> str:
+    async def accept(
+        self, call_id: str | None = None, deadline: float | None = None
+    ) -> str:
         """
         Instructs baresip to accept an inbound call.
 
+        Without a call_id, baresip accepts its current call. With one, that call is
+        made current with `callfind()` first, serialised like `dial_as()` so that
+        nothing can change the current call in between.
+
         Does not emit anything on DBus.
         """
-        return await self.invoke("accept")
+        if call_id is None:
+            return await self.invoke("accept", deadline=deadline)
+        async with self._ua_locked():
+            found = await self.callfind(call_id, deadline=deadline)
+            if "not found" in found:
+                raise Exception(f"Call {call_id} does not exist: {found}")
+            return await self.invoke("accept", deadline=deadline)
 
-    async def apistate(self) -> str:
+    async def apistate(self, deadline: float | None = None) -> str:
         """
         Fetches the status of User-Agents.
         """
-        return await self.invoke("apistate")
+        return await self.invoke("apistate", deadline=deadline)
 
-    async def auloop(self) -> str:
-        return await self.invoke("auloop")
+    async def auloop(self, deadline: float | None = None) -> str:
+        return await self.invoke("auloop", deadline=deadline)
 
-    async def auloop_stop(self) -> str:
-        return await self.invoke("auloop_stop")
+    async def auloop_stop(self, deadline: float | None = None) -> str:
+        return await self.invoke("auloop_stop", deadline=deadline)
 
-    async def auplay(self) -> str:
+    async def auplay(self, deadline: float | None = None) -> str:
         """
         Instructs baresip to change the audio player.
         """
-        return await self.invoke("auplay")
+        return await self.invoke("auplay", deadline=deadline)
 
-    async def ausrc(self) -> str:
+    async def ausrc(self, deadline: float | None = None) -> str:
         """
         Instructs baresip to change the audio source.
         """
-        return await self.invoke("ausrc")
+        return await self.invoke("ausrc", deadline=deadline)
+
+    async def callfind(self, call_id: str, deadline: float | None = None) -> str:
+        """
+        Instructs baresip to make the call with this id its current call.
 
-    async def callstat(self) -> str:
-        return await self.invoke("callstat")
+        Does not emit anything on DBus.
+        """
+        return await self.invoke(f"callfind {call_id}", deadline=deadline)
+
+    async def callstat(self, deadline: float | None = None) -> str:
+        return await self.invoke("callstat", deadline=deadline)
 
-    async def conf_reload(self) -> str:
+    async def conf_reload(self, deadline: float | None = None) -> str:
         """
         Instructs baresip to reload its configuration.
         """
-        return await self.invoke("conf_reload")
+        return await self.invoke("conf_reload", deadline=deadline)
 
-    async def config(self) -> str:
+    async def config(self, deadline: float | None = None) -> str:
         """
         Fetches the current configuration file from baresip.
 
         Does not emit anything on DBus
         """
-        return await self.invoke("config")
+        return await self.invoke("config", deadline=deadline)
 
-    async def contact_next(self) -> str:
-        return await self.invoke("contact_next")
+    async def contact_next(self, deadline: float | None = None) -> str:
+        return await self.invoke("contact_next", deadline=deadline)
 
-    async def contact_prev(self) -> str:
-        return await self.invoke("contact_prev")
+    async def contact_prev(self, deadline: float | None = None) -> str:
+        return await self.invoke("contact_prev", deadline=deadline)
 
-    async def contacts(self) -> str:
+    async def contacts(self, deadline: float | None = None) -> str:
         """
         Fetches a list of contacts from baresip. These contacts come from a configuration
         file.
 
         Does not emit anything on DBus.
         """
-        return await self.invoke("contacts")
+        return await self.invoke("contacts", deadline=deadline)
 
-    async def dial(self, destination: str) -> str:
+    async def dial(self, destination: str, deadline: float | None = None) -> str:
         """
         Instructs baresip to dial a destination. Baresip picks the User-Agent to use.
 
         Emits events on DBus.
         """
-        return await self.invoke(f"dial {destination}")
+        return await self.invoke(f"dial {destination}", deadline=deadline)
+
+    async def dial_as(
+        self, account: str, destination: str, deadline: float | None = None
+    ) -> str:
+        """
+        Dials a destination from a specific User-Agent, rather than letting baresip
+        pick one.
 
-    async def dial_contact(self) -> str:
-        return await self.invoke("dial_contact")
+        baresip dials from its current User-Agent, so this selects the agent with
+        `uafind()` and then dials. The pair is serialised per client so concurrent
+        calls cannot select each other's agents.
+        """
+        async with self._ua_locked():
+            found = await self.uafind(account, deadline=deadline)
+            if "could not find" in found:
+                raise Exception(f"User-Agent {account} does not exist: {found}")
+            return await self.dial(destination, deadline=deadline)
+
+    async def dial_contact(self, deadline: float | None = None) -> str:
+        return await self.invoke("dial_contact", deadline=deadline)
 
-    async def hangup(self) -> str:
+    async def hangup(
+        self,
+        call_id: str | None = None,
+        code: int | None = None,
+        reason: str | None = None,
+        deadline: float | None = None,
+    ) -> str:
         """
-        Instructs baresip to hang up an existing active call.
+        Instructs baresip to hang up a call: the current one, or `call_id`.
+
+        code and reason set the SIP response used to reject a call that has not been
+        answered, e.g. 486 "Busy Here". They need a call_id, following baresip's
+        `hangup [callid] [code] [reason]` syntax.
 
         Does not emit anything on DBus.
         """
-        return await self.invoke("hangup")
+        if code is not None and call_id is None:
+            raise Exception("A hangup code needs a call_id")
+        args = [str(a) for a in (call_id, code, reason) if a is not None]
+        return await self.invoke(" ".join(["hangup", *args]), deadline=deadline)
 
-    async def help(self) -> str:
+    async def help(self, deadline: float | None = None) -> str:
         """
         Fetches the baresip /help command output. Generally not useful for this library.
 
         Does not emit anything on DBus.
         """
-        return await self.invoke("help")
+        return await self.invoke("help", deadline=deadline)
 
-    async def insmod(self, module: str) -> str:
+    async def insmod(self, module: str, deadline: float | None = None) -> str:
         """
         Instructs baresip to insert a module, such as 'g711'.
 
@@ -293,94 +645,109 @@ class PyBareSIP:
         module = module.strip()
         if " " in module:
             raise Exception(f"Module names may not contain spaces ({module}")
-        return await self.invoke(f"insmod {module}")
+        return await self.invoke(f"insmod {module}", deadline=deadline)
 
-    async def listcalls(self) -> str:
+    async def listcalls(self, deadline: float | None = None) -> str:
         """
         Fetches active calls, broken down by User-Agent.
 
         Does not emit anything on DBus.
         """
-        return await self.invoke("listcalls")
+        return await self.invoke("listcalls", deadline=deadline)
 
-    async def loglevel(self) -> str:
+    async def loglevel(self, deadline: float | None = None) -> str:
         """
         Instructs baresip to change the console log level. This is a cycling toggle.
 
         Does not emit anything on DBus.
         """
-        return await self.invoke("loglevel")
+        return await self.invoke("loglevel", deadline=deadline)
 
-    async def main(self) -> str:
+    async def main(self, deadline: float | None = None) -> str:
         """
         Fetches main loop debugging information from baresip.
 
         Does not emit anything on DBus.
         """
-        return await self.invoke("main")
+        return await self.invoke("main", deadline=deadline)
 
-    async def memstat(self) -> str:
+    async def memstat(self, deadline: float | None = None) -> str:
         """
         Fetches memory status data from baresip. Does not work in v2.9.0 of baresip.
 
         Does not emit anything on DBus.
         """
-        return await self.invoke("memstat")
+        return await self.invoke("memstat", deadline=deadline)
 
-    async def message(self) -> str:
-        return await self.invoke("message")
+    async def message(self, deadline: float | None = None) -> str:
+        return await self.invoke("message", deadline=deadline)
 
-    async def modules(self) -> str:
+    async def modules(self, deadline: float | None = None) -> str:
         """
         Fetches the list of loaded modules from baresip.
 
         Does not emit anything on DBus.
         """
-        return await self.invoke("modules")
+        return await self.invoke("modules", deadline=deadline)
 
-    async def netstat(self) -> str:
+    async def netstat(self, deadline: float | None = None) -> str:
         """
         Fetches the list of interfaces that baresip is listening on, and the DNS servers
         in use.
 
         Does not emit anything on DBus.
         """
-        return await self.invoke("netstat")
+        return await self.invoke("netstat", deadline=deadline)
 
-    async def options(self, account: str) -> str:
+    async def options(self, account: str, deadline: float | None = None) -> str:
         """
         TODO: Decipher this command.
 
         Does not emit anything on DBus, even when it fails.
         """
-        return await self.invoke(f"options {account}")
+        return await self.invoke(f"options {account}", deadline=deadline)
 
-    async def play(self, filename: str) -> str:
+    async def play(
+        self,
+        filename: str | None = None,
+        deadline: float | None = None,
+        text: str | None = None,
+        voice: str | None = None,
+    ) -> str:
         """
         Instructs baresip to play a sound file. If baresip has not been configured, and has
         loaded the ALSA modules, the sound will play through the local soundcard.
 
+        Instead of a file, `text` may be given to play it spoken in `voice`, rendered
+        by the client's TextToSpeech. Prompts played before come from its cache.
+
         Does not emit anything on DBus.
         """
-        return await self.invoke(f"play {filename}")
+        if text is not None:
+            if self.tts is None:
+                raise Exception("play(text=...) needs a client created with tts=")
+            filename = await self.tts.render(text, voice)
+        elif filename is None:
+            raise Exception("play() needs a filename or text")
+        return await self.invoke(f"play {filename}", deadline=deadline)
 
-    async def quit(self) -> str:
+    async def quit(self, deadline: float | None = None) -> str:
         """
         Instructs baresip to shut down.
 
         Emits events on DBus as registrations etc are shut down and deregistered.
         """
-        return await self.invoke("quit")
+        return await self.invoke("quit", deadline=deadline)
 
-    async def reginfo(self) -> str:
+    async def reginfo(self, deadline: float | None = None) -> str:
         """
         Fetches a list of registered user agents.
 
         Does not emit anything on DBus.
         """
-        return await self.invoke("reginfo")
+        return await self.invoke("reginfo", deadline=deadline)
 
-    async def rmmod(self, module: str) -> str:
+    async def rmmod(self, module: str, deadline: float | None = None) -> str:
         """
         Instructs baresip to unload a loaded module, such as 'g711'.
 
@@ -389,45 +756,47 @@ class PyBareSIP:
         module = module.strip()
         if " " in module:
             raise Exception(f"Module names may not contain spaces ({module}")
-        return await self.invoke(f"rmmod {module}")
+        return await self.invoke(f"rmmod {module}", deadline=deadline)
 
-    async def sipstat(self) -> str:
+    async def sipstat(self, deadline: float | None = None) -> str:
         """
         Fetches tranports, connections, transactions from baresip.
 
         Does not emit anything on DBus.
         """
-        return await self.invoke("sipstat")
+        return await self.invoke("sipstat", deadline=deadline)
 
-    async def sysinfo(self) -> str:
+    async def sysinfo(self, deadline: float | None = None) -> str:
         """
         Fetches system information from baresip - kernel, version of baresip, compiler etc.
 
         Does not emit anything on DBus.
         """
-        return await self.invoke("sysinfo")
+        return await self.invoke("sysinfo", deadline=deadline)
 
-    async def timers(self) -> str:
+    async def timers(self, deadline: float | None = None) -> str:
         """
         Fetches active timers from baresip.
 
         Does not emit anything on DBus.
         """
-        return await self.invoke("timers")
+        return await self.invoke("timers", deadline=deadline)
 
-    async def uaaddheader(self, key: str, value: str) -> str:
+    async def uaaddheader(
+        self, key: str, value: str, deadline: float | None = None
+    ) -> str:
         """
         Instructs baresip to add a header to a User-Agent.
         """
-        return await self.invoke(f"uaaddheader {key}={value}")
+        return await self.invoke(f"uaaddheader {key}={value}", deadline=deadline)
 
-    async def uadel(self, account: str) -> str:
+    async def uadel(self, account: str, deadline: float | None = None) -> str:
         """
         Instructs baresip to delete a User-Agent from the internal registry.
         """
-        return await self.invoke(f"uadel {account}")
+        return await self.invoke(f"uadel {account}", deadline=deadline)
 
-    async def uafind(self, account: str) -> str:
+    async def uafind(self, account: str, deadline: float | None = None) -> str:
         """
         Instructs baresip to find a User-Agent matching the account.
 
@@ -435,9 +804,14 @@ class PyBareSIP:
 
         Does not emit anything on DBus.
         """
-        return await self.invoke(f"uafind {account}")
+        return await self.invoke(f"uafind {account}", deadline=deadline)
 
-    async def uanew(self, account: str, flags: dict[str, str] | None = None) -> str:
+    async def uanew(
+        self,
+        account: str,
+        flags: dict[str, str] | None = None,
+        deadline: float | None = None,
+    ) -> str:
         """
         Creates a new User-Agent in baresip. baresip will use this agent as a
         Caller-ID for outbound calls.
@@ -464,10 +838,10 @@ class PyBareSIP:
         if flags:
             account_flags = ";".join([f"{k}={v}" for k, v in flags.items()])
             account = f"{account};{account_flags}"
-        return await self.invoke(f"uanew {account}")
+        return await self.invoke(f"uanew {account}", deadline=deadline)
 
     @requires_version
-    async def uanext(self) -> str:
+    async def uanext(self, deadline: float | None = None) -> str:
         """
         FIXME: Does not exist in 2.9
         """
@@ -475,17 +849,17 @@ class PyBareSIP:
             raise NotImplementedError(
                 f"baresip {self.ver} does not support this command"
             )
-        return await self.invoke("uanext")
+        return await self.invoke("uanext", deadline=deadline)
 
-    async def uastat(self) -> str:
+    async def uastat(self, deadline: float | None = None) -> str:
         """
         Fetches the current User-Agents from baresip.
 
         Does not emit anything on DBus.
         """
-        return await self.invoke("uastat")
+        return await self.invoke("uastat", deadline=deadline)
 
-    async def uuid(self) -> str:
+    async def uuid(self, deadline: float | None = None) -> str:
         """
         Fetches the current UUID from baresip.
 
@@ -493,7 +867,7 @@ class PyBareSIP:
 
         Does not emit anything on DBus.
         """
-        return await self.invoke("uuid")
+        return await self.invoke("uuid", deadline=deadline)
 
     async def vidloop(self) -> str:
         raise NotImplementedError()
@@ -504,12 +878,14 @@ class PyBareSIP:
     async def vidsrc(self) -> str:
         raise NotImplementedError()
 
-    async def loaded_modules(self) -> list[BaresipModule]:
+    async def loaded_modules(
+        self, deadline: float | None = None
+    ) -> list[BaresipModule]:
         """
         Wraps `modules()` to provide a formatted output of loaded modules on the baresip
         server.
         """
-        mods = await self.modules()
+        mods = await self.modules(deadline=deadline)
         modline_pattern = re.compile(
             r"\s+(?P<name>\w+) type=(?P<modtype>(\w+|\w+ \w+|\s))\s+ref=(?P<ref>\d+)"
         )
@@ -526,11 +902,13 @@ class PyBareSIP:
                 )
         return modules
 
-    async def user_agent_exists(self, account: str) -> bool:
+    async def user_agent_exists(
+        self, account: str, deadline: float | None = None
+    ) -> bool:
         """
         Wraps `uafind()` to find out if a User-Agent exists.
         """
-        x = await self.uafind(account=account)
+        x = await self.uafind(account=account, deadline=deadline)
         return "could not find" not in x
 
     async def new_user_agent(
@@ -538,6 +916,7 @@ class PyBareSIP:
         account: str,
         password: str | None = None,
         flags: dict[str, str] | None = None,
+        deadline: float | None = None,
     ) -> str:
         """
         Wraps`uanew()` to provide a potentially friendlier method name.
@@ -548,14 +927,90 @@ class PyBareSIP:
         elif password and not flags:
             flags = {"auth_pass": password}
 
-        return await self.uanew(account=account, flags=flags)
+        return await self.uanew(account=account, flags=flags, deadline=deadline)
+
+    async def user_agents(self, deadline: float | None = None) -> list[str]:
+        """
+        Wraps `reginfo()` to list the AORs of the User-Agents baresip has.
+        """
+        reginfo = await self.reginfo(deadline=deadline)
+        pattern = re.compile(r"^\s*>?\s*(?P<aor>sips?:\S+)")
+        aors = []
+        for line in reginfo.splitlines():
+            m = pattern.match(line)
+            if m:
+                aors.append(m.group("aor"))
+        return aors
+
+    async def sync_identities(
+        self,
+        identities: Iterable[pbs_id.AnyIdentity],
+        prune: bool = True,
+        rate: float = 20.0,
+        concurrency: int = 8,
+    ) -> pbs_prov.SyncReport:
+        """
+        Makes baresip's User-Agents match `identities`, issuing only the `uadel` and
+        `uanew` commands needed. Safe to call repeatedly; when nothing changed it costs
+        one `reginfo`.
+
+        Each change makes baresip REGISTER or un-REGISTER, so changes are applied at
+        most `rate` per second, with at most `concurrency` in flight.
+
+        prune: Delete User-Agents that are not in `identities`.
+        """
+        current = await self.user_agents()
+        plan = pbs_prov.plan_sync(
+            current, self._state.user_agents, identities, prune=prune
+        )
+        return await self.apply_sync_plan(plan, rate=rate, concurrency=concurrency)
+
+    async def apply_sync_plan(
+        self, plan: pbs_prov.SyncPlan, rate: float = 20.0, concurrency: int = 8
+    ) -> pbs_prov.SyncReport:
+        """
+        Issues the `uadel`/`uanew` commands in `plan`; see `sync_identities()`.
+        """
+        report = pbs_prov.SyncReport(
+            unchanged=plan.unchanged, unverified=plan.unverified
+        )
+        if not plan.changes:
+            return report
+
+        bucket = pbs_rl.TokenBucket(rate, capacity=concurrency)
+        limit = asyncio.Semaphore(concurrency)
+
+        async def apply(aor: str, done: list[str], *actions: str) -> None:
+            async with limit:
+                try:
+                    for action in actions:
+                        await bucket.acquire()
+                        await self.invoke(action)
+                except Exception as e:
+                    error = pbs_id.redact(str(e))
+                    logger.warning(f"Syncing {aor} failed: {error}")
+                    report.failed.append((aor, error))
+                else:
+                    done.append(aor)
+
+        await asyncio.gather(
+            *(apply(aor, report.deleted, f"uadel {aor}") for aor in plan.delete)
+        )
+        await asyncio.gather(
+            *(
+                apply(i.aor, report.updated, f"uadel {i.aor}", f"uanew {i.sip}")
+                for i in plan.update
+            ),
+            *(apply(i.aor, report.created, f"uanew {i.sip}") for i in plan.create),
+        )
+        return report
 
-    async def version(self) -> BaresipVersion:
+    async def version(self, deadline: float | None = None) -> BaresipVersion:
         """
         Attempts to fetch a version number using the 'about' baresip command.
         """
         pattern = re.compile(r"\s+((?P<major>\d+)\.(?P<minor>\d+)\.(?P<patch>\d+))\s+")
-        about = await self.about()
+        about = await self.about(deadline=deadline)
         m = pattern.search(about)
         if m:
             self._baresip_version = BaresipVersion(
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import asyncio
+import enum
+import logging
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Set
+
+import pybaresip.timers as pbs_timers
+
+if TYPE_CHECKING:
+    import pybaresip.baresip as pbs
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class CallState(enum.Enum):
+    INCOMING = "incoming"
+    OUTGOING = "outgoing"
+    RINGING = "ringing"
+    ESTABLISHED = "established"
+    CLOSED = "closed"
+
+
+# baresip call event types, and the state each one moves a call into.
+CALL_EVENT_STATES: dict[str, CallState] = {
+    "CALL_INCOMING": CallState.INCOMING,
+    "CALL_OUTGOING": CallState.OUTGOING,
+    "CALL_RINGING": CallState.RINGING,
+    "CALL_PROGRESS": CallState.RINGING,
+    "CALL_ESTABLISHED": CallState.ESTABLISHED,
+    "CALL_CLOSED": CallState.CLOSED,
+}
+
+
+def uri_host(uri: str) -> str:
+    """
+    Returns the host[:port] of a SIP URI, e.g. "gw.example:5060" for
+    "sip:+4420@gw.example:5060;transport=tcp".
+    """
+    return uri.split("@", 1)[-1].split(";", 1)[0].split(">", 1)[0]
+
+
+class Call:
+    """
+    A call as seen through baresip's call events.
+
+    Times are from time.monotonic(); `answered` stays None for calls that were never
+    established, and `ended` until the call closes. `reason` is the text baresip
+    gave with CALL_CLOSED, e.g. "486 Busy Here".
+    """
+
+    __slots__ = (
+        "id",
+        "aor",
+        "peer",
+        "incoming",
+        "state",
+        "created",
+        "answered",
+        "ended",
+        "reason",
+        "timer",
+    )
+
+    def __init__(
+        self, id: str, aor: str, peer: str, incoming: bool, created: float
+    ) -> None:
+        self.id = id
+        self.aor = aor
+        self.peer = peer
+        self.incoming = incoming
+        self.state = CallState.INCOMING if incoming else CallState.OUTGOING
+        self.created = created
+        self.answered: float | None = None
+        self.ended: float | None = None
+        self.reason = ""
+        self.timer: pbs_timers.Timer | None = None
+
+    def __repr__(self) -> str:
+        return f"Call({self.id!r}, {self.aor!r}, {self.peer!r}, {self.state.name})"
+
+
+class CallTracker:
+    """
+    Keeps a live table of calls, built from baresip's call events.
+
+    Register an instance with `PyBareSIP.add_event_listener()`. Calls are removed
+    from the table when CALL_CLOSED arrives, so `active`, `active_for()` and
+    `active_via()` are the live call counts, overall, per account and per gateway
+    (the host of the peer URI).
+
+    ring_timeout: Hangs up calls that are not answered within this many seconds.
+    max_duration: Hangs up calls this many seconds after they were answered.
+    timers: Where the timeouts are kept; by default, a TimerWheel of the tracker's
+    own. Each call holds one wheel entry, not a loop timer, so this scales to tens
+    of thousands of calls.
+    """
+
+    def __init__(
+        self,
+        ring_timeout: float | None = None,
+        max_duration: float | None = None,
+        timers: pbs_timers.AnyScheduler | None = None,
+    ) -> None:
+        self.calls: Dict[str, Call] = {}
+        self.ring_timeout = ring_timeout
+        self.max_duration = max_duration
+        self.timed_out = 0
+        self._timers = pbs_timers.TimerWheel() if timers is None else timers
+        self._per_aor: Dict[str, int] = {}
+        self._per_gateway: Dict[str, int] = {}
+        self._closed_listeners: List[Callable[[Call], None]] = []
+        self._tasks: Set[asyncio.Task[None]] = set()
+
+    @property
+    def active(self) -> int:
+        return len(self.calls)
+
+    def active_for(self, aor: str) -> int:
+        return self._per_aor.get(aor, 0)
+
+    def active_via(self, gateway: str) -> int:
+        return self._per_gateway.get(gateway, 0)
+
+    def add_closed_listener(self, listener: Callable[[Call], None]) -> None:
+        """
+        Adds a function called with each call once it has left the table.
+        """
+        self._closed_listeners.append(listener)
+
+    def remove_closed_listener(self, listener: Callable[[Call], None]) -> None:
+        self._closed_listeners.remove(listener)
+
+    def __call__(self, client: pbs.PyBareSIP, event: pbs.EventParams) -> None:
+        if event.get("class") != "call":
+            return
+        state = CALL_EVENT_STATES.get(event.get("type", ""))
+        call_id = event.get("id")
+        if state is None or not call_id:
+            return
+        call = self.calls.get(call_id)
+        if state is CallState.CLOSED:
+            if call is not None:
+                del self.calls[call_id]
+                if call.timer is not None:
+                    call.timer.cancel()
+                    call.timer = None
+                _decrement(self._per_aor, call.aor)
+                _decrement(self._per_gateway, uri_host(call.peer))
+                call.state = state
+                call.ended = time.monotonic()
+                call.reason = event.get("param", "")
+                self.call_closed(call, event)
+                for listener in self._closed_listeners:
+                    try:
+                        listener(call)
+                    except Exception:
+                        logger.exception(f"Call closed listener {listener!r} failed")
+            return
+        if call is None:
+            aor = event.get("accountaor", "")
+            call = Call(
+                id=call_id,
+                aor=aor,
+                peer=event.get("peeruri", ""),
+                incoming=event.get("direction") == "incoming",
+                created=time.monotonic(),
+            )
+            self.calls[call_id] = call
+            self._per_aor[aor] = self._per_aor.get(aor, 0) + 1
+            gateway = uri_host(call.peer)
+            self._per_gateway[gateway] = self._per_gateway.get(gateway, 0) + 1
+            if self.ring_timeout is not None and state is not CallState.ESTABLISHED:
+                call.timer = self._timers.call_later(
+                    self.ring_timeout, self._expired, client, call
+                )
+        call.state = state
+        if state is CallState.ESTABLISHED and call.answered is None:
+            call.answered = time.monotonic()
+            if call.timer is not None:
+                call.timer.cancel()
+                call.timer = None
+            if self.max_duration is not None:
+                call.timer = self._timers.call_later(
+                    self.max_duration, self._expired, client, call
+                )
+
+    def call_closed(self, call: Call, event: pbs.EventParams) -> None:
+        """
+        Called after a call has been removed from the table. Override to observe it.
+        """
+
+    async def close(self) -> None:
+        """
+        Stops the timeouts and waits for hangups already issued to finish.
+        """
+        for call in self.calls.values():
+            if call.timer is not None:
+                call.timer.cancel()
+                call.timer = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _expired(self, client: pbs.PyBareSIP, call: Call) -> None:
+        call.timer = None
+        if self.calls.get(call.id) is not call:
+            return
+        what = "lasted too long" if call.answered is not None else "was not answered"
+        logger.info(f"Call {call.id} to {call.peer} {what}; hanging up")
+        self.timed_out += 1
+        task = asyncio.ensure_future(self._hangup(client, call.id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _hangup(self, client: pbs.PyBareSIP, call_id: str) -> None:
+        try:
+            await client.hangup(call_id)
+        except Exception as e:
+            logger.warning(f"Hanging up timed out call {call_id} failed: {e}")
+
+
+def _decrement(counts: Dict[str, int], key: str) -> None:
+    counts[key] -= 1
+    if not counts[key]:
+        del counts[key]
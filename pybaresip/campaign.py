@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import dataclasses as dc
+import enum
+import json
+import logging
+import math
+import os
+import time
+from typing import Callable, Deque, Dict, Iterable, Iterator, Set
+
+import pybaresip.baresip as pbs
+import pybaresip.config as pbs_cfg
+import pybaresip.ratelimit as pbs_rl
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class CallResult(enum.Enum):
+    ANSWERED = "answered"
+    NO_ANSWER = "no_answer"
+    FAILED = "failed"
+
+
+@dc.dataclass
+class CampaignStats:
+    dialed: int = 0
+    answered: int = 0
+    no_answer: int = 0
+    failed: int = 0
+    skipped: int = 0
+    answer_rate: float = 0.0
+    setup_time: float = 0.0
+
+
+def read_leads(path: str) -> Iterator[str]:
+    """
+    Yields the leads in a file with one number or URI per line, skipping blank lines
+    and lines starting with "#". Lines are read as they are needed.
+    """
+    with open(path) as f:
+        for line in f:
+            lead = line.strip()
+            if lead and not lead.startswith("#"):
+                yield lead
+
+
+class Checkpoint:
+    """
+    Records which leads of a campaign are finished, by their position in the list.
+
+    Leads finish out of order, so the file holds the position below which every lead
+    is finished plus the finished positions above it. The second part only ever
+    holds leads that finished while an earlier one was still in progress, so it
+    stays about as small as the number of calls in flight.
+
+    Writes replace the file atomically and happen at most every `interval` seconds;
+    leads still in progress when a campaign stops are dialed again on resume.
+    """
+
+    def __init__(self, path: str, interval: float = 1.0) -> None:
+        self.path = path
+        self.interval = interval
+        self.position = 0
+        self._done: Set[int] = set()
+        self._saved = 0.0
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.position = data["position"]
+            self._done = set(data["done"])
+
+    def finished(self, index: int) -> bool:
+        return index < self.position or index in self._done
+
+    def finish(self, index: int) -> None:
+        self._done.add(index)
+        while self.position in self._done:
+            self._done.remove(self.position)
+            self.position += 1
+        if time.monotonic() - self._saved >= self.interval:
+            self.save()
+
+    def save(self) -> None:
+        with pbs_cfg.atomic_writer(self.path) as f:
+            json.dump({"position": self.position, "done": sorted(self._done)}, f)
+        self._saved = time.monotonic()
+
+
+class _Attempt:
+    __slots__ = ("index", "lead", "uri", "dialed", "call_id", "answered")
+
+    def __init__(self, index: int, lead: str, uri: str, dialed: float) -> None:
+        self.index = index
+        self.lead = lead
+        self.uri = uri
+        self.dialed = dialed
+        self.call_id: str | None = None
+        self.answered = False
+
+
+def _dial_key(uri: str) -> str:
+    """
+    The user part of a SIP or tel URI, or the whole of a bare number.
+    """
+    uri = uri.strip().strip("<>")
+    scheme, sep, rest = uri.partition(":")
+    if sep and scheme.lower() in ("sip", "sips", "tel"):
+        uri = rest
+    return uri.split("@", 1)[0].split(";", 1)[0]
+
+
+class Campaign:
+    """
+    Dials a list of leads through `PyBareSIP.dial()`, pacing itself from the call
+    events of the calls it makes.
+
+    The aim is to keep `capacity` calls answered at once. With `e` calls answered
+    and an answer rate of `r`, up to `(capacity - e) / r` dials are kept ringing,
+    never more than `max_channels` calls in all, and new dials are spread over the
+    average setup time (dial to answer or give-up) instead of sent in a burst. The
+    answer rate and setup time are moving averages over the campaign's own calls,
+    starting from `answer_rate`.
+
+    Leads are read from the iterator (or file) one at a time, and only calls in
+    flight are held in memory, so the list can be any length. With a checkpoint
+    path, a restarted campaign skips the leads that already finished.
+
+    uri: Turns a lead into the URI to dial; leads are dialed as they are by default.
+    Calls are matched to dials on the user part of the URI, since baresip reports a
+    bare number dialed as `sip:<number>@<domain>`.
+    on_result: Called with the lead and its CallResult as each one finishes.
+    event_timeout: How long a dial may go without being answered or closed before
+    it is counted as failed, in case its events were lost.
+    """
+
+    def __init__(
+        self,
+        client: pbs.PyBareSIP,
+        leads: Iterable[str] | str,
+        capacity: int,
+        max_channels: int | None = None,
+        checkpoint: str | None = None,
+        answer_rate: float = 0.5,
+        min_answer_rate: float = 0.05,
+        smoothing: float = 0.1,
+        uri: Callable[[str], str] | None = None,
+        on_result: Callable[[str, CallResult], None] | None = None,
+        event_timeout: float = 120.0,
+    ) -> None:
+        self._client = client
+        self._leads = read_leads(leads) if isinstance(leads, str) else leads
+        self.capacity = capacity
+        self.max_channels = max_channels
+        self._checkpoint = Checkpoint(checkpoint) if checkpoint else None
+        self._min_answer_rate = min_answer_rate
+        self._smoothing = smoothing
+        self._uri = uri or (lambda lead: lead)
+        self._on_result = on_result
+        self.event_timeout = event_timeout
+        self.stats = CampaignStats(answer_rate=answer_rate)
+
+        self._ringing: Dict[int, _Attempt] = {}
+        self._by_uri: Dict[str, Deque[_Attempt]] = {}
+        self._by_call: Dict[str, _Attempt] = {}
+        self._answered = 0
+        self._tasks: Set[asyncio.Task[None]] = set()
+        self._bucket = pbs_rl.TokenBucket(capacity, capacity)
+        self._wake: asyncio.Event | None = None
+        self._stopping = False
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._ringing) + self._answered
+
+    def stop(self) -> None:
+        """
+        Stops dialing new leads. `run()` returns once the calls in flight end.
+        """
+        self._stopping = True
+        if self._wake is not None:
+            self._wake.set()
+
+    async def run(self) -> CampaignStats:
+        self._wake = asyncio.Event()
+        self._client.add_event_listener(self._changed_event)
+        try:
+            for index, lead in enumerate(self._leads):
+                if self._checkpoint and self._checkpoint.finished(index):
+                    self.stats.skipped += 1
+                    continue
+                if not await self._wait_for_budget():
+                    break
+                task = asyncio.ensure_future(self._dial(self._start(index, lead)))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            while self.in_flight or self._tasks:
+                await self._wait(1.0)
+                self._expire()
+        finally:
+            self._client.remove_event_listener(self._changed_event)
+            if self._checkpoint:
+                self._checkpoint.save()
+        return self.stats
+
+    def _budget(self) -> int:
+        """
+        How many more dials may be ringing right now.
+        """
+        free = self.capacity - self._answered
+        if free <= 0:
+            return 0
+        rate = max(self.stats.answer_rate, self._min_answer_rate)
+        ringing = math.ceil(free / rate)
+        if self.max_channels is not None:
+            ringing = min(ringing, self.max_channels - self._answered)
+        return ringing - len(self._ringing)
+
+    async def _wait_for_budget(self) -> bool:
+        while not self._stopping:
+            self._expire()
+            budget = self._budget()
+            if budget > 0:
+                if self.stats.setup_time > 0:
+                    target = budget + len(self._ringing)
+                    self._bucket.rate = target / self.stats.setup_time
+                if self._bucket.try_acquire():
+                    return True
+                await self._wait(self._bucket.delay())
+            else:
+                await self._wait(1.0)
+        return False
+
+    async def _wait(self, timeout: float) -> None:
+        assert self._wake is not None
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    def _start(self, index: int, lead: str) -> _Attempt:
+        # Counted as ringing straight away, so the budget holds before the dial.
+        uri = self._uri(lead)
+        attempt = _Attempt(index, lead, uri, time.monotonic())
+        self._ringing[index] = attempt
+        self._by_uri.setdefault(_dial_key(uri), collections.deque()).append(attempt)
+        self.stats.dialed += 1
+        return attempt
+
+    async def _dial(self, attempt: _Attempt) -> None:
+        try:
+            await self._client.dial(attempt.uri)
+        except Exception as e:
+            logger.warning(f"Dialing lead {attempt.index} ({attempt.lead}) failed: {e}")
+            self._finish(attempt, CallResult.FAILED)
+
+    def _changed_event(self, client: pbs.PyBareSIP, event: pbs.EventParams) -> None:
+        if event.get("class") != "call":
+            return
+        call_id = event.get("id", "")
+        evtype = event.get("type")
+        attempt = self._by_call.get(call_id)
+        if attempt is None:
+            if evtype != "CALL_OUTGOING":
+                return
+            attempt = self._claim(event.get("peeruri", ""))
+            if attempt is None:
+                return
+            attempt.call_id = call_id
+            self._by_call[call_id] = attempt
+        if evtype == "CALL_ESTABLISHED" and not attempt.answered:
+            attempt.answered = True
+            del self._ringing[attempt.index]
+            self._answered += 1
+            self._observe(attempt, answered=True)
+        elif evtype == "CALL_CLOSED":
+            if attempt.answered:
+                self._answered -= 1
+                self._finish(attempt, CallResult.ANSWERED)
+            else:
+                self._observe(attempt, answered=False)
+                self._finish(attempt, CallResult.NO_ANSWER)
+
+    def _claim(self, uri: str) -> _Attempt | None:
+        """
+        Matches a new outgoing call to the oldest unmatched dial of its URI's user.
+        """
+        key = _dial_key(uri)
+        waiting = self._by_uri.get(key)
+        if not waiting:
+            return None
+        attempt = waiting.popleft()
+        if not waiting:
+            del self._by_uri[key]
+        return attempt
+
+    def _observe(self, attempt: _Attempt, answered: bool) -> None:
+        a = self._smoothing
+        stats = self.stats
+        setup = time.monotonic() - attempt.dialed
+        stats.setup_time = (
+            setup if not stats.setup_time else ((1 - a) * stats.setup_time + a * setup)
+        )
+        stats.answer_rate = (1 - a) * stats.answer_rate + a * float(answered)
+
+    def _finish(self, attempt: _Attempt, result: CallResult) -> None:
+        self._ringing.pop(attempt.index, None)
+        if attempt.call_id is not None:
+            self._by_call.pop(attempt.call_id, None)
+        else:
+            key = _dial_key(attempt.uri)
+            waiting = self._by_uri.get(key)
+            if waiting is not None and attempt in waiting:
+                waiting.remove(attempt)
+                if not waiting:
+                    del self._by_uri[key]
+        if result is CallResult.ANSWERED:
+            self.stats.answered += 1
+        elif result is CallResult.NO_ANSWER:
+            self.stats.no_answer += 1
+        else:
+            self.stats.failed += 1
+        if self._checkpoint:
+            self._checkpoint.finish(attempt.index)
+        if self._on_result is not None:
+            try:
+                self._on_result(attempt.lead, result)
+            except Exception:
+                logger.exception(f"Campaign result callback failed for {attempt.lead}")
+        assert self._wake is not None
+        self._wake.set()
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.event_timeout
+        expired = []
+        # _ringing is in dialing order, so only the expired dials are visited.
+        for attempt in self._ringing.values():
+            if attempt.dialed >= cutoff:
+                break
+            expired.append(attempt)
+        for attempt in expired:
+            logger.warning(f"No call events for lead {attempt.index}; giving up")
+            self._finish(attempt, CallResult.FAILED)
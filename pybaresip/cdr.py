@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import dataclasses as dc
+import enum
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, List, Tuple
+
+import pybaresip.calls as pbs_calls
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cdr (
+    id INTEGER PRIMARY KEY,
+    call_id TEXT NOT NULL,
+    aor TEXT NOT NULL,
+    peer TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    setup REAL NOT NULL,
+    answered REAL,
+    ended REAL NOT NULL,
+    duration REAL NOT NULL,
+    disposition TEXT NOT NULL,
+    reason TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cdr_setup ON cdr (setup);
+CREATE INDEX IF NOT EXISTS cdr_aor_setup ON cdr (aor, setup);
+CREATE INDEX IF NOT EXISTS cdr_peer_setup ON cdr (peer, setup);
+CREATE INDEX IF NOT EXISTS cdr_call_id ON cdr (call_id);
+"""
+
+_COLUMNS = (
+    "call_id, aor, peer, direction, setup, answered, ended, duration, disposition,"
+    " reason"
+)
+_INSERT = f"INSERT INTO cdr ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+# SIP responses to an unanswered call that mean the callee was busy, and those
+# that mean nobody picked up, rather than that the call failed.
+_BUSY = {"486", "600"}
+_NO_ANSWER = {"408", "480", "487"}
+
+
+class Disposition(enum.Enum):
+    ANSWERED = "answered"
+    NO_ANSWER = "no_answer"
+    BUSY = "busy"
+    FAILED = "failed"
+
+
+@dc.dataclass(frozen=True)
+class Cdr:
+    """
+    A call detail record. Times are seconds since the epoch; `duration` is the time
+    from answer to hangup, and 0 for calls that were never answered.
+    """
+
+    call_id: str
+    aor: str
+    peer: str
+    direction: str
+    setup: float
+    answered: float | None
+    ended: float
+    duration: float
+    disposition: Disposition
+    reason: str
+
+    @classmethod
+    def from_call(cls, call: pbs_calls.Call) -> Cdr:
+        """
+        The record of a call that has closed.
+        """
+        # Call times are monotonic; move them onto the wall clock.
+        offset = time.time() - time.monotonic()
+        ended = (call.ended if call.ended is not None else time.monotonic()) + offset
+        answered = None if call.answered is None else call.answered + offset
+        return cls(
+            call_id=call.id,
+            aor=call.aor,
+            peer=call.peer,
+            direction="incoming" if call.incoming else "outgoing",
+            setup=call.created + offset,
+            answered=answered,
+            ended=ended,
+            duration=0.0 if answered is None else max(0.0, ended - answered),
+            disposition=disposition(answered is not None, call.reason),
+            reason=call.reason,
+        )
+
+
+@dc.dataclass
+class CdrStats:
+    written: int = 0
+    batches: int = 0
+    dropped: int = 0
+    failed: int = 0
+
+
+def disposition(answered: bool, reason: str) -> Disposition:
+    """
+    Classifies a call from whether it was answered and the reason baresip gave when
+    it closed, e.g. "486 Busy Here".
+    """
+    if answered:
+        return Disposition.ANSWERED
+    code = reason.split(" ", 1)[0]
+    if code in _BUSY:
+        return Disposition.BUSY
+    if not reason or code in _NO_ANSWER:
+        return Disposition.NO_ANSWER
+    return Disposition.FAILED
+
+
+def _row(cdr: Cdr) -> Tuple[Any, ...]:
+    return (
+        cdr.call_id,
+        cdr.aor,
+        cdr.peer,
+        cdr.direction,
+        cdr.setup,
+        cdr.answered,
+        cdr.ended,
+        cdr.duration,
+        cdr.disposition.value,
+        cdr.reason,
+    )
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Opens a CDR database, creating the table and its indexes if needed.
+    """
+    conn = sqlite3.connect(path, check_same_thread=False)
+    # WAL lets readers query while the writer commits; NORMAL sync is durable
+    # against process crashes, and only a power cut can lose the last commits.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def query(
+    path: str,
+    aor: str | None = None,
+    peer: str | None = None,
+    start: float | None = None,
+    end: float | None = None,
+    limit: int | None = None,
+) -> List[Cdr]:
+    """
+    Returns the records for an account or peer, set up within [start, end), oldest
+    first. Each filter is optional; all of them are served by an index.
+    """
+    where = []
+    params: List[Any] = []
+    for clause, value in (
+        ("aor = ?", aor),
+        ("peer = ?", peer),
+        ("setup >= ?", start),
+        ("setup < ?", end),
+    ):
+        if value is not None:
+            where.append(clause)
+            params.append(value)
+    sql = f"SELECT {_COLUMNS} FROM cdr"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY setup"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    conn = connect(path)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+    return [
+        Cdr(
+            call_id=row[0],
+            aor=row[1],
+            peer=row[2],
+            direction=row[3],
+            setup=row[4],
+            answered=row[5],
+            ended=row[6],
+            duration=row[7],
+            disposition=Disposition(row[8]),
+            reason=row[9],
+        )
+        for row in rows
+    ]
+
+
+class CdrWriter:
+    """
+    Writes CDRs to a SQLite database from a thread of its own.
+
+    `write()` only puts the record on a queue of at most `max_queued` records, so
+    it costs the bus loop next to nothing. The writer thread takes everything
+    queued, up to `batch_size` records, and inserts it with one executemany() in
+    one transaction, so the rate of commits stays low however many calls close at
+    once. The insert is one statement, prepared once and reused from the
+    connection's statement cache. When the queue is full the record is dropped and
+    counted in `stats.dropped`, rather than blocking the loop.
+    """
+
+    def __init__(
+        self, path: str, batch_size: int = 500, max_queued: int = 100_000
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.stats = CdrStats()
+        self._queue: queue.Queue[Cdr | None] = queue.Queue(max_queued)
+        self._dropping = False
+        self._closed = False
+        # Connect here, so a bad path or schema fails the constructor.
+        self._conn = connect(path)
+        self._thread = threading.Thread(
+            target=self._run, name="pybaresip-cdr", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, cdr: Cdr) -> bool:
+        """
+        Queues a record, and returns False if it was dropped.
+        """
+        if self._closed:
+            raise RuntimeError("CDR writer is closed")
+        try:
+            self._queue.put_nowait(cdr)
+        except queue.Full:
+            self.stats.dropped += 1
+            if not self._dropping:
+                logger.warning(f"CDR queue is full; dropping records for {self.path}")
+                self._dropping = True
+            return False
+        self._dropping = False
+        return True
+
+    def flush(self) -> None:
+        """
+        Blocks until every record queued so far is committed.
+        """
+        self._queue.join()
+
+    def close(self) -> None:
+        """
+        Writes out the queue and stops the thread. This blocks; from the loop, use
+        `await loop.run_in_executor(None, writer.close)`.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                # close() queues None last, and nothing is queued after it.
+                stop = batch[-1] is None
+                records = [_row(cdr) for cdr in batch if cdr is not None]
+                if records:
+                    self._insert(records)
+                for _ in batch:
+                    self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            self._conn.close()
+
+    def _insert(self, records: List[Tuple[Any, ...]]) -> None:
+        try:
+            with self._conn:
+                self._conn.executemany(_INSERT, records)
+        except sqlite3.Error as e:
+            logger.error(f"Could not write {len(records)} CDRs to {self.path}: {e}")
+            self.stats.failed += len(records)
+            return
+        self.stats.written += len(records)
+        self.stats.batches += 1
+
+
+class CdrRecorder:
+    """
+    Writes a CDR for every call a CallTracker sees close.
+
+    The tracker supplies the set-up, answer and hangup times, the account and the
+    peer; the disposition comes from the reason baresip gave with CALL_CLOSED.
+    """
+
+    def __init__(self, tracker: pbs_calls.CallTracker, writer: CdrWriter) -> None:
+        self._tracker = tracker
+        self._writer = writer
+        tracker.add_closed_listener(self._call_closed)
+
+    def close(self) -> None:
+        self._tracker.remove_closed_listener(self._call_closed)
+
+    def _call_closed(self, call: pbs_calls.Call) -> None:
+        self._writer.write(Cdr.from_call(call))
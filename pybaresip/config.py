@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import contextlib
+import dataclasses as dc
+import os
+import tempfile
+from typing import IO, TYPE_CHECKING, Any, Iterable, Iterator
+
+if TYPE_CHECKING:
+    import pybaresip.identity as pbs_id
+
+
+@dc.dataclass
+class BaresipConfig:
+    """
+    The settings pybaresip needs in a baresip `config` file.
+
+    Only the modules listed are loaded, which keeps baresip's start-up short. The
+    ctrl_dbus application module is what exposes baresip on the bus, so it should
+    stay in app_modules.
+
+    extra: Any other `key value` lines, written verbatim.
+    """
+
+    module_path: str = "/usr/lib/baresip/modules"
+    modules: list[str] = dc.field(default_factory=lambda: ["g711"])
+    app_modules: list[str] = dc.field(default_factory=lambda: ["ctrl_dbus"])
+    extra: dict[str, str] = dc.field(default_factory=dict)
+
+    def render(self) -> str:
+        lines = [f"module_path\t\t{self.module_path}"]
+        lines.extend(f"module\t\t\t{m}.so" for m in self.modules)
+        lines.extend(f"module_app\t\t{m}.so" for m in self.app_modules)
+        lines.extend(f"{k}\t\t{v}" for k, v in self.extra.items())
+        return "\n".join(lines) + "\n"
+
+
+@contextlib.contextmanager
+def atomic_writer(path: str, mode: str = "w") -> Iterator[IO[Any]]:
+    """
+    Yields a file that replaces `path` in one step when the block exits cleanly.
+
+    The data goes to a temporary file in the same directory, which is flushed to disk
+    and then renamed over `path`, so baresip never reads a half-written file. If the
+    block raises, `path` is left untouched. Use mode "wb" for binary data.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp)
+        raise
+
+
+def render_accounts(identities: Iterable[pbs_id.AnyIdentity], f: IO[str]) -> int:
+    """
+    Writes one baresip `accounts` line per identity, using the same format as
+    `Identity.sip` (and therefore as `uanew`). Returns the number of lines written.
+
+    Identities are consumed one at a time, so a generator of any size can be
+    rendered without holding it in memory.
+    """
+    count = 0
+    for identity in identities:
+        f.write(identity.sip)
+        f.write("\n")
+        count += 1
+    return count
+
+
+def write_accounts(path: str, identities: Iterable[pbs_id.AnyIdentity]) -> int:
+    """
+    Atomically replaces the `accounts` file at `path`.
+    """
+    with atomic_writer(path) as f:
+        return render_accounts(identities, f)
+
+
+def write_config_dir(directory: str, config: BaresipConfig) -> None:
+    """
+    Writes `config` into `directory`, suitable for `baresip -f <directory>`.
+
+    An empty `accounts` file is created if there isn't one, so that baresip does not
+    write its own example accounts into the directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with atomic_writer(os.path.join(directory, "config")) as f:
+        f.write(config.render())
+    accounts = os.path.join(directory, "accounts")
+    if not os.path.exists(accounts):
+        open(accounts, "w").close()
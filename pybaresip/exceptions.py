@@ -1,2 +1,45 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+import pybaresip.identity as pbs_id
+
+if TYPE_CHECKING:
+    import pybaresip.ratelimit as pbs_rl
+
+
 class BaresipVersionError(RuntimeError):
     ...
+
+
+class BaresipUnavailableError(ConnectionError):
+    """
+    Raised when a command cannot be sent because baresip is not on the bus.
+    """
+
+
+class BaresipTimeoutError(asyncio.TimeoutError):
+    """
+    Raised when a command does not complete before its timeout or deadline. The
+    action is kept with its secret account flags masked, as the message ends up in
+    logs and reports.
+    """
+
+    def __init__(self, action: str, timeout: float) -> None:
+        action = pbs_id.redact(action)
+        super().__init__(f"'{action}' did not complete within {timeout:.3f}s")
+        self.action = action
+        self.timeout = timeout
+
+
+class AdmissionError(Exception):
+    """
+    Raised when a call is refused because it would exceed a call limit.
+    """
+
+    def __init__(self, scope: pbs_rl.AdmissionScope, name: str) -> None:
+        where = f" for {name}" if name else ""
+        super().__init__(f"Over the {scope.value} call limit{where}")
+        self.scope = scope
+        self.name = name
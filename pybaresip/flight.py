@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import IO, Any, List, Tuple
+
+import pybaresip.identity as pbs_id
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# (time.monotonic(), kind, fields)
+FlightEntry = Tuple[float, str, Tuple[Any, ...]]
+
+
+class FlightRecorder:
+    """
+    Keeps the last `size` commands, responses and events a client saw, for
+    dumping when something goes wrong.
+
+    Recording stores a tuple of the raw arguments in a slot of a list allocated
+    up front, overwriting the oldest; nothing is formatted until the recorder is
+    dumped. `dump()` writes the entries out on demand; `trigger()` is the same but
+    does nothing within `min_interval` seconds of the last dump, so a burst of
+    failures gives one dump rather than one per failure. Passwords in `uanew`
+    commands, and other secret account flags, are masked as entries are formatted.
+    """
+
+    def __init__(self, size: int = 1024, min_interval: float = 60.0) -> None:
+        if size < 1:
+            raise ValueError("A flight recorder needs at least one slot")
+        self.size = size
+        self.min_interval = min_interval
+        self.dumps = 0
+        self._slots: List[FlightEntry | None] = [None] * size
+        self._count = 0
+        self._dumped: float | None = None
+
+    def __len__(self) -> int:
+        return min(self._count, self.size)
+
+    def record(self, kind: str, *fields: Any) -> None:
+        count = self._count
+        self._slots[count % self.size] = (time.monotonic(), kind, fields)
+        self._count = count + 1
+
+    def entries(self) -> List[FlightEntry]:
+        """
+        The entries held, oldest first.
+        """
+        start = self._count % self.size
+        ordered = self._slots[start:] + self._slots[:start]
+        return [entry for entry in ordered if entry is not None]
+
+    def clear(self) -> None:
+        self._slots = [None] * self.size
+        self._count = 0
+
+    def format(self) -> str:
+        entries = self.entries()
+        if not entries:
+            return ""
+        last = entries[-1][0]
+        return "\n".join(
+            pbs_id.redact(
+                f"{when - last:+12.6f} {kind:<8} {' '.join(map(str, fields))}"
+            )
+            for when, kind, fields in entries
+        )
+
+    def dump(self, reason: str, stream: IO[str] | None = None) -> None:
+        """
+        Writes out every entry held, with times relative to the newest, to `stream`
+        or else as one warning on this module's logger.
+        """
+        self._dumped = time.monotonic()
+        self.dumps += 1
+        skipped = max(0, self._count - self.size)
+        header = pbs_id.redact(
+            f"Flight recorder: {reason} ({len(self)} entries, {skipped} older lost)"
+        )
+        if stream is not None:
+            stream.write(f"{header}\n{self.format()}\n")
+        else:
+            logger.warning("%s\n%s", header, self.format())
+
+    def trigger(self, reason: str) -> bool:
+        """
+        Dumps, unless the last dump was less than `min_interval` seconds ago.
+        Returns whether it dumped.
+        """
+        last = self._dumped
+        if last is not None and time.monotonic() - last < self.min_interval:
+            return False
+        self.dump(reason)
+        return True
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
 import dataclasses as dc
+import re
+import types
+from typing import Dict, Mapping, Union
 
 
 class IdentityFlagError(ValueError):
     ...
 
 
+class IdentityValidationError(ValueError):
+    ...
+
+
 @dc.dataclass
 class Identity:
     """An Account is the configuration for an identity used to make calls.
@@ -26,14 +33,147 @@ class Identity:
     def flag_names(self) -> list[str]:
         return [x for y in self.flags for x in y.keys()]
 
+    @property
+    def aor(self) -> str:
+        """Returns the address-of-record, which is how baresip identifies the agent"""
+        return f"sip:{self.user}@{self.gateway}:{self.port}"
+
     @property
     def sip(self) -> str:
         """Returns the identity as a sip: address string with flags"""
         f = [f"{k}={v}" for x in self.flags for k, v in x.items()]
-        return f"sip:{self.user}@{self.gateway}:{self.port};{';'.join(f)}"
+        return f"{self.aor};{';'.join(f)}"
 
     def __post_init__(self) -> None:
         if "auth_pass" in self.flag_names:
             raise IdentityFlagError("'auth_pass' must not be specified as a flag.")
 
         self.flags.append({"auth_pass": self.password})
+
+
+# Characters RFC 3261 allows in the user part, less those that would end the user or
+# the account line early (";" starts the flags, "?" the headers).
+_USER = re.compile(r"[A-Za-z0-9\-_.!~*'()&=+$,/%]+")
+_HOST = re.compile(
+    r"(?:[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)*"
+    r"[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?"
+    r"|\[[0-9A-Fa-f:.]+\]"
+)
+_FLAG_NAME = re.compile(r"[A-Za-z0-9_]+")
+_FLAG_VALUE_FORBIDDEN = re.compile(r"[;\r\n]")
+
+
+class CompactIdentity:
+    """
+    A validated, immutable identity for holding tens of thousands in memory.
+
+    Unlike `Identity`, flags are a single mapping, the fields live in __slots__
+    rather than an instance dict, and `aor` and `sip` are built once on creation
+    rather than on every access. It can be used anywhere an `Identity` is accepted.
+
+    The password is stored as the `auth_pass` flag. Raises IdentityValidationError
+    for a user, gateway, port or flag that would produce a broken account line.
+    """
+
+    __slots__ = ("user", "gateway", "port", "_flags", "aor", "sip")
+
+    user: str
+    gateway: str
+    port: int
+    _flags: Dict[str, str]
+    aor: str
+    sip: str
+
+    def __init__(
+        self,
+        user: str,
+        password: str,
+        gateway: str,
+        flags: Mapping[str, str] | None = None,
+        port: int = 5060,
+    ) -> None:
+        if not isinstance(user, str) or not _USER.fullmatch(user):
+            raise IdentityValidationError(f"Invalid user {user!r}")
+        if not isinstance(gateway, str) or not _HOST.fullmatch(gateway):
+            raise IdentityValidationError(f"Invalid gateway {gateway!r}")
+        if isinstance(port, bool) or not isinstance(port, int) or not 0 < port < 65536:
+            raise IdentityValidationError(f"Invalid port {port!r}")
+        validated = {}
+        for name, value in (flags or {}).items():
+            if name == "auth_pass":
+                raise IdentityFlagError("'auth_pass' must not be specified as a flag.")
+            if not _FLAG_NAME.fullmatch(name):
+                raise IdentityValidationError(f"Invalid flag name {name!r}")
+            validated[name] = _flag_value(name, value)
+        validated["auth_pass"] = _flag_value("auth_pass", password)
+
+        aor = f"sip:{user}@{gateway}:{port}"
+        setter = object.__setattr__
+        setter(self, "user", user)
+        setter(self, "gateway", gateway)
+        setter(self, "port", port)
+        setter(self, "_flags", validated)
+        setter(self, "aor", aor)
+        setter(
+            self, "sip", f"{aor};{';'.join(f'{k}={v}' for k, v in validated.items())}"
+        )
+
+    @classmethod
+    def from_identity(cls, identity: Identity) -> CompactIdentity:
+        # Identity renders its flags with str(), e.g. {"regint": 0}; so does this.
+        flags = {k: str(v) for x in identity.flags for k, v in x.items()}
+        del flags["auth_pass"]
+        return cls(
+            identity.user, identity.password, identity.gateway, flags, identity.port
+        )
+
+    @property
+    def password(self) -> str:
+        return self._flags["auth_pass"]
+
+    @property
+    def flags(self) -> Mapping[str, str]:
+        return types.MappingProxyType(self._flags)
+
+    @property
+    def flag_names(self) -> list[str]:
+        return list(self._flags)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompactIdentity):
+            return NotImplemented
+        return self.sip == other.sip
+
+    def __hash__(self) -> int:
+        return hash(self.sip)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.aor!r})"
+
+
+def _flag_value(name: str, value: object) -> str:
+    # No str() here: a missing password would become "None".
+    if not isinstance(value, str) or not value or _FLAG_VALUE_FORBIDDEN.search(value):
+        raise IdentityValidationError(f"Invalid value for flag {name!r}")
+    return value
+
+
+# Account flags whose values must not end up in logs or recordings.
+SECRET_FLAGS = ("auth_pass", "stunpass")
+_SECRET = re.compile(rf"(?<=[;?&])({'|'.join(SECRET_FLAGS)})=[^;&>\s]*")
+
+
+def redact(text: str) -> str:
+    """
+    Masks the values of secret flags in a command, response or error message, e.g.
+    the password in `uanew sip:alice@example.com;auth_pass=secret`.
+    """
+    if "pass=" not in text:
+        return text
+    return _SECRET.sub(r"\1=***", text)
+
+
+AnyIdentity = Union[Identity, CompactIdentity]
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses as dc
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, Mapping, Set, Union
+
+import pybaresip.baresip as pbs
+import pybaresip.timers as pbs_timers
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# A menu option leads to another menu, by name, or runs a handler. A handler may
+# return the name of the menu to continue in; returning None ends the session and
+# leaves the call up.
+Handler = Callable[["Session"], Awaitable[Union[str, None]]]
+Option = Union[str, Handler]
+
+HANGUP = "__hangup__"
+
+
+@dc.dataclass(frozen=True)
+class Menu:
+    """
+    One IVR menu.
+
+    prompt: A sound file played on entering the menu.
+    options: The digits to dial for each option. Options may be several digits
+    long, up to `max_digits`; shorter ones are ended with the `terminator` or by
+    the `digit_timeout` passing between digits.
+    timeout: How long to wait for the first digit.
+    retries: How often a caller may time out or dial an unknown option before
+    `on_failure` (by default, the call is hung up).
+    """
+
+    name: str
+    options: Mapping[str, Option]
+    prompt: str | None = None
+    max_digits: int = 1
+    terminator: str = "#"
+    timeout: float = 10.0
+    digit_timeout: float = 3.0
+    retries: int = 3
+    invalid_prompt: str | None = None
+    on_failure: str = HANGUP
+
+
+class Session:
+    """
+    The state of one call in the IVR.
+    """
+
+    __slots__ = (
+        "client",
+        "call_id",
+        "menu",
+        "digits",
+        "failures",
+        "timer",
+        "busy",
+        "data",
+    )
+
+    def __init__(self, client: pbs.PyBareSIP, call_id: str, menu: Menu) -> None:
+        self.client = client
+        self.call_id = call_id
+        self.menu = menu
+        self.digits = ""
+        self.failures = 0
+        self.timer: pbs_timers.Timer | None = None
+        # Set while a handler runs; digits dialed meanwhile are ignored.
+        self.busy = False
+        self.data: Dict[str, object] | None = None
+
+
+class IvrEngine:
+    """
+    Runs declarative menus on calls, driven by baresip's DTMF events.
+
+    Register an instance with `PyBareSIP.add_event_listener()`. A session starts on
+    the `root` menu when a call to one of `accounts` (or to any account, if None)
+    is established, and ends when the call closes. Each session is a small
+    __slots__ object in a dict keyed by call id, and its timeouts are entries in a
+    shared TimerWheel, so there is no task or loop timer per call.
+
+    player: Plays a prompt on a call. Defaults to `PyBareSIP.play()`, which plays
+    on baresip's audio player; pass a function that switches the call's audio
+    source to play into the call instead.
+    """
+
+    def __init__(
+        self,
+        menus: Iterable[Menu],
+        root: str,
+        accounts: Iterable[str] | None = None,
+        timers: pbs_timers.AnyScheduler | None = None,
+        player: Callable[[Session, str], Awaitable[object]] | None = None,
+    ) -> None:
+        self.menus: Dict[str, Menu] = {m.name: m for m in menus}
+        for menu in self.menus.values():
+            for target in (*menu.options.values(), menu.on_failure):
+                if isinstance(target, str) and target not in self.menus:
+                    if target != HANGUP:
+                        raise ValueError(f"Menu {menu.name} leads to unknown {target}")
+        if root not in self.menus:
+            raise ValueError(f"There is no root menu called {root}")
+        self.root = root
+        self._accounts = None if accounts is None else frozenset(accounts)
+        self._timers = pbs_timers.TimerWheel() if timers is None else timers
+        self._player = player or (lambda session, f: session.client.play(f))
+        self.sessions: Dict[str, Session] = {}
+        self._tasks: Set[asyncio.Task[None]] = set()
+
+    def __call__(self, client: pbs.PyBareSIP, event: pbs.EventParams) -> None:
+        if event.get("class") != "call":
+            return
+        evtype = event.get("type")
+        call_id = event.get("id", "")
+        if evtype == "CALL_DTMF_START":
+            session = self.sessions.get(call_id)
+            if session is not None and not session.busy:
+                self._digit(session, event.get("param", ""))
+        elif evtype == "CALL_ESTABLISHED":
+            if call_id in self.sessions:
+                return
+            if self._accounts is not None:
+                if event.get("accountaor") not in self._accounts:
+                    return
+            session = Session(client, call_id, self.menus[self.root])
+            self.sessions[call_id] = session
+            self._enter(session, session.menu)
+        elif evtype == "CALL_CLOSED":
+            session = self.sessions.pop(call_id, None)
+            if session is not None and session.timer is not None:
+                session.timer.cancel()
+
+    async def close(self) -> None:
+        for session in self.sessions.values():
+            if session.timer is not None:
+                session.timer.cancel()
+        self.sessions.clear()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _arm(self, session: Session, delay: float) -> None:
+        if session.timer is not None:
+            session.timer.cancel()
+        session.timer = self._timers.call_later(delay, self._timeout, session)
+
+    def _enter(self, session: Session, menu: Menu) -> None:
+        session.menu = menu
+        session.digits = ""
+        session.failures = 0
+        if menu.prompt:
+            self._spawn(self._play(session, menu.prompt))
+        self._arm(session, menu.timeout)
+
+    def _digit(self, session: Session, key: str) -> None:
+        menu = session.menu
+        if key == menu.terminator:
+            self._choose(session)
+            return
+        session.digits += key
+        if len(session.digits) >= menu.max_digits:
+            self._choose(session)
+        else:
+            self._arm(session, menu.digit_timeout)
+
+    def _timeout(self, session: Session) -> None:
+        session.timer = None
+        if self.sessions.get(session.call_id) is not session:
+            return
+        if session.digits:
+            self._choose(session)
+        else:
+            self._fail(session)
+
+    def _choose(self, session: Session) -> None:
+        target = session.menu.options.get(session.digits)
+        session.digits = ""
+        if target is None:
+            self._fail(session)
+        else:
+            self._go(session, target)
+
+    def _fail(self, session: Session) -> None:
+        menu = session.menu
+        session.failures += 1
+        if session.failures > menu.retries:
+            self._go(session, menu.on_failure)
+            return
+        prompt = menu.invalid_prompt or menu.prompt
+        if prompt:
+            self._spawn(self._play(session, prompt))
+        self._arm(session, menu.timeout)
+
+    def _go(self, session: Session, target: Option) -> None:
+        if session.timer is not None:
+            session.timer.cancel()
+            session.timer = None
+        if isinstance(target, str) and target != HANGUP and target not in self.menus:
+            # Only a handler can get here, as menus are checked up front.
+            logger.error(
+                f"IVR on {session.call_id} went to unknown menu {target}; hanging up"
+            )
+            target = HANGUP
+        if target == HANGUP:
+            self.sessions.pop(session.call_id, None)
+            self._spawn(self._hangup(session))
+        elif isinstance(target, str):
+            self._enter(session, self.menus[target])
+        else:
+            self._spawn(self._handle(session, target))
+
+    async def _handle(self, session: Session, handler: Handler) -> None:
+        session.busy = True
+        try:
+            target = await handler(session)
+        except Exception:
+            logger.exception(f"IVR handler {handler!r} failed on {session.call_id}")
+            target = HANGUP
+        finally:
+            session.busy = False
+        if self.sessions.get(session.call_id) is not session:
+            return
+        if target is None:
+            del self.sessions[session.call_id]
+        else:
+            self._go(session, target)
+
+    async def _play(self, session: Session, prompt: str) -> None:
+        try:
+            await self._player(session, prompt)
+        except Exception as e:
+            logger.warning(f"Playing {prompt} on {session.call_id} failed: {e}")
+
+    async def _hangup(self, session: Session) -> None:
+        try:
+            await session.client.hangup(session.call_id)
+        except Exception as e:
+            logger.warning(f"Hanging up {session.call_id} failed: {e}")
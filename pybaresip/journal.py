@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import enum
+import gzip
+import logging
+import mmap
+import os
+import re
+import shutil
+import struct
+import time
+from typing import IO, TYPE_CHECKING, Any, Iterator, List, NamedTuple, Tuple
+
+import pybaresip.config as pbs_cfg
+
+if TYPE_CHECKING:
+    import pybaresip.baresip as pbs
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Each segment starts with the magic and the wall clock time at monotonic zero,
+# so record times can be read as dates.
+_MAGIC = b"PBSJ1"
+_SEGMENT = struct.Struct(f"<{len(_MAGIC)}sd")
+# Each record: the length of its fields, its kind, and its time.monotonic().
+_RECORD = struct.Struct("<IBd")
+# D-Bus strings cannot hold NUL, so it separates the fields of a record.
+_SEP = b"\0"
+_NAME = re.compile(r"^journal-(\d{8})\.log(\.gz)?$")
+
+
+class JournalError(ValueError):
+    ...
+
+
+class RecordKind(enum.IntEnum):
+    EVENT = 1
+    MESSAGE = 2
+
+
+class Record(NamedTuple):
+    kind: RecordKind
+    time: float
+    fields: Tuple[str, ...]
+
+
+def _segment_name(seq: int) -> str:
+    return f"journal-{seq:08d}.log"
+
+
+def segments(directory: str) -> List[str]:
+    """
+    The journal's segment files, oldest first. A segment whose compressed copy is
+    still being written is listed uncompressed.
+    """
+    found: dict[int, str] = {}
+    for name in os.listdir(directory):
+        match = _NAME.match(name)
+        if match is None:
+            continue
+        seq = int(match.group(1))
+        if seq not in found or not match.group(2):
+            found[seq] = name
+    return [os.path.join(directory, found[seq]) for seq in sorted(found)]
+
+
+def _compress(path: str) -> None:
+    try:
+        src = open(path, "rb")
+    except FileNotFoundError:
+        # Pruned before its turn came.
+        return
+    with src, pbs_cfg.atomic_writer(path + ".gz", "wb") as out:
+        with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=6) as gz:
+            shutil.copyfileobj(src, gz, 1024 * 1024)
+    os.unlink(path)
+
+
+def _prune(directory: str, keep: int) -> None:
+    for path in segments(directory)[:-keep]:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def _compress_and_prune(path: str, keep: int | None) -> None:
+    _compress(path)
+    if keep is not None:
+        _prune(os.path.dirname(path), keep)
+
+
+class EventJournal:
+    """
+    An append-only log of the `event` and `message` signals a client receives.
+
+    Pass an instance to `PyBareSIP(journal=...)`. Each signal is stored as it
+    arrived, before it is parsed: a fixed header with the record's length, kind
+    and monotonic time, then the signal's string arguments. Writes are buffered
+    and flushed at most every `flush_interval` seconds, on the next record, so
+    journalling costs a struct.pack and a buffered write per signal.
+
+    The journal is a directory of segments. A segment is closed once it holds
+    `max_bytes`, and then gzipped on a worker thread if `compress` is set. With
+    `max_segments`, the oldest segments are removed to keep at most that many.
+
+    Read it back with `read()`, or feed it through a client with `replay()`.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_segments: int | None = None,
+        compress: bool = True,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_segments = max_segments
+        self.compress = compress
+        self.flush_interval = flush_interval
+        self.records = 0
+        os.makedirs(directory, exist_ok=True)
+        existing = segments(directory)
+        self._seq = 0
+        if existing:
+            match = _NAME.match(os.path.basename(existing[-1]))
+            assert match is not None
+            self._seq = int(match.group(1)) + 1
+        self._file: IO[bytes] | None = None
+        self._size = 0
+        self._flushed = 0.0
+        self._compressor: concurrent.futures.ThreadPoolExecutor | None = None
+        self._pending: List[concurrent.futures.Future[None]] = []
+
+    def event(self, klass: str, evtype: str, param: str) -> None:
+        self._append(RecordKind.EVENT, (klass, evtype, param))
+
+    def message(self, ua: str, peer: str, ctype: str, body: str) -> None:
+        self._append(RecordKind.MESSAGE, (ua, peer, ctype, body))
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+        self._flushed = time.monotonic()
+
+    def rotate(self) -> None:
+        """
+        Closes the current segment; the next record starts a new one.
+        """
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        path = os.path.join(self.directory, _segment_name(self._seq))
+        self._seq += 1
+        if not self.compress:
+            if self.max_segments is not None:
+                _prune(self.directory, self.max_segments)
+            return
+        # Pruned after compressing, on the same thread, so neither trips the other.
+        if self._compressor is None:
+            self._compressor = concurrent.futures.ThreadPoolExecutor(
+                1, thread_name_prefix="pybaresip-journal"
+            )
+        self._pending = [f for f in self._pending if not f.done()]
+        self._pending.append(
+            self._compressor.submit(_compress_and_prune, path, self.max_segments)
+        )
+
+    def close(self) -> None:
+        """
+        Writes out the current segment and waits for compression to finish.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._compressor is not None:
+            self._compressor.shutdown(wait=True)
+            self._compressor = None
+        for future in self._pending:
+            if future.exception() is not None:
+                logger.warning(
+                    f"Compressing or pruning the journal failed: {future.exception()}"
+                )
+        self._pending.clear()
+
+    def _append(self, kind: RecordKind, fields: Tuple[str, ...]) -> None:
+        data = _SEP.join(f.encode() for f in fields)
+        now = time.monotonic()
+        if self._file is None:
+            self._open(now)
+        assert self._file is not None
+        self._file.write(_RECORD.pack(len(data), kind, now) + data)
+        self._size += _RECORD.size + len(data)
+        self.records += 1
+        if self._size >= self.max_bytes:
+            self.rotate()
+        elif now - self._flushed >= self.flush_interval:
+            self.flush()
+
+    def _open(self, now: float) -> None:
+        path = os.path.join(self.directory, _segment_name(self._seq))
+        self._file = open(path, "ab")
+        self._size = self._file.tell()
+        if not self._size:
+            self._file.write(_SEGMENT.pack(_MAGIC, time.time() - now))
+            self._size = _SEGMENT.size
+        self._flushed = now
+
+
+def _records(buf: Any, path: str) -> Iterator[Record]:
+    if len(buf) < _SEGMENT.size:
+        return
+    magic, _ = _SEGMENT.unpack_from(buf, 0)
+    if magic != _MAGIC:
+        raise JournalError(f"{path} is not a journal segment")
+    offset = _SEGMENT.size
+    end = len(buf)
+    while offset + _RECORD.size <= end:
+        size, kind, when = _RECORD.unpack_from(buf, offset)
+        start = offset + _RECORD.size
+        offset = start + size
+        if offset > end:
+            break
+        fields = bytes(buf[start:offset]).decode().split("\0")
+        yield Record(RecordKind(kind), when, tuple(fields))
+    if offset != end:
+        # A record cut short when the writer stopped; nothing follows it.
+        logger.warning(f"{path} ends with a partial record")
+
+
+def read_segment(path: str) -> Iterator[Record]:
+    """
+    The records in one segment. Uncompressed segments are read through a memory
+    map; compressed ones are decompressed into memory whole.
+    """
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            data = f.read()
+        yield from _records(data, path)
+        return
+    with open(path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            yield from _records(m, path)
+
+
+def read(directory: str) -> Iterator[Record]:
+    """
+    Every record in a journal, oldest first.
+    """
+    for path in segments(directory):
+        yield from read_segment(path)
+
+
+async def replay(
+    client: pbs.PyBareSIP,
+    directory: str,
+    speed: float | None = None,
+    batch: int = 1000,
+) -> int:
+    """
+    Feeds a journal's records to `client` through `_changed_event()` and
+    `_changed_message()`, as if the signals had just arrived, and returns how many
+    there were. The client should not have a journal of its own.
+
+    speed: None replays as fast as possible, yielding to the loop every `batch`
+    records; 1.0 keeps the original gaps between records, 2.0 halves them.
+    """
+    loop = asyncio.get_running_loop()
+    count = 0
+    origin: float | None = None
+    started = loop.time()
+    for record in read(directory):
+        if speed is None:
+            if count % batch == batch - 1:
+                await asyncio.sleep(0)
+        else:
+            if origin is None or record.time < origin:
+                # Times go back across a reboot; carry on from the new origin.
+                origin = record.time
+                started = loop.time()
+            delay = started + (record.time - origin) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if record.kind is RecordKind.EVENT:
+            client._changed_event(*record.fields)
+        else:
+            client._changed_message(*record.fields)
+        count += 1
+    return count
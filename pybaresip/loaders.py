@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import contextlib
+import csv
+import json
+import logging
+import os
+from typing import IO, Any, Iterable, Iterator, Mapping, Tuple, Union
+
+import pybaresip.identity as pbs_id
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+Source = Union[str, "os.PathLike[str]", IO[str]]
+
+_FIELDS = ("user", "password", "gateway", "port", "flags")
+
+
+def identity_from_record(record: Mapping[str, Any]) -> pbs_id.CompactIdentity:
+    """
+    Builds an identity from a mapping with user, password and gateway keys, and
+    optionally port and flags (a mapping). Any other non-empty keys are taken as
+    flags too, which is how flags are given as CSV columns. Integer flag values,
+    e.g. `regint: 0` in YAML, are taken as their digits; any other value that is
+    not a string is rejected.
+    """
+    try:
+        user = record["user"]
+        password = record["password"]
+        gateway = record["gateway"]
+    except KeyError as e:
+        raise pbs_id.IdentityValidationError(f"Missing field {e.args[0]!r}")
+    port = record.get("port") or 5060
+    if isinstance(port, str):
+        if not port.isdigit():
+            raise pbs_id.IdentityValidationError(f"Invalid port {port!r}")
+        port = int(port)
+    flags = dict(record.get("flags") or {})
+    flags.update(
+        (k, v) for k, v in record.items() if k not in _FIELDS and v not in (None, "")
+    )
+    for name, value in flags.items():
+        if isinstance(value, int) and not isinstance(value, bool):
+            flags[name] = str(value)
+    return pbs_id.CompactIdentity(user, password, gateway, flags, port)
+
+
+def load_csv(source: Source, strict: bool = True) -> Iterator[pbs_id.CompactIdentity]:
+    """
+    Yields identities from a CSV file with a header row. user, password and gateway
+    columns are required; port is optional, and every other column is a flag
+    (left out where the cell is empty).
+    """
+    with _open(source) as f:
+        reader = csv.DictReader(f)
+        yield from _validated(((reader.line_num, r) for r in reader), f, strict)
+
+
+def load_jsonl(source: Source, strict: bool = True) -> Iterator[pbs_id.CompactIdentity]:
+    """
+    Yields identities from a file with one JSON object per line, e.g.
+    {"user": "alice", "password": "pw", "gateway": "sip.example.com",
+    "flags": {"regint": "0"}}. Blank lines are skipped.
+    """
+    with _open(source) as f:
+        yield from _validated(_json_lines(f), f, strict)
+
+
+def load_yaml(source: Source, strict: bool = True) -> Iterator[pbs_id.CompactIdentity]:
+    """
+    Yields identities from a YAML file, with the same fields as `load_jsonl()`.
+
+    Each document may be a single identity or a list of them. Documents are read one
+    at a time, so a large file should hold one identity per document (separated by
+    `---`); a single top-level list is parsed whole.
+
+    Needs PyYAML, which is not a dependency of pybaresip.
+    """
+    try:
+        import yaml
+    except ImportError as e:
+        raise ImportError("load_yaml() needs PyYAML: pip install pyyaml") from e
+
+    def records(f: IO[str]) -> Iterator[Tuple[int, Any]]:
+        for n, document in enumerate(yaml.safe_load_all(f), start=1):
+            if isinstance(document, list):
+                yield from ((n, r) for r in document)
+            elif document is not None:
+                yield n, document
+
+    with _open(source) as f:
+        yield from _validated(records(f), f, strict, "document")
+
+
+@contextlib.contextmanager
+def _open(source: Source) -> Iterator[IO[str]]:
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, newline="") as f:
+            yield f
+    else:
+        yield source
+
+
+def _json_lines(f: IO[str]) -> Iterator[Tuple[int, Any]]:
+    for n, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield n, json.loads(line)
+        except ValueError as e:
+            yield n, e
+
+
+def _validated(
+    records: Iterable[Tuple[int, Any]],
+    f: IO[str],
+    strict: bool,
+    unit: str = "line",
+) -> Iterator[pbs_id.CompactIdentity]:
+    """
+    Turns (position, record) pairs into identities. An invalid record raises
+    IdentityValidationError naming the file and position, or, if not `strict`, is
+    logged and skipped.
+    """
+    name = getattr(f, "name", "<stream>")
+    for n, record in records:
+        try:
+            if isinstance(record, Exception):
+                raise pbs_id.IdentityValidationError(str(record))
+            if not isinstance(record, Mapping):
+                raise pbs_id.IdentityValidationError("Expected a mapping")
+            identity = identity_from_record(record)
+        except (TypeError, ValueError) as e:
+            error = pbs_id.IdentityValidationError(f"{name} {unit} {n}: {e}")
+            if strict:
+                raise error from e
+            logger.warning(f"Skipping identity: {error}")
+            continue
+        yield identity
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import dataclasses as dc
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Callable, Deque, Dict, List
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class DispatchMarker:
+    """
+    What the dispatch layer is running on the loop: an event handler or listener,
+    or the code resuming after an invoke(). PyBareSIP sets it; a LoopMonitor reads
+    it from its watchdog thread to say who stalled the loop.
+    """
+
+    __slots__ = ("current", "active")
+
+    def __init__(self) -> None:
+        self.current: Any = None
+        # How many monitors are running; the invoke() marker is only set if any.
+        self.active = 0
+
+    def resumed(self, label: str) -> None:
+        """
+        Marks the loop as running `label` until the task in progress yields.
+        """
+        self.current = label
+        asyncio.get_running_loop().call_soon(self._resumed_done, label)
+
+    def _resumed_done(self, label: str) -> None:
+        if self.current is label:
+            self.current = None
+
+
+marker = DispatchMarker()
+
+
+def describe(handler: Any) -> str:
+    """
+    A short name for what a DispatchMarker holds, for grouping stalls.
+    """
+    if handler is None:
+        return "<unattributed>"
+    if isinstance(handler, str):
+        return handler
+    func = getattr(handler, "__func__", handler)
+    name = getattr(func, "__qualname__", None)
+    if name is None:
+        name = type(handler).__qualname__
+    return f"{getattr(func, '__module__', '?')}.{name}"
+
+
+@dc.dataclass
+class Stall:
+    """
+    started: time.monotonic() of the last heartbeat before the stall.
+    duration: How long the loop was held, or None while it still is.
+    stacks: Samples of the loop thread's stack taken while it was held.
+    """
+
+    started: float
+    handler: str
+    duration: float | None = None
+    stacks: List[List[str]] = dc.field(default_factory=list)
+
+
+@dc.dataclass
+class LoopStats:
+    beats: int = 0
+    late: int = 0
+    max_lag: float = 0.0
+    stalls: int = 0
+
+
+class LoopMonitor:
+    """
+    Measures how late the event loop runs its callbacks, and finds out who held it
+    when it is late by more than `threshold` seconds.
+
+    A heartbeat callback is scheduled every `interval` seconds; how late it runs
+    is the loop's scheduling lag, kept in `stats`. A watchdog thread wakes every
+    `interval` seconds too and compares the clock with the last heartbeat. While
+    the loop answers, that is all either does. Once the heartbeat is more than
+    `threshold` late, the watchdog samples the loop thread's stack, up to
+    `max_samples` times, and notes what the dispatch layer's marker says was
+    running. When the loop comes back, the stall is recorded in `stalls` (the
+    latest `max_stalls` of them), counted against its handler in `counts`, and
+    passed to `on_stall`.
+
+    Start it from the loop it watches, and `close()` it on the same loop.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.1,
+        interval: float = 0.02,
+        stack_limit: int = 30,
+        max_samples: int = 5,
+        max_stalls: int = 100,
+        on_stall: Callable[[Stall], None] | None = None,
+    ) -> None:
+        self.threshold = threshold
+        self.interval = interval
+        self.stack_limit = stack_limit
+        self.max_samples = max_samples
+        self.stats = LoopStats()
+        self.stalls: Deque[Stall] = collections.deque(maxlen=max_stalls)
+        self.counts: Dict[str, int] = {}
+        self._on_stall = on_stall
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._handle: asyncio.TimerHandle | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._loop_thread = 0
+        self._beat_at = 0.0
+        self._due = 0.0
+        # Set by the watchdog while a stall is in progress; closed by the heartbeat.
+        self._stall: Stall | None = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stop.clear()
+        self._beat_at = time.monotonic()
+        self._due = self._beat_at + self.interval
+        self._handle = self._loop.call_later(self.interval, self._beat)
+        self._thread = threading.Thread(
+            target=self._watch, name="pybaresip-loopmon", daemon=True
+        )
+        self._thread.start()
+        marker.active += 1
+
+    def close(self) -> None:
+        if self._loop is None:
+            return
+        marker.active -= 1
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._loop = None
+        self._end_stall(time.monotonic())
+
+    def _beat(self) -> None:
+        now = time.monotonic()
+        lag = now - self._due
+        stats = self.stats
+        stats.beats += 1
+        if lag > stats.max_lag:
+            stats.max_lag = lag
+        if lag > self.threshold:
+            stats.late += 1
+        if self._stall is not None:
+            self._end_stall(now)
+        self._beat_at = now
+        self._due = now + self.interval
+        assert self._loop is not None
+        self._handle = self._loop.call_later(self.interval, self._beat)
+
+    def _end_stall(self, now: float) -> None:
+        with self._lock:
+            stall, self._stall = self._stall, None
+        if stall is None:
+            return
+        stall.duration = now - stall.started
+        self.stalls.append(stall)
+        self.counts[stall.handler] = self.counts.get(stall.handler, 0) + 1
+        self.stats.stalls += 1
+        logger.warning(
+            "Event loop stalled for %.3fs in %s\n%s",
+            stall.duration,
+            stall.handler,
+            "".join(stall.stacks[0]) if stall.stacks else "",
+        )
+        if self._on_stall is not None:
+            try:
+                self._on_stall(stall)
+            except Exception:
+                logger.exception("Stall callback failed")
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            beat_at = self._beat_at
+            if time.monotonic() - beat_at - self.interval < self.threshold:
+                continue
+            with self._lock:
+                stall = self._stall
+                if stall is None or stall.started != beat_at:
+                    stall = self._stall = Stall(beat_at, describe(marker.current))
+            if len(stall.stacks) < self.max_samples:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is not None:
+                    stall.stacks.append(
+                        traceback.format_stack(frame, limit=self.stack_limit)
+                    )
+                del frame
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses as dc
+import datetime
+import enum
+import logging
+import re
+import time
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+import pybaresip.baresip as pbs
+import pybaresip.calls as pbs_calls
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class Action(enum.Enum):
+    ACCEPT = "accept"
+    REJECT = "reject"
+    HANGUP = "hangup"
+    RING = "ring"
+
+
+@dc.dataclass(frozen=True)
+class Rule:
+    """
+    One auto-answer rule. Every condition given must hold for the rule to match.
+
+    caller: A regular expression searched for in the caller's URI.
+    aor: The account being called, exactly as in the event's accountaor.
+    start, end: The time of day the rule applies, end exclusive. A window may wrap
+    past midnight, e.g. 22:00 to 06:00.
+    days: Weekdays the rule applies on, Monday being 0.
+    max_active: Only match while no more than this many other calls are up.
+    screen: A test of the caller's URI, such as `Screener.blocked`.
+    code, reason: The SIP response sent by REJECT.
+    """
+
+    action: Action
+    caller: str | None = None
+    aor: str | None = None
+    start: datetime.time | None = None
+    end: datetime.time | None = None
+    days: frozenset[int] | None = None
+    max_active: int | None = None
+    screen: Callable[[str], bool] | None = None
+    code: int = 486
+    reason: str = "Busy Here"
+
+
+class _Compiled:
+    __slots__ = (
+        "index",
+        "rule",
+        "caller",
+        "start",
+        "end",
+        "days",
+        "max_active",
+        "screen",
+    )
+
+    def __init__(self, index: int, rule: Rule) -> None:
+        self.index = index
+        self.rule = rule
+        self.caller = re.compile(rule.caller).search if rule.caller else None
+        self.start = None if rule.start is None else _minutes(rule.start)
+        self.end = None if rule.end is None else _minutes(rule.end)
+        self.days = rule.days
+        self.max_active = rule.max_active
+        self.screen = rule.screen
+
+    def matches(
+        self, caller: str, minute: int, weekday: int, active: int | None
+    ) -> bool:
+        if self.caller is not None and self.caller(caller) is None:
+            return False
+        if self.days is not None and weekday not in self.days:
+            return False
+        if self.start is not None or self.end is not None:
+            start = self.start or 0
+            end = self.end if self.end is not None else 24 * 60
+            if start <= end:
+                if not start <= minute < end:
+                    return False
+            elif end <= minute < start:
+                return False
+        if self.max_active is not None and (active is None or active > self.max_active):
+            return False
+        # Last, as it is the most expensive test.
+        if self.screen is not None and not self.screen(caller):
+            return False
+        return True
+
+
+def _minutes(t: datetime.time) -> int:
+    return t.hour * 60 + t.minute
+
+
+@dc.dataclass
+class Latency:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+@dc.dataclass
+class PolicyStats:
+    """
+    decide: From the CALL_INCOMING event reaching the engine to the rule chosen.
+    respond: From the event to baresip confirming the command, per action.
+    """
+
+    actions: Dict[Action, int] = dc.field(default_factory=dict)
+    failed: int = 0
+    decide: Latency = dc.field(default_factory=Latency)
+    respond: Dict[Action, Latency] = dc.field(default_factory=dict)
+
+
+class PolicyEngine:
+    """
+    Answers, rejects or hangs up inbound calls as they arrive, by the first matching
+    rule, or leaves them ringing when no rule matches (or the rule says RING).
+
+    Register an instance with `PyBareSIP.add_event_listener()`. Rules are compiled
+    once: caller patterns into regular expressions, time windows into minutes of the
+    day, and the rule list into one list per called AOR, so a decision only looks at
+    the rules that can apply to the call. The command is issued for that call's id
+    straight from the event callback; `stats` records how long that took.
+
+    tracker: Provides the current load for `max_active`. Without one, rules using
+    it never match.
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[Rule],
+        tracker: pbs_calls.CallTracker | None = None,
+        default: Action = Action.RING,
+        now: Callable[[], datetime.datetime] = datetime.datetime.now,
+    ) -> None:
+        self.default = default
+        self.stats = PolicyStats()
+        self._tracker = tracker
+        self._now = now
+        self._tasks: Set[asyncio.Task[None]] = set()
+        self._by_aor: Dict[str, Tuple[_Compiled, ...]] = {}
+        self._any: Tuple[_Compiled, ...] = ()
+        self.load(rules)
+
+    def load(self, rules: Iterable[Rule]) -> None:
+        """
+        Compiles and swaps in a new rule list.
+        """
+        compiled = [_Compiled(i, rule) for i, rule in enumerate(rules)]
+        wildcard = [c for c in compiled if c.rule.aor is None]
+        by_aor: Dict[str, List[_Compiled]] = {}
+        for c in compiled:
+            if c.rule.aor is not None:
+                by_aor.setdefault(c.rule.aor, list(wildcard)).append(c)
+        self._by_aor = {
+            aor: tuple(sorted(ordered, key=lambda c: c.index))
+            for aor, ordered in by_aor.items()
+        }
+        self._any = tuple(wildcard)
+
+    def decide(self, aor: str, caller: str, call_id: str = "") -> Rule | None:
+        """
+        Returns the first rule that matches a call from `caller` to `aor`.
+        """
+        rules = self._by_aor.get(aor, self._any)
+        if not rules:
+            return None
+        now = self._now()
+        minute = now.hour * 60 + now.minute
+        # None without a tracker, so that no `max_active` rule matches.
+        active = None
+        if self._tracker is not None:
+            active = self._tracker.active - (call_id in self._tracker.calls)
+        for c in rules:
+            if c.matches(caller, minute, now.weekday(), active):
+                return c.rule
+        return None
+
+    def __call__(self, client: pbs.PyBareSIP, event: pbs.EventParams) -> None:
+        if event.get("type") != "CALL_INCOMING" or event.get("class") != "call":
+            return
+        received = time.perf_counter()
+        call_id = event.get("id", "")
+        rule = self.decide(
+            event.get("accountaor", ""), event.get("peeruri", ""), call_id
+        )
+        action = rule.action if rule is not None else self.default
+        self.stats.decide.add(time.perf_counter() - received)
+        self.stats.actions[action] = self.stats.actions.get(action, 0) + 1
+        if action is Action.RING or not call_id:
+            return
+        task = asyncio.ensure_future(self._act(client, call_id, action, rule, received))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self) -> None:
+        """
+        Waits for commands already issued to finish.
+        """
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _act(
+        self,
+        client: pbs.PyBareSIP,
+        call_id: str,
+        action: Action,
+        rule: Rule | None,
+        received: float,
+    ) -> None:
+        try:
+            if action is Action.ACCEPT:
+                await client.accept(call_id)
+            elif action is Action.REJECT:
+                code, reason = (rule.code, rule.reason) if rule else (486, "Busy Here")
+                await client.hangup(call_id, code=code, reason=reason)
+            else:
+                await client.hangup(call_id)
+        except Exception as e:
+            self.stats.failed += 1
+            logger.warning(f"Could not {action.value} call {call_id}: {e}")
+            return
+        latency = self.stats.respond.setdefault(action, Latency())
+        latency.add(time.perf_counter() - received)
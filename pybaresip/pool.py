@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Set
+
+import pybaresip.baresip as pbs
+import pybaresip.calls as pbs_calls
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class _Member:
+    __slots__ = ("client", "tracker", "dialing", "failures", "healthy", "connected")
+
+    def __init__(self, client: pbs.PyBareSIP) -> None:
+        self.client = client
+        self.tracker = pbs_calls.CallTracker()
+        self.dialing = 0
+        self.failures = 0
+        self.healthy = True
+        # Cleared when BaresipPool.connect() fails; the probe then connects.
+        self.connected = True
+
+    @property
+    def load(self) -> int:
+        # Dials still waiting for their CALL_OUTGOING event count as calls.
+        return self.tracker.active + self.dialing
+
+
+class BaresipPool:
+    """
+    Spreads work over several baresip instances, each reached through its own
+    `PyBareSIP` client (typically with distinct bus names).
+
+    * `dial()` goes to the healthy instance with the fewest live calls, as counted
+      from call events.
+    * `broadcast()`, `insmod()` and `conf_reload()` go to every healthy instance.
+    * `events()` merges the event streams of all instances.
+
+    An instance is ejected after `failure_threshold` consecutive failed commands.
+    While ejected it is probed with `about` every `probe_interval` seconds, and
+    re-admitted on the first success. An instance that could not be reached by
+    `connect()` is probed by connecting again instead.
+    """
+
+    def __init__(
+        self,
+        clients: Iterable[pbs.PyBareSIP],
+        failure_threshold: int = 3,
+        probe_interval: float = 5.0,
+        event_queue_size: int = 1000,
+    ) -> None:
+        self._members = [_Member(c) for c in clients]
+        self._by_client = {id(m.client): m for m in self._members}
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self._event_queue_size = event_queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._probe_task: asyncio.Future | None = None
+        for member in self._members:
+            member.client.add_event_listener(member.tracker)
+            member.client.add_event_listener(self._forward_event)
+
+    @property
+    def clients(self) -> list[pbs.PyBareSIP]:
+        return [m.client for m in self._members]
+
+    @property
+    def healthy(self) -> list[pbs.PyBareSIP]:
+        return [m.client for m in self._members if m.healthy]
+
+    def tracker(self, client: pbs.PyBareSIP) -> pbs_calls.CallTracker:
+        return self._by_client[id(client)].tracker
+
+    async def connect(self) -> None:
+        """
+        Connects every client. Instances that cannot be reached start out ejected.
+        """
+        results = await asyncio.gather(
+            *(m.client.connect() for m in self._members), return_exceptions=True
+        )
+        for member, result in zip(self._members, results):
+            if isinstance(result, Exception):
+                logger.warning(f"{member.client.bus_name} failed to connect: {result}")
+                member.connected = False
+                self._eject(member)
+        if not any(m.healthy for m in self._members):
+            raise Exception("No baresip instance in the pool could be reached")
+
+    async def close(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+
+    def least_loaded(self) -> pbs.PyBareSIP:
+        return self._least_loaded().client
+
+    def _least_loaded(self) -> _Member:
+        best = None
+        for member in self._members:
+            if member.healthy and (best is None or member.load < best.load):
+                best = member
+        if best is None:
+            raise Exception("No healthy baresip instance in the pool")
+        return best
+
+    async def dial(
+        self, destination: str, deadline: float | None = None
+    ) -> tuple[pbs.PyBareSIP, str]:
+        """
+        Dials through the least-loaded instance, returning it with baresip's response.
+        """
+        member = self._least_loaded()
+        member.dialing += 1
+        try:
+            response = await self._run(
+                member, member.client.dial(destination, deadline=deadline)
+            )
+        finally:
+            member.dialing -= 1
+        return member.client, response
+
+    async def broadcast(
+        self, command: Callable[[pbs.PyBareSIP], Awaitable[str]]
+    ) -> Dict[pbs.PyBareSIP, str | BaseException]:
+        """
+        Runs `command(client)` on every healthy instance concurrently, e.g.
+        `await pool.broadcast(lambda c: c.insmod("g722"))`.
+
+        Failures are returned in place of the response rather than raised.
+        """
+        members = [m for m in self._members if m.healthy]
+        results = await asyncio.gather(
+            *(self._run(m, command(m.client)) for m in members),
+            return_exceptions=True,
+        )
+        return {m.client: r for m, r in zip(members, results)}
+
+    async def insmod(self, module: str) -> Dict[pbs.PyBareSIP, str | BaseException]:
+        return await self.broadcast(lambda c: c.insmod(module))
+
+    async def conf_reload(self) -> Dict[pbs.PyBareSIP, str | BaseException]:
+        return await self.broadcast(lambda c: c.conf_reload())
+
+    async def events(self) -> AsyncIterator[tuple[pbs.PyBareSIP, pbs.EventParams]]:
+        """
+        Yields (client, event) for events from every instance in the pool.
+
+        Each subscriber has its own bounded queue. A subscriber that falls behind
+        loses the oldest events rather than holding up the others.
+        """
+        queue: asyncio.Queue = asyncio.Queue(self._event_queue_size)
+        self._subscribers.add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers.discard(queue)
+
+    def _forward_event(self, client: pbs.PyBareSIP, event: pbs.EventParams) -> None:
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait((client, event))
+
+    async def _run(self, member: _Member, command: Awaitable[str]) -> str:
+        try:
+            response = await command
+        except Exception:
+            member.failures += 1
+            if member.healthy and member.failures >= self.failure_threshold:
+                self._eject(member)
+            raise
+        member.failures = 0
+        return response
+
+    def _eject(self, member: _Member) -> None:
+        logger.warning(f"Ejecting {member.client.bus_name} from the pool")
+        member.healthy = False
+        if self._probe_task is None:
+            self._probe_task = asyncio.ensure_future(self._probe())
+
+    async def _probe(self) -> None:
+        while True:
+            ejected = [m for m in self._members if not m.healthy]
+            if not ejected:
+                self._probe_task = None
+                return
+            await asyncio.sleep(self.probe_interval)
+            deadline = pbs.deadline_after(self.probe_interval)
+            results = await asyncio.gather(
+                *(
+                    (
+                        m.client.about(deadline=deadline)
+                        if m.connected
+                        else asyncio.wait_for(m.client.connect(), self.probe_interval)
+                    )
+                    for m in ejected
+                ),
+                return_exceptions=True,
+            )
+            for member, result in zip(ejected, results):
+                if not isinstance(result, BaseException):
+                    logger.info(f"Re-admitting {member.client.bus_name} to the pool")
+                    member.connected = True
+                    member.failures = 0
+                    member.healthy = True
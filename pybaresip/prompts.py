@@ -0,0 +1,387 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import dataclasses as dc
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import wave
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple
+
+import pybaresip.config as pbs_cfg
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+_CHUNK = struct.Struct("<4sI")
+_FMT = struct.Struct("<HHIIHH")
+_PCM = 1
+_EXTENSIBLE = 0xFFFE
+
+
+class PromptError(ValueError):
+    ...
+
+
+@dc.dataclass(frozen=True)
+class PromptFormat:
+    """
+    The audio format prompts are normalised to: 16-bit PCM WAV at `sample_rate`
+    with `channels` channels.
+    """
+
+    sample_rate: int = 8000
+    channels: int = 1
+
+    @classmethod
+    def from_config(cls, config: pbs_cfg.BaresipConfig) -> PromptFormat:
+        """
+        The player format set in a BaresipConfig's extra lines (auplay_srate and
+        auplay_channels), falling back to narrowband mono.
+        """
+        return cls(
+            sample_rate=int(config.extra.get("auplay_srate", cls.sample_rate)),
+            channels=int(config.extra.get("auplay_channels", cls.channels)),
+        )
+
+
+@dc.dataclass(frozen=True)
+class PromptInfo:
+    name: str
+    path: str
+    sha256: str
+    duration: float
+    peak_dbfs: float
+    converted: bool
+
+
+@dc.dataclass
+class ScanReport:
+    total: int = 0
+    unchanged: int = 0
+    normalised: int = 0
+    removed: int = 0
+    failed: int = 0
+
+
+def require_numpy(feature: str = "The prompt library") -> Any:
+    """
+    Imports numpy, which is an optional dependency of pybaresip's audio features.
+    """
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError(f"{feature} needs numpy: pip install pybaresip[audio]") from e
+    return numpy
+
+
+def wav_layout(buf: Any) -> Tuple[int, int, int, int, int, int]:
+    """
+    Finds the format and sample data in a WAV file's bytes without copying them:
+    returns the format tag, channels, sample rate, bits per sample, and the data's
+    offset and size.
+    """
+    if len(buf) < 12 or buf[0:4] != b"RIFF" or buf[8:12] != b"WAVE":
+        raise PromptError("Not a WAV file")
+    offset = 12
+    fmt: Tuple[int, ...] | None = None
+    while offset + _CHUNK.size <= len(buf):
+        chunk, size = _CHUNK.unpack_from(buf, offset)
+        offset += _CHUNK.size
+        if chunk == b"fmt ":
+            if offset + _FMT.size > len(buf):
+                raise PromptError("WAV format is cut short")
+            fmt = _FMT.unpack_from(buf, offset)
+        elif chunk == b"data":
+            if fmt is None:
+                raise PromptError("WAV data comes before its format")
+            tag, channels, rate, _, _, bits = fmt
+            size = min(size, len(buf) - offset)
+            return tag, channels, rate, bits, offset, size
+        # Chunks are padded to an even length.
+        offset += size + (size & 1)
+    raise PromptError("WAV file has no data")
+
+
+def _samples(buf: Any) -> Tuple[np.ndarray, int, int, bool]:
+    """
+    Returns the samples in a WAV file's bytes as an array of (frames, channels)
+    floats in [-1, 1), the sample rate, and whether they were 16-bit PCM already.
+    Reads in place from `buf`.
+    """
+    numpy = require_numpy()
+    tag, channels, rate, bits, offset, size = wav_layout(buf)
+    if tag not in (_PCM, _EXTENSIBLE) or bits not in (8, 16, 32):
+        raise PromptError(f"Unsupported WAV encoding {tag} with {bits} bits")
+    width = bits // 8
+    count = size // (width * channels) * channels
+    dtype = {1: numpy.uint8, 2: "<i2", 4: "<i4"}[width]
+    raw = numpy.frombuffer(buf, dtype=dtype, count=count, offset=offset)
+    if width == 1:
+        data = (raw.astype(numpy.float32) - 128) / 128
+    else:
+        data = raw.astype(numpy.float32) / float(1 << (bits - 1))
+    return data.reshape(-1, channels), rate, channels, bits == 16
+
+
+def _low_pass(data: np.ndarray, cutoff: float, width: int) -> np.ndarray:
+    """
+    Filters (frames, channels) `data` with a Kaiser-windowed sinc of `2 * width + 1`
+    taps, passing frequencies below `cutoff` (a fraction of the sample rate), by
+    FFT convolution.
+    """
+    numpy = require_numpy()
+    n = numpy.arange(-width, width + 1)
+    taps = 2 * cutoff * numpy.sinc(2 * cutoff * n) * numpy.kaiser(len(n), 8.6)
+    taps /= taps.sum()
+    length = len(data) + len(taps) - 1
+    size = 1 << (length - 1).bit_length()
+    spectrum = numpy.fft.rfft(data, size, axis=0)
+    spectrum *= numpy.fft.rfft(taps, size)[:, None]
+    filtered = numpy.fft.irfft(spectrum, size, axis=0)
+    end = width + len(data)
+    return filtered[width:end]
+
+
+def _convert(data: np.ndarray, rate: int, fmt: PromptFormat) -> np.ndarray:
+    numpy = require_numpy()
+    if data.shape[1] != fmt.channels:
+        mono = data.mean(axis=1, keepdims=True)
+        data = numpy.repeat(mono, fmt.channels, axis=1)
+    if fmt.sample_rate < rate and len(data):
+        # Anything above the new Nyquist frequency would fold back into the band
+        # the caller hears, so it is filtered out before the samples are dropped.
+        # The cut is at 90% of it, with a transition band of about 8% of the new
+        # rate (32 output samples each side).
+        ratio = fmt.sample_rate / rate
+        data = _low_pass(data, 0.45 * ratio, math.ceil(32 / ratio))
+    if rate != fmt.sample_rate and len(data):
+        frames = max(1, round(len(data) * fmt.sample_rate / rate))
+        old = numpy.arange(len(data)) / rate
+        new = numpy.arange(frames) / fmt.sample_rate
+        data = numpy.stack(
+            [numpy.interp(new, old, data[:, c]) for c in range(fmt.channels)], axis=1
+        )
+    pcm = numpy.clip(numpy.round(data * 32768), -32768, 32767)
+    return pcm.astype("<i2")
+
+
+def analyse(path: str) -> Tuple[float, float]:
+    """
+    Returns the duration in seconds and the peak level in dBFS of a 16-bit WAV
+    file, reading the samples through a memory map.
+    """
+    numpy = require_numpy()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        tag, channels, rate, bits, offset, size = wav_layout(m)
+        if bits != 16:
+            raise PromptError(f"{path} is not 16-bit")
+        samples = numpy.frombuffer(m, dtype="<i2", count=size // 2, offset=offset)
+        peak = int(numpy.abs(samples.astype(numpy.int32)).max()) if size else 0
+        # The array is a view of the map, which cannot close while it exists.
+        del samples
+    duration = size / (2 * channels * rate)
+    return duration, 20 * math.log10(peak / 32768) if peak else -math.inf
+
+
+def normalise(
+    source: str, destination: str, fmt: PromptFormat, known: str | None = None
+) -> Dict[str, Any] | None:
+    """
+    Writes `source` to `destination` in `fmt` and returns its hash and analysis.
+    Files already in `fmt` are copied unchanged. Returns None, without writing,
+    when the file's hash is `known` and `destination` exists. Runs in a worker
+    process.
+    """
+    with open(source, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            raise PromptError(f"{source} is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            digest = hashlib.sha256(m).hexdigest()
+            if digest == known and os.path.exists(destination):
+                return None
+            data, rate, channels, pcm16 = _samples(m)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            converted = not (
+                pcm16 and rate == fmt.sample_rate and channels == fmt.channels
+            )
+            with pbs_cfg.atomic_writer(destination, "wb") as out:
+                if converted:
+                    pcm = _convert(data, rate, fmt)
+                    with wave.open(out, "wb") as w:
+                        w.setnchannels(fmt.channels)
+                        w.setsampwidth(2)
+                        w.setframerate(fmt.sample_rate)
+                        w.writeframes(pcm.tobytes())
+                else:
+                    out.write(m)
+            del data
+    duration, peak = analyse(destination)
+    return {
+        "sha256": digest,
+        "duration": duration,
+        "peak_dbfs": peak,
+        "converted": converted,
+    }
+
+
+class PromptLibrary:
+    """
+    A directory of prompts, normalised for baresip into `output_dir`.
+
+    `scan()` walks `source_dir` for WAV files and writes each one to the same
+    relative path under `output_dir` in `fmt`, converting the sample rate, channels
+    and sample width as needed, in a process pool so the bus loop carries on. A
+    manifest in `output_dir` records each file's size, mtime and SHA-256, so a
+    later scan only normalises files whose size or mtime changed and whose content
+    really did. Durations and peak levels are measured from memory-mapped samples.
+
+    Play prompts with `PyBareSIP.play(library.path(name))`, where `name` is the
+    path relative to `source_dir`.
+    """
+
+    def __init__(
+        self,
+        source_dir: str,
+        output_dir: str,
+        fmt: PromptFormat | None = None,
+        workers: int | None = None,
+    ) -> None:
+        self.source_dir = source_dir
+        self.output_dir = output_dir
+        self.fmt = fmt or PromptFormat()
+        self._workers = workers
+        self._manifest: Dict[str, Dict[str, Any]] = {}
+        self._load_manifest()
+
+    def __len__(self) -> int:
+        return len(self._manifest)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._manifest
+
+    def names(self) -> List[str]:
+        return sorted(self._manifest)
+
+    def path(self, name: str) -> str:
+        if name not in self._manifest:
+            raise KeyError(f"No prompt called {name}")
+        return os.path.join(self.output_dir, name)
+
+    def info(self, name: str) -> PromptInfo:
+        entry = self._manifest[name]
+        return PromptInfo(
+            name=name,
+            path=self.path(name),
+            sha256=entry["sha256"],
+            duration=entry["duration"],
+            peak_dbfs=entry["peak_dbfs"],
+            converted=entry["converted"],
+        )
+
+    async def scan(
+        self, executor: concurrent.futures.Executor | None = None
+    ) -> ScanReport:
+        """
+        Brings `output_dir` and the manifest up to date with `source_dir`.
+        """
+        loop = asyncio.get_running_loop()
+        report = ScanReport()
+        found = await loop.run_in_executor(None, lambda: list(self._walk()))
+        report.total = len(found)
+        target = [self.fmt.sample_rate, self.fmt.channels]
+        stale: List[Tuple[str, os.stat_result, str | None]] = []
+        for name, st in found:
+            entry = self._manifest.get(name)
+            if entry is None or entry["format"] != target:
+                stale.append((name, st, None))
+            elif entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+                # Possibly only touched: the worker compares the hash first.
+                stale.append((name, st, entry["sha256"]))
+            else:
+                report.unchanged += 1
+
+        if stale:
+            own = executor is None
+            pool = executor or concurrent.futures.ProcessPoolExecutor(self._workers)
+            try:
+                results = await asyncio.gather(
+                    *(
+                        loop.run_in_executor(
+                            pool,
+                            normalise,
+                            os.path.join(self.source_dir, name),
+                            os.path.join(self.output_dir, name),
+                            self.fmt,
+                            known,
+                        )
+                        for name, _, known in stale
+                    ),
+                    return_exceptions=True,
+                )
+            finally:
+                if own:
+                    pool.shutdown(wait=False)
+            for (name, st, _), result in zip(stale, results):
+                if isinstance(result, BaseException):
+                    logger.warning(f"Could not normalise prompt {name}: {result}")
+                    report.failed += 1
+                    self._manifest.pop(name, None)
+                    continue
+                if result is None:
+                    report.unchanged += 1
+                    result = self._manifest[name]
+                else:
+                    report.normalised += 1
+                self._manifest[name] = {
+                    **result,
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "format": target,
+                }
+
+        present = {name for name, _ in found}
+        for name in [n for n in self._manifest if n not in present]:
+            del self._manifest[name]
+            report.removed += 1
+            try:
+                os.unlink(os.path.join(self.output_dir, name))
+            except FileNotFoundError:
+                pass
+        if stale or report.removed:
+            self._save_manifest()
+        logger.info(
+            f"Prompt library: {report.total} prompts, {report.normalised} normalised, "
+            f"{report.removed} removed, {report.failed} failed"
+        )
+        return report
+
+    def _walk(self) -> Iterator[Tuple[str, os.stat_result]]:
+        for root, _, files in os.walk(self.source_dir):
+            for filename in files:
+                if filename.lower().endswith(".wav"):
+                    path = os.path.join(root, filename)
+                    yield os.path.relpath(path, self.source_dir), os.stat(path)
+
+    def _load_manifest(self) -> None:
+        path = os.path.join(self.output_dir, MANIFEST)
+        try:
+            with open(path) as f:
+                self._manifest = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable prompt manifest {path}: {e}")
+
+    def _save_manifest(self) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        with pbs_cfg.atomic_writer(os.path.join(self.output_dir, MANIFEST)) as f:
+            json.dump(self._manifest, f, indent=1, sort_keys=True)
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import dataclasses as dc
+import enum
+import logging
+import os
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Tuple,
+)
+
+import pybaresip.config as pbs_cfg
+import pybaresip.identity as pbs_id
+
+if TYPE_CHECKING:
+    import pybaresip.baresip as pbs
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+@dc.dataclass
+class SyncPlan:
+    """
+    What `PyBareSIP.sync_identities()` has to do to make baresip match the desired
+    identities.
+
+    update holds identities whose flags (including the password) changed; they are
+    deleted and recreated. unverified holds AORs that baresip has but this client
+    did not create, so their flags cannot be compared; they are left alone.
+    """
+
+    create: List[pbs_id.AnyIdentity] = dc.field(default_factory=list)
+    update: List[pbs_id.AnyIdentity] = dc.field(default_factory=list)
+    delete: List[str] = dc.field(default_factory=list)
+    unverified: List[str] = dc.field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def changes(self) -> int:
+        return len(self.create) + len(self.update) + len(self.delete)
+
+
+@dc.dataclass
+class SyncReport:
+    """
+    failed: (AOR, error) for each change that failed, the error as text with the
+    account's secrets masked.
+    """
+
+    created: List[str] = dc.field(default_factory=list)
+    updated: List[str] = dc.field(default_factory=list)
+    deleted: List[str] = dc.field(default_factory=list)
+    unverified: List[str] = dc.field(default_factory=list)
+    unchanged: int = 0
+    failed: List[Tuple[str, str]] = dc.field(default_factory=list)
+
+
+def plan_sync(
+    current: Iterable[str],
+    applied: Mapping[str, str],
+    desired: Iterable[pbs_id.AnyIdentity],
+    prune: bool = True,
+) -> SyncPlan:
+    """
+    Diffs the AORs baresip currently has against the desired identities.
+
+    applied: AOR -> the `uanew` command this client last issued for it, which is the
+    only record of an agent's flags, since baresip does not report them.
+
+    prune: Delete agents baresip has that are not in `desired`.
+    """
+    plan = SyncPlan()
+    remaining = set(current)
+    seen = set()
+    for identity in desired:
+        aor = identity.aor
+        if aor in seen:
+            continue
+        seen.add(aor)
+        if aor not in remaining:
+            plan.create.append(identity)
+            continue
+        remaining.discard(aor)
+        command = applied.get(aor)
+        if command is None:
+            plan.unverified.append(aor)
+        elif command != f"uanew {identity.sip}":
+            plan.update.append(identity)
+        else:
+            plan.unchanged += 1
+    if prune:
+        plan.delete.extend(sorted(remaining))
+    return plan
+
+
+class ProvisionMethod(enum.Enum):
+    FILE = "file"
+    INCREMENTAL = "incremental"
+
+
+@dc.dataclass
+class ProvisionReport:
+    """
+    written: Lines in the new `accounts` file.
+    sync: The result of the incremental commands; None when the file was loaded.
+    missing: AORs in the file that baresip did not have after loading it.
+    """
+
+    method: ProvisionMethod
+    plan: SyncPlan
+    written: int
+    sync: SyncReport | None = None
+    missing: List[str] = dc.field(default_factory=list)
+
+
+class AccountsProvisioner:
+    """
+    Makes a baresip instance's User-Agents match a set of identities, choosing the
+    cheaper of two routes.
+
+    Every call rewrites `<config_dir>/accounts` atomically with the identities, so a
+    restarted baresip comes up with all of them without a single `uanew`. If the
+    diff has at least `threshold` changes, `reload` is awaited to have baresip load
+    that file instead of being sent one `uanew` per account; otherwise the diff is
+    applied with `PyBareSIP.apply_sync_plan()`.
+
+    reload: Defaults to the client's `conf_reload()`. baresip releases that only
+    re-read `config` on `conf_reload` need a restart instead, e.g. a function that
+    stops and starts the `BaresipSupervisor` managing the instance.
+    config: Also (re)written to `config_dir` before reloading, if given.
+    """
+
+    def __init__(
+        self,
+        client: pbs.PyBareSIP,
+        config_dir: str,
+        threshold: int = 500,
+        reload: Callable[[], Awaitable[object]] | None = None,
+        config: pbs_cfg.BaresipConfig | None = None,
+        rate: float = 20.0,
+        concurrency: int = 8,
+    ) -> None:
+        self._client = client
+        self.config_dir = config_dir
+        self.threshold = threshold
+        self._reload = reload if reload is not None else client.conf_reload
+        self._config = config
+        self._rate = rate
+        self._concurrency = concurrency
+
+    @property
+    def accounts_path(self) -> str:
+        return os.path.join(self.config_dir, "accounts")
+
+    async def provision(
+        self, identities: Iterable[pbs_id.AnyIdentity], prune: bool = True
+    ) -> ProvisionReport:
+        current = await self._client.user_agents()
+        commands: Dict[str, str] = {}
+
+        def rendered(f: IO[str]) -> Iterator[pbs_id.AnyIdentity]:
+            # Planning and writing the file share a single pass over identities.
+            for identity in identities:
+                if identity.aor in commands:
+                    continue
+                commands[identity.aor] = f"uanew {identity.sip}"
+                f.write(identity.sip)
+                f.write("\n")
+                yield identity
+
+        os.makedirs(self.config_dir, exist_ok=True)
+        with pbs_cfg.atomic_writer(self.accounts_path) as f:
+            plan = plan_sync(
+                current, self._client._state.user_agents, rendered(f), prune=prune
+            )
+
+        if plan.changes < self.threshold:
+            sync = await self._client.apply_sync_plan(
+                plan, rate=self._rate, concurrency=self._concurrency
+            )
+            return ProvisionReport(
+                ProvisionMethod.INCREMENTAL, plan, len(commands), sync
+            )
+
+        if self._config is not None:
+            pbs_cfg.write_config_dir(self.config_dir, self._config)
+        logger.info(
+            f"Loading {len(commands)} accounts from {self.accounts_path} "
+            f"for {plan.changes} changes"
+        )
+        await self._reload()
+        # Only what baresip reports having loaded goes into the replay state.
+        loaded = set(await self._client.user_agents())
+        state = self._client._state
+        missing = []
+        for aor in plan.delete:
+            state.record(f"uadel {aor}")
+        for aor, command in commands.items():
+            if aor in loaded:
+                state.record(command)
+            else:
+                state.record(f"uadel {aor}")
+                missing.append(aor)
+        if missing:
+            logger.warning(
+                f"{len(missing)} of {len(commands)} accounts in {self.accounts_path} "
+                f"were not loaded, e.g. {missing[0]}"
+            )
+        return ProvisionReport(
+            ProvisionMethod.FILE, plan, len(commands), missing=missing
+        )
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import dataclasses as dc
+import enum
+import time
+from typing import AsyncIterator, Deque, Dict, Mapping, Tuple
+
+import pybaresip.calls as pbs_calls
+import pybaresip.exceptions as pbs_ex
+
+
+class TokenBucket:
+    """
+    A token bucket: `rate` tokens per second, holding at most `capacity`.
+
+    Refills are computed lazily from the time elapsed since the last call, so every
+    operation is O(1) no matter how many buckets exist.
+    """
+
+    __slots__ = ("rate", "capacity", "_tokens", "_updated")
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        tokens = self._tokens + (now - self._updated) * self.rate
+        self._tokens = tokens if tokens < self.capacity else self.capacity
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill(time.monotonic())
+        return self._tokens
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """
+        Takes `tokens` if they are available, without waiting.
+        """
+        self._refill(time.monotonic())
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def delay(self, tokens: float = 1.0) -> float:
+        """
+        Returns how long to wait until `tokens` are available.
+        """
+        self._refill(time.monotonic())
+        missing = tokens - self._tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Waits until `tokens` are available and takes them.
+        """
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(self.delay(tokens))
+
+
+class AdmissionMode(enum.Enum):
+    QUEUE = "queue"
+    REJECT = "reject"
+
+
+class AdmissionScope(enum.Enum):
+    GLOBAL = "global"
+    IDENTITY = "identity"
+    GATEWAY = "gateway"
+
+
+@dc.dataclass(frozen=True)
+class CallLimit:
+    """
+    rate: New calls per second. burst: How many may start at once (the bucket
+    capacity); defaults to one second's worth.
+    max_concurrent: Calls up at the same time, as counted by the CallTracker.
+    """
+
+    rate: float | None = None
+    burst: float | None = None
+    max_concurrent: int | None = None
+
+
+@dc.dataclass
+class AdmissionStats:
+    admitted: int = 0
+    queued: int = 0
+    rejected: int = 0
+
+
+_Key = Tuple[AdmissionScope, str]
+
+
+class AdmissionController:
+    """
+    Admits outbound calls against call-rate and concurrent-call limits per identity,
+    per gateway and globally.
+
+    Concurrency is the CallTracker's live count plus the dials admitted but not yet
+    returned, so bursts are counted before baresip reports the calls. In QUEUE mode
+    a call over its limits waits: for a rate limit until the bucket refills, for a
+    concurrency limit in a FIFO per limit that is woken one at a time as calls close.
+    In REJECT mode (or after `max_wait` seconds) AdmissionError is raised instead.
+
+    Buckets and counters are kept in dicts keyed by scope, so admitting a call costs
+    the same however many identities, gateways and waiters there are.
+    """
+
+    def __init__(
+        self,
+        tracker: pbs_calls.CallTracker,
+        global_limit: CallLimit | None = None,
+        identity_limit: CallLimit | None = None,
+        gateway_limit: CallLimit | None = None,
+        identity_limits: Mapping[str, CallLimit] | None = None,
+        gateway_limits: Mapping[str, CallLimit] | None = None,
+        mode: AdmissionMode = AdmissionMode.QUEUE,
+        max_wait: float | None = None,
+    ) -> None:
+        self._tracker = tracker
+        self._global = global_limit
+        self._default = {
+            AdmissionScope.IDENTITY: identity_limit,
+            AdmissionScope.GATEWAY: gateway_limit,
+        }
+        self._limits = {
+            AdmissionScope.IDENTITY: dict(identity_limits or {}),
+            AdmissionScope.GATEWAY: dict(gateway_limits or {}),
+        }
+        self.mode = mode
+        self.max_wait = max_wait
+        self.stats = AdmissionStats()
+        self._buckets: Dict[_Key, TokenBucket] = {}
+        self._pending: Dict[_Key, int] = {}
+        self._waiters: Dict[_Key, Deque[asyncio.Future[None]]] = {}
+        tracker.add_closed_listener(self._call_closed)
+
+    def close(self) -> None:
+        self._tracker.remove_closed_listener(self._call_closed)
+
+    @contextlib.asynccontextmanager
+    async def admit(self, account: str, gateway: str) -> AsyncIterator[None]:
+        """
+        Holds an admission for `account` dialing through `gateway` for the duration
+        of the block, which should cover the dial command. An empty account (baresip
+        chooses) is only held to the gateway and global limits.
+        """
+        keys = self._keys(account, gateway)
+        await self._acquire(keys)
+        try:
+            yield
+        finally:
+            for key, _ in keys:
+                self._pending[key] -= 1
+                if not self._pending[key]:
+                    del self._pending[key]
+                self._wake(key)
+
+    def _keys(self, account: str, gateway: str) -> list[Tuple[_Key, CallLimit]]:
+        keys = []
+        if self._global is not None:
+            keys.append(((AdmissionScope.GLOBAL, ""), self._global))
+        for scope, name in (
+            (AdmissionScope.IDENTITY, account),
+            (AdmissionScope.GATEWAY, gateway),
+        ):
+            if not name:
+                continue
+            limit = self._limits[scope].get(name, self._default[scope])
+            if limit is not None:
+                keys.append(((scope, name), limit))
+        return keys
+
+    def _active(self, key: _Key) -> int:
+        scope, name = key
+        if scope is AdmissionScope.GLOBAL:
+            active = self._tracker.active
+        elif scope is AdmissionScope.IDENTITY:
+            active = self._tracker.active_for(name)
+        else:
+            active = self._tracker.active_via(name)
+        return active + self._pending.get(key, 0)
+
+    def _try(self, keys: list[Tuple[_Key, CallLimit]]) -> Tuple[_Key, float] | None:
+        """
+        Admits the call if every limit allows it. Otherwise returns the limit in the
+        way and how long to wait for it; 0 means until a call ends.
+        """
+        for key, limit in keys:
+            if limit.max_concurrent is not None:
+                if self._active(key) >= limit.max_concurrent:
+                    return key, 0.0
+        buckets = []
+        for key, limit in keys:
+            if limit.rate is not None:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = self._buckets[key] = TokenBucket(limit.rate, limit.burst)
+                delay = bucket.delay()
+                if delay > 0:
+                    return key, delay
+                buckets.append(bucket)
+        # Tokens are only taken once every bucket has one, so a call refused by one
+        # limit does not use up the others.
+        for bucket in buckets:
+            bucket.try_acquire()
+        for key, _ in keys:
+            self._pending[key] = self._pending.get(key, 0) + 1
+        return None
+
+    async def _acquire(self, keys: list[Tuple[_Key, CallLimit]]) -> None:
+        blocked = self._try(keys)
+        if blocked is None:
+            self.stats.admitted += 1
+            return
+        if self.mode is AdmissionMode.REJECT:
+            self.stats.rejected += 1
+            raise pbs_ex.AdmissionError(*blocked[0])
+
+        loop = asyncio.get_running_loop()
+        until = None if self.max_wait is None else loop.time() + self.max_wait
+        self.stats.queued += 1
+        woken = False
+        while blocked is not None:
+            key, delay = blocked
+            remaining = None if until is None else until - loop.time()
+            if remaining is not None and remaining <= 0:
+                self.stats.rejected += 1
+                raise pbs_ex.AdmissionError(*key)
+            if delay:
+                await asyncio.sleep(
+                    delay if remaining is None else min(delay, remaining)
+                )
+            else:
+                woken = await self._wait(key, remaining, first=woken)
+            blocked = self._try(keys)
+        self.stats.admitted += 1
+
+    async def _wait(self, key: _Key, timeout: float | None, first: bool) -> bool:
+        """
+        Waits for a call counted against `key` to end. A waiter that was woken but
+        is still over the limit goes back to the front of the queue.
+        """
+        fut = asyncio.get_running_loop().create_future()
+        waiters = self._waiters.setdefault(key, collections.deque())
+        if first:
+            waiters.appendleft(fut)
+        else:
+            waiters.append(fut)
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout)
+        except asyncio.TimeoutError:
+            pass
+        except BaseException:
+            if fut.done():
+                self._wake(key)
+            raise
+        finally:
+            if not fut.done():
+                fut.cancel()
+                waiters.remove(fut)
+            if not waiters and self._waiters.get(key) is waiters:
+                del self._waiters[key]
+        return fut.done() and not fut.cancelled()
+
+    def _wake(self, key: _Key) -> None:
+        waiters = self._waiters.get(key)
+        while waiters:
+            fut = waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+
+    def _call_closed(self, call: pbs_calls.Call) -> None:
+        self._wake((AdmissionScope.GLOBAL, ""))
+        self._wake((AdmissionScope.IDENTITY, call.aor))
+        self._wake((AdmissionScope.GATEWAY, pbs_calls.uri_host(call.peer)))
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import dataclasses as dc
+import random
+from typing import Iterator
+
+
+def backoff_delays(
+    initial: float, maximum: float, multiplier: float = 2.0, jitter: float = 0.5
+) -> Iterator[float]:
+    """
+    Yields an endless series of exponentially growing delays, capped at `maximum`.
+
+    `jitter` is the fraction of each delay that is randomised, so that many clients
+    do not retry in lockstep.
+    """
+    delay = initial
+    while True:
+        yield delay * (1.0 - jitter * random.random())
+        delay = min(delay * multiplier, maximum)
+
+
+@dc.dataclass
+class ReconnectPolicy:
+    """
+    Controls how `PyBareSIP` behaves when baresip drops off the bus.
+
+    initial_delay, max_delay, multiplier: Exponential backoff between reconnection
+    attempts, in seconds.
+
+    jitter: Fraction of each delay that is randomised, so that many clients do not
+    reconnect in lockstep after a restart.
+
+    replay_state: Re-issue the user agents, headers and modules this client created
+    once baresip is back.
+
+    max_queued: How many non-realtime commands may wait for baresip to come back.
+    Realtime commands (call control) always fail fast during an outage.
+    """
+
+    initial_delay: float = 0.1
+    max_delay: float = 30.0
+    multiplier: float = 2.0
+    jitter: float = 0.5
+    replay_state: bool = True
+    max_queued: int = 100
+
+    def delays(self) -> Iterator[float]:
+        return backoff_delays(
+            self.initial_delay, self.max_delay, self.multiplier, self.jitter
+        )
+
+
+class ClientState:
+    """
+    Records the state a client has pushed into baresip, so that it can be recreated
+    when baresip restarts and loses it.
+
+    Only successful commands are recorded. Later commands replace earlier ones for the
+    same key, and `uadel`/`rmmod` forget what `uanew`/`insmod` recorded.
+    """
+
+    def __init__(self) -> None:
+        # Dicts keep insertion order, which is the order the commands were issued in.
+        self.modules: dict[str, str] = {}
+        self.user_agents: dict[str, str] = {}
+        self.headers: dict[str, str] = {}
+
+    def record(self, action: str) -> None:
+        command, _, arg = action.partition(" ")
+        if command == "insmod":
+            self.modules[arg] = action
+        elif command == "rmmod":
+            self.modules.pop(arg, None)
+        elif command == "uanew":
+            self.user_agents[arg.split(";", 1)[0]] = action
+        elif command == "uadel":
+            self.user_agents.pop(arg.split(";", 1)[0], None)
+        elif command == "uaaddheader":
+            self.headers[arg.split("=", 1)[0]] = action
+
+    def replay_commands(self) -> list[str]:
+        """
+        Returns the commands that recreate the recorded state, modules first.
+        """
+        return [
+            *self.modules.values(),
+            *self.user_agents.values(),
+            *self.headers.values(),
+        ]
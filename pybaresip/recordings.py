@@ -0,0 +1,426 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import dataclasses as dc
+import json
+import logging
+import math
+import mmap
+import os
+import subprocess
+import time
+import wave
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Sequence, Set
+
+import pybaresip.config as pbs_cfg
+import pybaresip.prompts as pbs_prompts
+
+if TYPE_CHECKING:
+    import pybaresip.baresip as pbs
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# A processing step for one recording: given the file's current path and the
+# row of information gathered about it so far, returns the path of its output
+# (which may be the same file). Stages run in worker processes, so they must be
+# picklable: module-level functions, or instances of module-level classes.
+Stage = Callable[[str, Dict[str, Any]], str]
+
+
+@dc.dataclass(frozen=True)
+class TrimSilence:
+    """
+    Cuts leading and trailing silence from a 16-bit WAV file, in place, keeping
+    `pad` seconds either side of the audio. Windows of `window` seconds below
+    `threshold` dBFS count as silence.
+    """
+
+    threshold: float = -50.0
+    window: float = 0.02
+    pad: float = 0.2
+
+    def __call__(self, path: str, info: Dict[str, Any]) -> str:
+        numpy = pbs_prompts.require_numpy("TrimSilence")
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as m:
+            tag, channels, rate, bits, offset, size = pbs_prompts.wav_layout(m)
+            if bits != 16:
+                raise pbs_prompts.PromptError(f"{path} is not 16-bit")
+            frame = 2 * channels
+            size -= size % frame
+            step = max(1, round(rate * self.window)) * channels
+            if size // 2 < step:
+                # Too short to judge; left as it is rather than emptied.
+                info["trimmed"] = 0.0
+                return path
+            loud = self._loud_windows(numpy, m, offset, size // 2, step)
+            if not len(loud):
+                start = end = 0
+            else:
+                pad = round(rate * self.pad) * channels
+                start = max(0, int(loud[0]) * step - pad)
+                end = min(size // 2, (int(loud[-1]) + 1) * step + pad)
+            first, last = offset + start * 2, offset + end * 2
+            audio = m[first:last]
+        info["trimmed"] = (size // 2 - (end - start)) / (rate * channels)
+        with pbs_cfg.atomic_writer(path, "wb") as out:
+            with wave.open(out, "wb") as w:
+                w.setnchannels(channels)
+                w.setsampwidth(2)
+                w.setframerate(rate)
+                w.writeframes(audio)
+        return path
+
+    def _loud_windows(
+        self, numpy: Any, buf: Any, offset: int, count: int, step: int
+    ) -> Any:
+        # A function of its own so the views of `buf` are gone when it returns,
+        # and the map can close.
+        windows = count // step
+        samples = numpy.frombuffer(
+            buf, dtype="<i2", count=windows * step, offset=offset
+        )
+        blocks = samples.reshape(windows, step).astype(numpy.float32)
+        level = 10 * numpy.log10(numpy.square(blocks).mean(axis=1) / 32768.0**2 + 1e-12)
+        return numpy.flatnonzero(level > self.threshold)
+
+
+@dc.dataclass(frozen=True)
+class LevelStats:
+    """
+    Adds the duration in seconds, and the peak and RMS levels in dBFS, of a 16-bit
+    WAV file to its row.
+    """
+
+    def __call__(self, path: str, info: Dict[str, Any]) -> str:
+        numpy = pbs_prompts.require_numpy("LevelStats")
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as m:
+            tag, channels, rate, bits, offset, size = pbs_prompts.wav_layout(m)
+            if bits != 16:
+                raise pbs_prompts.PromptError(f"{path} is not 16-bit")
+            samples = numpy.frombuffer(m, dtype="<i2", count=size // 2, offset=offset)
+            wide = samples.astype(numpy.float64)
+            peak = float(numpy.abs(wide).max()) if len(wide) else 0.0
+            rms = float(numpy.sqrt(numpy.mean(wide * wide))) if len(wide) else 0.0
+            del samples, wide
+        info["duration"] = size / (2 * channels * rate)
+        info["peak_dbfs"] = _dbfs(peak)
+        info["rms_dbfs"] = _dbfs(rms)
+        return path
+
+
+def _dbfs(level: float) -> float | None:
+    # None rather than -inf, which is not valid JSON.
+    return 20 * math.log10(level / 32768) if level else None
+
+
+@dc.dataclass(frozen=True)
+class Compress:
+    """
+    Encodes a recording with an external tool, by default ffmpeg to Opus, and
+    removes the original unless `keep_source`. `command` is formatted with the
+    `input` and `output` paths; the output is the input with `suffix` in place of
+    its extension.
+    """
+
+    suffix: str = ".opus"
+    command: Sequence[str] = (
+        "ffmpeg",
+        "-y",
+        "-loglevel",
+        "error",
+        "-i",
+        "{input}",
+        "-c:a",
+        "libopus",
+        "-b:a",
+        "24k",
+        "{output}",
+    )
+    keep_source: bool = False
+    timeout: float = 300.0
+
+    def __call__(self, path: str, info: Dict[str, Any]) -> str:
+        output = os.path.splitext(path)[0] + self.suffix
+        args = [part.format(input=path, output=output) for part in self.command]
+        done = subprocess.run(args, capture_output=True, timeout=self.timeout)
+        if done.returncode:
+            error = done.stderr.decode(errors="replace").strip()
+            raise Exception(f"{args[0]} exited with {done.returncode}: {error}")
+        info["bytes"] = os.path.getsize(output)
+        if not self.keep_source:
+            os.unlink(path)
+        return output
+
+
+def process_recordings(
+    call_id: str, paths: Sequence[str], stages: Sequence[Stage]
+) -> Dict[str, Any]:
+    """
+    Runs every stage over each of a call's recordings and returns the call's
+    manifest row. A recording whose stage fails keeps the error in its entry,
+    and the remaining stages are skipped for it. Runs in a worker process.
+    """
+    started = time.time()
+    files = []
+    for path in paths:
+        info: Dict[str, Any] = {"source": path}
+        current = path
+        try:
+            for stage in stages:
+                current = stage(current, info)
+        except Exception as e:
+            info["error"] = f"{type(e).__name__}: {e}"
+        info["output"] = current
+        files.append(info)
+    return {
+        "call_id": call_id,
+        "files": files,
+        "started": started,
+        "seconds": time.time() - started,
+    }
+
+
+@dc.dataclass
+class PipelineStats:
+    queued: int = 0
+    spooled: int = 0
+    processed: int = 0
+    failed: int = 0
+
+
+class RecordingPipeline:
+    """
+    Processes each call's recordings once the call is over.
+
+    Register an instance with `PyBareSIP.add_event_listener()`. On CALL_CLOSED,
+    `paths_for` maps the event to the recordings of the call (e.g. the files the
+    sndfile module wrote for it); those that exist are run through `stages` in a
+    process pool, one call per task, and a row per call is appended to the JSON
+    lines `manifest`. Rows are written in batches of `batch_size`, or every
+    `batch_interval` seconds.
+
+    Backpressure: at most `max_in_flight` calls are being processed at once, and at
+    most `max_queued` wait in memory. Calls beyond that are appended to a spool
+    file next to the manifest and read back when the queue drains, so a burst of
+    hangups costs disk, not memory. A spool left by a previous run is picked up by
+    the first `submit()` or `drain()`.
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        manifest: str,
+        paths_for: Callable[[pbs.EventParams], Iterable[str]],
+        workers: int | None = None,
+        max_in_flight: int | None = None,
+        max_queued: int = 1000,
+        batch_size: int = 100,
+        batch_interval: float = 1.0,
+        executor: concurrent.futures.Executor | None = None,
+    ) -> None:
+        self.stages = list(stages)
+        self.manifest = manifest
+        self.spool = manifest + ".spool"
+        self.stats = PipelineStats()
+        self._paths_for = paths_for
+        self._workers = workers or os.cpu_count() or 1
+        self._executor = executor
+        self._own_executor = executor is None
+        self._max_in_flight = max_in_flight or 2 * self._workers
+        self._max_queued = max_queued
+        # Created on first use, so they bind to the loop the pipeline runs on.
+        self._slots: asyncio.Semaphore | None = None
+        self._queue: asyncio.Queue[tuple[str, List[str]]] | None = None
+        self._batch_size = batch_size
+        self._batch_interval = batch_interval
+        self._rows: List[Dict[str, Any]] = []
+        self._flushed = time.monotonic()
+        self._tasks: Set[asyncio.Task[None]] = set()
+        self._runner: asyncio.Task[None] | None = None
+        self._closing = False
+        # Taken off the queue while closing, to be spooled with the rest.
+        self._returned: List[tuple[str, List[str]]] = []
+        # Spooled calls not read back yet, from byte `_spool_offset` of the spool.
+        # The spool is only appended to until it is used up, then removed.
+        self._spooled = 0
+        self._spool_offset = 0
+        if os.path.exists(self.spool):
+            with open(self.spool) as f:
+                self._spooled = sum(1 for _ in f)
+
+    def _slot_limit(self) -> asyncio.Semaphore:
+        """
+        Limits how many calls are processed at once.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_in_flight)
+        return self._slots
+
+    def _job_queue(self) -> asyncio.Queue[tuple[str, List[str]]]:
+        """
+        The calls waiting in memory for a slot.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue(self._max_queued)
+        return self._queue
+
+    def __call__(self, client: pbs.PyBareSIP, event: pbs.EventParams) -> None:
+        if event.get("class") != "call" or event.get("type") != "CALL_CLOSED":
+            return
+        call_id = event.get("id", "")
+        paths = [p for p in self._paths_for(event) if os.path.exists(p)]
+        if paths:
+            self.submit(call_id, paths)
+
+    def submit(self, call_id: str, paths: List[str]) -> None:
+        """
+        Queues a call's recordings for processing.
+        """
+        if self._spooled or self._job_queue().full():
+            # Spooled calls go first, so keep the order once spooling starts.
+            with open(self.spool, "a") as f:
+                f.write(json.dumps([call_id, paths]) + "\n")
+            self._spooled += 1
+            self.stats.spooled += 1
+        else:
+            self._job_queue().put_nowait((call_id, paths))
+        self.stats.queued += 1
+        if self._runner is None:
+            self._runner = asyncio.ensure_future(self._run())
+
+    async def drain(self) -> None:
+        """
+        Waits until every call submitted so far is processed and in the manifest.
+        """
+        while self._spooled or not self._job_queue().empty() or self._tasks:
+            if self._runner is None:
+                self._runner = asyncio.ensure_future(self._run())
+            await asyncio.sleep(0.01)
+        self.flush()
+
+    async def close(self) -> None:
+        """
+        Stops taking calls from the queue, waits for those being processed, and
+        writes out the manifest. Calls still queued in memory are added to the
+        spool, so the next pipeline on this manifest processes them.
+        """
+        self._closing = True
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        pending, self._returned = self._returned, []
+        while not self._job_queue().empty():
+            pending.append(self._job_queue().get_nowait())
+        if pending or self._spool_offset:
+            # Also drops the calls already read back, as the offset is not kept.
+            self._respool(pending)
+        self.flush()
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def flush(self) -> None:
+        """
+        Appends the buffered manifest rows to the manifest in one write.
+        """
+        if self._rows:
+            data = "".join(json.dumps(row) + "\n" for row in self._rows)
+            with open(self.manifest, "a") as f:
+                f.write(data)
+            self._rows.clear()
+        self._flushed = time.monotonic()
+
+    async def _run(self) -> None:
+        try:
+            while not self._closing:
+                await self._slot_limit().acquire()
+                if self._job_queue().empty():
+                    if self._spooled:
+                        self._unspool()
+                    elif time.monotonic() - self._flushed >= self._batch_interval:
+                        self.flush()
+                try:
+                    job = await asyncio.wait_for(
+                        self._job_queue().get(), self._batch_interval
+                    )
+                except asyncio.TimeoutError:
+                    self._slot_limit().release()
+                    self.flush()
+                    if not self._tasks and not self._spooled:
+                        return
+                    continue
+                if self._closing:
+                    # wait_for() can return an item it got as it was cancelled.
+                    self._slot_limit().release()
+                    self._returned.append(job)
+                    return
+                task = asyncio.ensure_future(self._process(*job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            self._runner = None
+
+    async def _process(self, call_id: str, paths: List[str]) -> None:
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(self._workers)
+        try:
+            row = await loop.run_in_executor(
+                self._executor, process_recordings, call_id, paths, self.stages
+            )
+        except Exception as e:
+            logger.warning(f"Processing the recordings of {call_id} failed: {e}")
+            row = {"call_id": call_id, "error": f"{type(e).__name__}: {e}"}
+        finally:
+            self._slot_limit().release()
+        if "error" in row or any("error" in f for f in row["files"]):
+            self.stats.failed += 1
+        self.stats.processed += 1
+        self._rows.append(row)
+        if len(self._rows) >= self._batch_size:
+            self.flush()
+
+    def _unspool(self) -> None:
+        """
+        Moves as many spooled calls onto the queue as it has room for.
+        """
+        room = self._job_queue().maxsize - self._job_queue().qsize()
+        with open(self.spool, "rb") as f:
+            f.seek(self._spool_offset)
+            while room and self._spooled:
+                line = f.readline()
+                if not line:
+                    self._spooled = 0
+                    break
+                self._spooled -= 1
+                if line.strip():
+                    call_id, paths = json.loads(line)
+                    self._job_queue().put_nowait((call_id, paths))
+                    room -= 1
+            self._spool_offset = f.tell()
+        if not self._spooled:
+            os.unlink(self.spool)
+            self._spool_offset = 0
+
+    def _respool(self, jobs: List[tuple[str, List[str]]]) -> None:
+        existing = []
+        if os.path.exists(self.spool):
+            with open(self.spool, "rb") as f:
+                f.seek(self._spool_offset)
+                existing = [line.decode() for line in f if line.strip()]
+        with pbs_cfg.atomic_writer(self.spool) as f:
+            f.writelines(json.dumps(list(job)) + "\n" for job in jobs)
+            f.writelines(existing)
+        self._spooled = len(jobs) + len(existing)
+        self._spool_offset = 0
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import enum
+import logging
+from typing import Callable, Dict, Mapping
+
+import pybaresip.baresip as pbs
+import pybaresip.timers as pbs_timers
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class RegistrationState(enum.Enum):
+    REGISTERING = "registering"
+    REGISTERED = "registered"
+    FAILED = "failed"
+    LAPSED = "lapsed"
+
+
+class _Account:
+    __slots__ = ("aor", "state", "timer")
+
+    def __init__(self, aor: str) -> None:
+        self.aor = aor
+        self.state = RegistrationState.REGISTERING
+        self.timer: pbs_timers.Timer | None = None
+
+
+class RegistrationMonitor:
+    """
+    Watches baresip's registration events for accounts that stop re-registering.
+
+    Register an instance with `PyBareSIP.add_event_listener()`. Each REGISTER_OK
+    rearms a watchdog for the account; if no further REGISTER_OK arrives within
+    `interval` seconds (the account's regint) plus `grace`, the account is LAPSED.
+    REGISTER_FAIL marks it FAILED until the next success, and UNREGISTERING stops
+    watching it. The watchdogs are entries in a TimerWheel, so one loop tick serves
+    every account.
+
+    intervals: Per-account intervals, by AOR, overriding `interval`.
+    on_change: Called with the AOR and the new state on every change of state.
+    """
+
+    def __init__(
+        self,
+        interval: float = 3600.0,
+        grace: float = 30.0,
+        intervals: Mapping[str, float] | None = None,
+        timers: pbs_timers.AnyScheduler | None = None,
+        on_change: Callable[[str, RegistrationState], None] | None = None,
+    ) -> None:
+        self.interval = interval
+        self.grace = grace
+        self._intervals = dict(intervals or {})
+        self._timers = (
+            pbs_timers.TimerWheel(resolution=1.0) if timers is None else timers
+        )
+        self._on_change = on_change
+        self._accounts: Dict[str, _Account] = {}
+
+    def state(self, aor: str) -> RegistrationState | None:
+        account = self._accounts.get(aor)
+        return None if account is None else account.state
+
+    def count(self, state: RegistrationState) -> int:
+        return sum(1 for a in self._accounts.values() if a.state is state)
+
+    def __call__(self, client: pbs.PyBareSIP, event: pbs.EventParams) -> None:
+        if event.get("class") != "register":
+            return
+        aor = event.get("accountaor")
+        if not aor:
+            return
+        evtype = event.get("type")
+        if evtype == "UNREGISTERING":
+            account = self._accounts.pop(aor, None)
+            if account is not None and account.timer is not None:
+                account.timer.cancel()
+            return
+        account = self._accounts.get(aor)
+        if account is None:
+            account = self._accounts[aor] = _Account(aor)
+            self._arm(account)
+        if evtype == "REGISTER_OK":
+            self._arm(account)
+            self._set(account, RegistrationState.REGISTERED)
+        elif evtype == "REGISTER_FAIL":
+            self._set(account, RegistrationState.FAILED)
+
+    def close(self) -> None:
+        for account in self._accounts.values():
+            if account.timer is not None:
+                account.timer.cancel()
+                account.timer = None
+
+    def _arm(self, account: _Account) -> None:
+        if account.timer is not None:
+            account.timer.cancel()
+        interval = self._intervals.get(account.aor, self.interval)
+        account.timer = self._timers.call_later(
+            interval + self.grace, self._lapsed, account
+        )
+
+    def _lapsed(self, account: _Account) -> None:
+        account.timer = None
+        if self._accounts.get(account.aor) is not account:
+            return
+        logger.warning(f"{account.aor} has not re-registered in time")
+        self._set(account, RegistrationState.LAPSED)
+
+    def _set(self, account: _Account, state: RegistrationState) -> None:
+        if account.state is state:
+            return
+        account.state = state
+        if self._on_change is not None:
+            try:
+                self._on_change(account.aor, state)
+            except Exception:
+                logger.exception(f"Registration callback failed for {account.aor}")
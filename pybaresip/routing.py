@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import dataclasses as dc
+import logging
+import random
+from typing import Dict, Iterable, List, Tuple
+
+import pybaresip.baresip as pbs
+import pybaresip.calls as pbs_calls
+import pybaresip.ratelimit as pbs_rl
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+_SEPARATORS = str.maketrans("", "", " -.()/")
+
+
+class InvalidNumberError(ValueError):
+    ...
+
+
+class NoRouteError(LookupError):
+    ...
+
+
+class RoutesExhaustedError(Exception):
+    def __init__(
+        self, number: str, failures: List[Tuple[Target, BaseException]]
+    ) -> None:
+        super().__init__(f"Every route to {number} failed")
+        self.number = number
+        self.failures = failures
+
+
+def normalize_e164(
+    number: str,
+    country_code: str = "",
+    national_prefix: str = "0",
+    international_prefix: str = "00",
+) -> str:
+    """
+    Returns `number` as E.164 digits, without the leading "+".
+
+    Accepts sip:/sips:/tel: URIs (only the user part is used) and ignores spaces,
+    dashes, dots, slashes and brackets. A number starting with the
+    `international_prefix` has it removed; one starting with the `national_prefix`
+    has it replaced by `country_code`, if one is given. Anything else is assumed
+    to be in E.164 already.
+    """
+    n = number.strip()
+    if n.startswith(("sip:", "sips:", "tel:")):
+        n = n.split(":", 1)[1].split("@", 1)[0].split(";", 1)[0]
+    n = n.translate(_SEPARATORS)
+    if n.startswith("+"):
+        n = n[1:]
+    elif international_prefix and n.startswith(international_prefix):
+        n = n.replace(international_prefix, "", 1)
+    elif country_code and national_prefix and n.startswith(national_prefix):
+        n = n.replace(national_prefix, country_code, 1)
+    if not (n.isascii() and n.isdigit() and len(n) <= 15):
+        raise InvalidNumberError(f"{number!r} is not a valid E.164 number")
+    return n
+
+
+@dc.dataclass(frozen=True)
+class Target:
+    """
+    Where a route sends a call.
+
+    account: The AOR of the User-Agent to dial from. None leaves the choice to
+    baresip.
+    gateway: The host (and optional port) the call is sent to. Defaults to the
+    account's own host.
+    weight: The share of calls this target gets among the targets of its route.
+    """
+
+    account: str | None = None
+    gateway: str | None = None
+    weight: int = 1
+
+    def __post_init__(self) -> None:
+        if self.account is None and self.gateway is None:
+            raise ValueError("A target needs an account, a gateway or both")
+        if self.weight <= 0:
+            raise ValueError(f"Target weights must be positive, not {self.weight}")
+
+    def uri(self, number: str) -> str:
+        gateway = self.gateway
+        if gateway is None:
+            gateway = str(self.account).split("@", 1)[1].split(";", 1)[0]
+        return f"sip:+{number}@{gateway}"
+
+
+class RoutingTable:
+    """
+    An immutable longest-prefix-match table from E.164 prefixes to targets.
+
+    The prefix trie is compiled into a flat dict of prefix -> targets plus the
+    distinct prefix lengths in descending order. A lookup tries one dict probe per
+    distinct length, longest first, so it costs at most 16 probes however many
+    routes there are. The empty prefix is the default route.
+    """
+
+    __slots__ = ("_routes", "_lengths")
+
+    def __init__(self, routes: Iterable[Tuple[str, Target]] = ()) -> None:
+        table: Dict[str, List[Target]] = {}
+        for prefix, target in routes:
+            if prefix and not (prefix.isascii() and prefix.isdigit()):
+                raise InvalidNumberError(f"Invalid route prefix {prefix!r}")
+            table.setdefault(prefix, []).append(target)
+        self._routes: Dict[str, Tuple[Target, ...]] = {
+            k: tuple(v) for k, v in table.items()
+        }
+        self._lengths = tuple(sorted({len(k) for k in self._routes}, reverse=True))
+
+    @classmethod
+    def from_file(cls, path: str) -> RoutingTable:
+        """
+        Loads a CSV file of `prefix,account,gateway,weight` rows. account, gateway
+        and weight may be empty; several rows with the same prefix give that route
+        several targets. Blank lines and lines starting with "#" are ignored.
+        """
+
+        def rows() -> Iterable[Tuple[str, Target]]:
+            with open(path, newline="") as f:
+                for line, row in enumerate(csv.reader(f), start=1):
+                    if not row or row[0].startswith("#"):
+                        continue
+                    prefix, account, gateway, weight = (row + [""] * 4)[:4]
+                    try:
+                        target = Target(
+                            account.strip() or None,
+                            gateway.strip() or None,
+                            int(weight) if weight.strip() else 1,
+                        )
+                    except ValueError as e:
+                        raise ValueError(f"{path} line {line}: {e}") from e
+                    yield prefix.strip(), target
+
+        return cls(rows())
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def lookup(self, number: str) -> Tuple[str, Tuple[Target, ...]]:
+        """
+        Returns the longest matching prefix of the E.164 `number` and its targets.
+        """
+        routes = self._routes
+        size = len(number)
+        for length in self._lengths:
+            if length <= size:
+                targets = routes.get(number[:length])
+                if targets is not None:
+                    return number[:length], targets
+        raise NoRouteError(f"No route to {number}")
+
+
+def failover_order(targets: Tuple[Target, ...]) -> List[Target]:
+    """
+    Orders targets for trying one after another: each position is drawn in
+    proportion to weight from the targets not yet placed.
+    """
+    if len(targets) == 1:
+        return list(targets)
+    return sorted(
+        targets, key=lambda t: random.random() ** (1.0 / t.weight), reverse=True
+    )
+
+
+class Router:
+    """
+    Dials numbers through a RoutingTable, failing over between the targets of the
+    matched route.
+
+    The table can be replaced at any time with `swap()` or `reload()`. Each dial
+    reads the table once, so calls already routing finish on the table they
+    started with and nothing waits for the swap.
+
+    admission: Limits each target's calls; a target refused by it counts as failed,
+    so the next target is tried.
+    """
+
+    def __init__(
+        self,
+        client: pbs.PyBareSIP,
+        table: RoutingTable,
+        country_code: str = "",
+        national_prefix: str = "0",
+        international_prefix: str = "00",
+        admission: pbs_rl.AdmissionController | None = None,
+    ) -> None:
+        self._client = client
+        self._table = table
+        self._admission = admission
+        self.country_code = country_code
+        self.national_prefix = national_prefix
+        self.international_prefix = international_prefix
+
+    @property
+    def table(self) -> RoutingTable:
+        return self._table
+
+    def swap(self, table: RoutingTable) -> RoutingTable:
+        """
+        Replaces the routing table and returns the previous one.
+        """
+        old, self._table = self._table, table
+        return old
+
+    async def reload(self, path: str) -> RoutingTable:
+        """
+        Loads a table from `path` in an executor thread, so the event loop keeps
+        dialing while it is parsed, then swaps it in.
+        """
+        loop = asyncio.get_running_loop()
+        table = await loop.run_in_executor(None, RoutingTable.from_file, path)
+        self.swap(table)
+        logger.info(f"Loaded {len(table)} routes from {path}")
+        return table
+
+    def normalize(self, number: str) -> str:
+        return normalize_e164(
+            number, self.country_code, self.national_prefix, self.international_prefix
+        )
+
+    async def dial(
+        self, number: str, deadline: float | None = None
+    ) -> Tuple[Target, str]:
+        """
+        Dials `number` through the first target of its route that accepts the call.
+        Returns the target used and baresip's response.
+        """
+        e164 = self.normalize(number)
+        prefix, targets = self._table.lookup(e164)
+        failures: List[Tuple[Target, BaseException]] = []
+        for target in failover_order(targets):
+            uri = target.uri(e164)
+            try:
+                if self._admission is None:
+                    response = await self._dial(target, uri, deadline)
+                else:
+                    admit = self._admission.admit(
+                        target.account or "", pbs_calls.uri_host(uri)
+                    )
+                    async with admit:
+                        response = await self._dial(target, uri, deadline)
+            except Exception as e:
+                logger.warning(f"Dialing {uri} via route {prefix!r} failed: {e}")
+                failures.append((target, e))
+                continue
+            return target, response
+        raise RoutesExhaustedError(e164, failures)
+
+    async def _dial(self, target: Target, uri: str, deadline: float | None) -> str:
+        if target.account is None:
+            return await self._client.dial(uri, deadline=deadline)
+        return await self._client.dial_as(target.account, uri, deadline=deadline)
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import dataclasses as dc
+import enum
+import logging
+from typing import AsyncIterator, Deque
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class Priority(enum.Enum):
+    """
+    Scheduling classes for commands sent to baresip.
+    """
+
+    REALTIME = "realtime"
+    NORMAL = "normal"
+    BULK = "bulk"
+
+
+# Commands not listed here are scheduled as Priority.NORMAL.
+COMMAND_PRIORITIES: dict[str, Priority] = {
+    # Call control
+    "accept": Priority.REALTIME,
+    "callfind": Priority.REALTIME,
+    "dial": Priority.REALTIME,
+    "dial_contact": Priority.REALTIME,
+    "hangup": Priority.REALTIME,
+    # Provisioning
+    "conf_reload": Priority.BULK,
+    "insmod": Priority.BULK,
+    "rmmod": Priority.BULK,
+    "uaaddheader": Priority.BULK,
+    "uadel": Priority.BULK,
+    "uanew": Priority.BULK,
+    # Diagnostics
+    "config": Priority.BULK,
+    "help": Priority.BULK,
+    "main": Priority.BULK,
+    "memstat": Priority.BULK,
+    "netstat": Priority.BULK,
+    "sipstat": Priority.BULK,
+    "sysinfo": Priority.BULK,
+    "timers": Priority.BULK,
+}
+
+
+def command_priority(action: str) -> Priority:
+    """
+    Returns the scheduling class for a raw command string such as 'dial sip:x@y'.
+    """
+    return COMMAND_PRIORITIES.get(action.split(" ", 1)[0], Priority.NORMAL)
+
+
+@dc.dataclass
+class ClassLimits:
+    """
+    max_in_flight caps how many commands of the class may be outstanding at once.
+
+    weight is the class' share of the scheduler when several classes are waiting for
+    a slot; a class with weight 8 is handed eight slots for every one handed to a
+    class with weight 1.
+    """
+
+    max_in_flight: int
+    weight: int
+
+
+DEFAULT_LIMITS: dict[Priority, ClassLimits] = {
+    Priority.REALTIME: ClassLimits(max_in_flight=8, weight=8),
+    Priority.NORMAL: ClassLimits(max_in_flight=4, weight=3),
+    Priority.BULK: ClassLimits(max_in_flight=2, weight=1),
+}
+
+
+@dc.dataclass
+class ClassStats:
+    queued: int = 0
+    in_flight: int = 0
+    dispatched: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        if not self.dispatched:
+            return 0.0
+        return self.total_wait / self.dispatched
+
+
+class _PriorityClass:
+    __slots__ = ("priority", "limits", "stats", "waiters", "current_weight")
+
+    def __init__(self, priority: Priority, limits: ClassLimits) -> None:
+        self.priority = priority
+        self.limits = limits
+        self.stats = ClassStats()
+        self.waiters: Deque[tuple[asyncio.Future, float]] = collections.deque()
+        self.current_weight = 0
+
+    @property
+    def has_capacity(self) -> bool:
+        return self.stats.in_flight < self.limits.max_in_flight
+
+
+class CommandScheduler:
+    """
+    Orders commands sent through `PyBareSIP.invoke` so that call control is not stuck
+    behind provisioning or diagnostics.
+
+    Every command is mapped to a Priority via COMMAND_PRIORITIES. Each class has its
+    own in-flight limit, and all classes share max_in_flight. When a shared slot
+    frees up, it is handed out by smooth weighted round-robin between the classes
+    that have waiters and spare capacity, so bulk work keeps moving while realtime
+    work gets most of the slots.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        limits: dict[Priority, ClassLimits] | None = None,
+    ) -> None:
+        limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._classes = {p: _PriorityClass(p, limits[p]) for p in Priority}
+
+    def stats(self) -> dict[Priority, ClassStats]:
+        """
+        Returns a snapshot of queue depth, in-flight count and wait times per class.
+        """
+        return {p: dc.replace(c.stats) for p, c in self._classes.items()}
+
+    @contextlib.asynccontextmanager
+    async def slot(self, action: str) -> AsyncIterator[Priority]:
+        """
+        Holds a scheduler slot for the duration of the block.
+        """
+        priority = command_priority(action)
+        await self.acquire(priority)
+        try:
+            yield priority
+        finally:
+            self.release(priority)
+
+    async def acquire(self, priority: Priority) -> None:
+        pclass = self._classes[priority]
+        idle = not pclass.stats.queued and pclass.has_capacity
+        if idle and self._in_flight < self.max_in_flight:
+            self._start(pclass, 0.0)
+            return
+
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        pclass.waiters.append((fut, loop.time()))
+        pclass.stats.queued += 1
+        self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # The slot was handed over just as the caller gave up.
+                self.release(priority)
+            else:
+                # Left in the deque; _dispatch skips it.
+                fut.cancel()
+                pclass.stats.queued -= 1
+            raise
+
+    def release(self, priority: Priority) -> None:
+        self._classes[priority].stats.in_flight -= 1
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _start(self, pclass: _PriorityClass, waited: float) -> None:
+        stats = pclass.stats
+        stats.in_flight += 1
+        stats.dispatched += 1
+        stats.total_wait += waited
+        if waited > stats.max_wait:
+            stats.max_wait = waited
+        self._in_flight += 1
+
+    def _next_class(self) -> _PriorityClass | None:
+        eligible = []
+        for pclass in self._classes.values():
+            while pclass.waiters and pclass.waiters[0][0].done():
+                pclass.waiters.popleft()
+            if pclass.waiters and pclass.has_capacity:
+                eligible.append(pclass)
+        if not eligible:
+            return None
+        if len(eligible) == 1:
+            return eligible[0]
+        total = 0
+        best = eligible[0]
+        for pclass in eligible:
+            pclass.current_weight += pclass.limits.weight
+            total += pclass.limits.weight
+            if pclass.current_weight > best.current_weight:
+                best = pclass
+        best.current_weight -= total
+        return best
+
+    def _dispatch(self) -> None:
+        while self._in_flight < self.max_in_flight:
+            pclass = self._next_class()
+            if pclass is None:
+                return
+            fut, enqueued = pclass.waiters.popleft()
+            pclass.stats.queued -= 1
+            self._start(pclass, asyncio.get_running_loop().time() - enqueued)
+            fut.set_result(None)
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import array
+import bisect
+import heapq
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import IO, Iterable, Iterator, List
+
+import pybaresip.config as pbs_cfg
+import pybaresip.routing as pbs_routing
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# magic, number count, Bloom filter bits, Bloom filter hashes
+_HEADER = struct.Struct("<8sQQI4x")
+_MAGIC = b"PBSNUMS1"
+_MASK = (1 << 64) - 1
+_BLOCK = 65536
+
+
+class NumberFileError(ValueError):
+    ...
+
+
+def _mix(x: int) -> int:
+    # splitmix64's finaliser: spreads consecutive numbers over the whole range.
+    x = (x + 0x9E3779B97F4A7C15) & _MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK
+    return x ^ (x >> 31)
+
+
+def _bit_positions(number: int, bits: int, hashes: int) -> Iterator[int]:
+    # Double hashing: k positions from two hashes (Kirsch and Mitzenmacher).
+    h1 = _mix(number)
+    h2 = _mix(h1) | 1
+    for i in range(hashes):
+        yield ((h1 + i * h2) & _MASK) % bits
+
+
+def _as_int(number: str | int) -> int:
+    if isinstance(number, int):
+        value = number
+    else:
+        value = int(pbs_routing.normalize_e164(number))
+    if not 0 < value < 10**15:
+        raise pbs_routing.InvalidNumberError(f"{number!r} is not an E.164 number")
+    return value
+
+
+def build_number_file(
+    path: str,
+    numbers: Iterable[str | int],
+    false_positive_rate: float = 0.001,
+    chunk_size: int = 1_000_000,
+) -> int:
+    """
+    Writes a screening list file from E.164 numbers (strings in any form
+    `normalize_e164()` accepts, or ints) and returns how many distinct numbers it
+    holds.
+
+    The file is a header, a Bloom filter and the sorted numbers as little-endian
+    uint64. Numbers are sorted in chunks of `chunk_size` spilled to temporary files
+    and then merged, so building a list of any size needs memory for one chunk. The
+    file is replaced atomically, so a running `NumberSet` can be reloaded from it.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        chunks: List[str] = []
+        total = 0
+        chunk = array.array("Q")
+        for number in numbers:
+            chunk.append(_as_int(number))
+            if len(chunk) >= chunk_size:
+                chunks.append(_spill(chunk, tmp, len(chunks)))
+                total += len(chunk)
+                chunk = array.array("Q")
+        chunks.append(_spill(chunk, tmp, len(chunks)))
+        total += len(chunk)
+
+        # Sized for the count before removing duplicates, which can only lower the
+        # false positive rate.
+        n = max(total, 1)
+        bits = max(64, math.ceil(-n * math.log(false_positive_rate) / math.log(2) ** 2))
+        bits = (bits + 63) // 64 * 64
+        hashes = max(1, round(bits / n * math.log(2)))
+        bloom = bytearray(bits // 8)
+
+        count = 0
+        with pbs_cfg.atomic_writer(path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, 0, bits, hashes))
+            f.write(bloom)
+            out = array.array("Q")
+            previous = None
+            for value in heapq.merge(*(_read_chunk(c) for c in chunks)):
+                if value == previous:
+                    continue
+                previous = value
+                for position in _bit_positions(value, bits, hashes):
+                    bloom[position >> 3] |= 1 << (position & 7)
+                out.append(value)
+                if len(out) >= _BLOCK:
+                    count += _write_block(f, out)
+                    out = array.array("Q")
+            count += _write_block(f, out)
+            f.seek(0)
+            f.write(_HEADER.pack(_MAGIC, count, bits, hashes))
+            f.write(bloom)
+    return count
+
+
+def _spill(chunk: array.array[int], directory: str, n: int) -> str:
+    path = os.path.join(directory, f"chunk{n}")
+    with open(path, "wb") as f:
+        _write_block(f, array.array("Q", sorted(chunk)))
+    return path
+
+
+def _write_block(f: IO[bytes], values: array.array[int]) -> int:
+    if sys.byteorder != "little":
+        values.byteswap()
+    values.tofile(f)
+    return len(values)
+
+
+def _read_chunk(path: str) -> Iterator[int]:
+    with open(path, "rb") as f:
+        while True:
+            block = array.array("Q")
+            try:
+                block.fromfile(f, _BLOCK)
+            except EOFError:
+                pass
+            if not block:
+                return
+            if sys.byteorder != "little":
+                block.byteswap()
+            yield from block
+
+
+class NumberSet:
+    """
+    Membership tests against a file written by `build_number_file()`, without
+    loading it.
+
+    The file is memory-mapped. A number is first checked against the Bloom filter,
+    which rules out most numbers that are not in the list in a few bit tests; the
+    rest are found by binary search over the sorted array, read in place through a
+    memoryview. Only the pages touched are read from disk, and they are shared by
+    every process mapping the same file.
+    """
+
+    def __init__(self, path: str) -> None:
+        if sys.byteorder != "little":
+            raise NumberFileError("Number files can only be mapped on little-endian")
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, count, bits, hashes = _HEADER.unpack_from(self._mmap)
+            start = _HEADER.size + bits // 8
+            if magic != _MAGIC or len(self._mmap) != start + count * 8:
+                raise NumberFileError(f"{path} is not a valid number file")
+        except (struct.error, NumberFileError):
+            self._mmap.close()
+            raise
+        header = _HEADER.size
+        self._view = memoryview(self._mmap)
+        self._bloom = self._view[header:start]
+        self._numbers = self._view[start:].cast("Q")
+        self._bits = bits
+        self._hashes = hashes
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def __contains__(self, number: object) -> bool:
+        if not isinstance(number, (str, int)):
+            return False
+        try:
+            value = _as_int(number)
+        except ValueError:
+            return False
+        # _bit_positions(), inlined: this is the path most lookups end on.
+        bloom = self._bloom
+        bits = self._bits
+        h1 = _mix(value)
+        h2 = _mix(h1) | 1
+        for i in range(self._hashes):
+            position = ((h1 + i * h2) & _MASK) % bits
+            if not bloom[position >> 3] >> (position & 7) & 1:
+                return False
+        numbers = self._numbers
+        i = bisect.bisect_left(numbers, value)  # type: ignore[arg-type]
+        return i < len(numbers) and numbers[i] == value
+
+    def close(self) -> None:
+        # The views must go before the map can be closed.
+        self._numbers.release()
+        self._bloom.release()
+        self._view.release()
+        self._mmap.close()
+
+
+class Screener:
+    """
+    Screens callers against a blocklist and an allowlist, each a number file from
+    `build_number_file()`. Callers on the allowlist are never blocked.
+
+    `reload()` opens the current files and swaps them in by replacing references,
+    so screening carries on during a reload; rebuild the files in place with
+    `build_number_file()`, which replaces them atomically.
+
+    Use `blocked` as the `screen` of a policy Rule to reject blocked callers, or
+    `allowed` to accept only listed ones.
+    """
+
+    def __init__(
+        self,
+        blocklist: str | None = None,
+        allowlist: str | None = None,
+    ) -> None:
+        self._paths = (blocklist, allowlist)
+        self._block: NumberSet | None = None
+        self._allow: NumberSet | None = None
+        self.reload()
+
+    def reload(self) -> None:
+        blocklist, allowlist = self._paths
+        new_block = NumberSet(blocklist) if blocklist else None
+        new_allow = NumberSet(allowlist) if allowlist else None
+        old = (self._block, self._allow)
+        self._block, self._allow = new_block, new_allow
+        for numbers in old:
+            if numbers is not None:
+                numbers.close()
+        logger.info(
+            f"Screening against {len(new_block or ())} blocked and "
+            f"{len(new_allow or ())} allowed numbers"
+        )
+
+    def close(self) -> None:
+        for numbers in (self._block, self._allow):
+            if numbers is not None:
+                numbers.close()
+        self._block = self._allow = None
+
+    def blocked(self, caller: str) -> bool:
+        """
+        Whether `caller` (a number or SIP URI) is on the blocklist and not on the
+        allowlist. Callers that are not phone numbers are never blocked.
+        """
+        block = self._block
+        if block is None or caller not in block:
+            return False
+        return not self.allowed(caller)
+
+    def allowed(self, caller: str) -> bool:
+        allow = self._allow
+        return allow is not None and caller in allow
@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import dataclasses as dc
+import json
+import logging
+import math
+import random
+from typing import TYPE_CHECKING, Any, Awaitable, Dict, List, Sequence, TypeVar
+
+import pybaresip.config as pbs_cfg
+import pybaresip.identity as pbs_id
+import pybaresip.reconnect as pbs_rc
+
+if TYPE_CHECKING:
+    import pybaresip.baresip as pbs
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# The entry of the invoke() in progress, so the D-Bus round trip made inside it
+# (in a task wait_for() starts, which copies the context) lands on the same entry.
+_current: contextvars.ContextVar[SessionEntry | None] = contextvars.ContextVar(
+    "_current", default=None
+)
+
+
+class ReplayError(Exception):
+    """
+    Raised by ReplayInterface for a command that failed when it was recorded.
+    """
+
+
+@dc.dataclass
+class SessionEntry:
+    """
+    One invoke() of a recorded session.
+
+    offset: When it was invoked, in seconds from the start of the session.
+    latency: How long invoke() took, as the caller saw it.
+    bus: How long the D-Bus round trip took, or None if the command was never sent.
+    error: The exception invoke() raised, as "Type: message", or None.
+    """
+
+    offset: float
+    action: str
+    response: str | None = None
+    error: str | None = None
+    latency: float = 0.0
+    bus: float | None = None
+
+    @property
+    def command(self) -> str:
+        return self.action.split(" ", 1)[0]
+
+
+class SessionRecorder:
+    """
+    Records the commands a client invokes, their responses and their latencies.
+    Passwords and other secret account flags are masked before they are stored.
+
+    Pass an instance to `PyBareSIP(recorder=...)`, and `save()` the session when
+    done. Each command's time as the caller saw it, which includes scheduling and
+    queueing, is recorded separately from its D-Bus round trip, which is what
+    ReplayInterface reproduces.
+    """
+
+    def __init__(self) -> None:
+        self.entries: List[SessionEntry] = []
+        self._origin: float | None = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    async def record(self, action: str, invoked: Awaitable[T]) -> T:
+        """
+        Awaits an invoke() of `action`, recording its outcome.
+        """
+        now = asyncio.get_running_loop().time()
+        if self._origin is None:
+            self._origin = now
+        entry = SessionEntry(now - self._origin, pbs_id.redact(action))
+        self.entries.append(entry)
+        token = _current.set(entry)
+        try:
+            result = await invoked
+        except BaseException as e:
+            entry.error = pbs_id.redact(f"{type(e).__name__}: {e}")
+            raise
+        else:
+            entry.response = pbs_id.redact(str(result))
+            return result
+        finally:
+            _current.reset(token)
+            entry.latency = asyncio.get_running_loop().time() - now
+
+    async def record_bus(self, sent: Awaitable[T]) -> T:
+        """
+        Awaits a D-Bus call made on behalf of the invoke() being recorded.
+        """
+        entry = _current.get()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            return await sent
+        finally:
+            if entry is not None:
+                entry.bus = loop.time() - start
+
+    def save(self, path: str) -> None:
+        """
+        Writes the session as JSON lines, one entry per line.
+        """
+        with pbs_cfg.atomic_writer(path) as f:
+            f.writelines(json.dumps(dc.asdict(e)) + "\n" for e in self.entries)
+
+
+def load(path: str) -> List[SessionEntry]:
+    with open(path) as f:
+        return [SessionEntry(**json.loads(line)) for line in f if line.strip()]
+
+
+class ReplayInterface:
+    """
+    Stands in for baresip's D-Bus interface, answering commands as a recorded
+    session did.
+
+    Each action gets the responses recorded for it, in order, and then the last of
+    them again; an action never recorded gets a response recorded for the same
+    command, or "". Each answer is delayed by a D-Bus latency drawn from those
+    recorded for the command, times `latency_scale`, so the replay has the
+    session's timing distribution rather than its exact sequence. Commands that
+    timed out when recorded never answer; those that failed raise ReplayError.
+    """
+
+    def __init__(
+        self,
+        entries: Sequence[SessionEntry],
+        latency_scale: float = 1.0,
+        seed: int | None = None,
+    ) -> None:
+        self.latency_scale = latency_scale
+        self.calls: List[str] = []
+        self._random = random.Random(seed)
+        self._answers: Dict[str, List[SessionEntry]] = {}
+        self._used: Dict[str, int] = {}
+        self._by_command: Dict[str, SessionEntry] = {}
+        self._latencies: Dict[str, List[float]] = {}
+        for entry in entries:
+            if entry.bus is None and entry.response is None:
+                # Never reached baresip, so there is nothing to answer with.
+                continue
+            self._answers.setdefault(entry.action, []).append(entry)
+            self._by_command.setdefault(entry.command, entry)
+            if entry.bus is not None:
+                self._latencies.setdefault(entry.command, []).append(entry.bus)
+
+    async def call_invoke(self, action: str) -> str:
+        self.calls.append(action)
+        command = action.split(" ", 1)[0]
+        answers = self._answers.get(action)
+        if answers:
+            used = self._used.get(action, 0)
+            self._used[action] = used + 1
+            entry: SessionEntry | None = answers[min(used, len(answers) - 1)]
+        else:
+            entry = self._by_command.get(command)
+        latencies = self._latencies.get(command)
+        if latencies:
+            await asyncio.sleep(self._random.choice(latencies) * self.latency_scale)
+        if entry is None:
+            return ""
+        if entry.response is not None:
+            return entry.response
+        if entry.error is not None and "Timeout" in entry.error.split(":", 1)[0]:
+            await asyncio.get_running_loop().create_future()
+        raise ReplayError(entry.error)
+
+
+@dc.dataclass(frozen=True)
+class SessionStats:
+    """
+    Throughput and client-side latency of a session, in seconds.
+    """
+
+    commands: int
+    errors: int
+    elapsed: float
+    p50: float
+    p95: float
+    p99: float
+
+    @property
+    def throughput(self) -> float:
+        return self.commands / self.elapsed if self.elapsed > 0 else 0.0
+
+    @classmethod
+    def of(cls, entries: Sequence[SessionEntry]) -> SessionStats:
+        latencies = sorted(e.latency for e in entries)
+        elapsed = max((e.offset + e.latency for e in entries), default=0.0)
+        return cls(
+            commands=len(entries),
+            errors=sum(1 for e in entries if e.error is not None),
+            elapsed=elapsed - min((e.offset for e in entries), default=0.0),
+            p50=_percentile(latencies, 50),
+            p95=_percentile(latencies, 95),
+            p99=_percentile(latencies, 99),
+        )
+
+
+def _percentile(ordered: Sequence[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(len(ordered) * pct / 100) - 1)]
+
+
+@dc.dataclass(frozen=True)
+class SessionReport:
+    """
+    A replay compared with the session it replayed, overall and per command.
+    """
+
+    original: SessionStats
+    replayed: SessionStats
+    commands: Dict[str, tuple[SessionStats, SessionStats]]
+
+    def format(self) -> str:
+        lines = [
+            f"{'':<12} {'commands':>8} {'errors':>6} {'cmd/s':>14}"
+            f" {'p50 ms':>14} {'p95 ms':>14} {'p99 ms':>14}"
+        ]
+        rows = [("all", (self.original, self.replayed))]
+        rows.extend(sorted(self.commands.items()))
+        for name, (old, new) in rows:
+            lines.append(
+                f"{name:<12} {new.commands:>8} {new.errors:>6}"
+                f" {_delta(old.throughput, new.throughput, 1.0, '.0f'):>14}"
+                f" {_delta(old.p50, new.p50):>14} {_delta(old.p95, new.p95):>14}"
+                f" {_delta(old.p99, new.p99):>14}"
+            )
+        return "\n".join(lines)
+
+
+def _delta(old: float, new: float, scale: float = 1000.0, fmt: str = ".2f") -> str:
+    if not old:
+        return format(new * scale, fmt)
+    return f"{new * scale:{fmt}} {(new - old) / old:+.0%}"
+
+
+def compare(
+    original: Sequence[SessionEntry], replayed: Sequence[SessionEntry]
+) -> SessionReport:
+    def by_command(entries: Sequence[SessionEntry]) -> Dict[str, List[SessionEntry]]:
+        grouped: Dict[str, List[SessionEntry]] = {}
+        for entry in entries:
+            grouped.setdefault(entry.command, []).append(entry)
+        return grouped
+
+    old, new = by_command(original), by_command(replayed)
+    return SessionReport(
+        original=SessionStats.of(original),
+        replayed=SessionStats.of(replayed),
+        commands={
+            name: (SessionStats.of(old.get(name, [])), SessionStats.of(entries))
+            for name, entries in new.items()
+        },
+    )
+
+
+async def replay(
+    client: pbs.PyBareSIP,
+    entries: Sequence[SessionEntry],
+    speed: float | None = 1.0,
+    latency_scale: float = 1.0,
+    seed: int | None = None,
+    **kwargs: Any,
+) -> SessionReport:
+    """
+    Replays a recorded session through `client`, against a ReplayInterface, and
+    compares the result with the original.
+
+    Commands are invoked at their recorded offsets divided by `speed`, so the
+    replay has the same command mix and concurrency; with `speed` None they are
+    all invoked at once, to find the client's maximum throughput. The client
+    should be configured as the one under test (scheduler, timeouts and so on);
+    it does not need to be connected, and gets its own interface and state back
+    afterwards, so the replayed (redacted) commands are never re-sent on reconnect.
+    Any other arguments go to ReplayInterface.
+    """
+    interface = getattr(client, "_interface", None)
+    client._interface = ReplayInterface(  # type: ignore[assignment]
+        entries, latency_scale=latency_scale, seed=seed, **kwargs
+    )
+    state, client._state = client._state, pbs_rc.ClientState()
+    recorder = SessionRecorder()
+    previous, client.recorder = client.recorder, recorder
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    first = entries[0].offset if entries else 0.0
+
+    async def run(entry: SessionEntry) -> None:
+        if speed is not None:
+            delay = start + (entry.offset - first) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        try:
+            await client.invoke(entry.action)
+        except Exception:
+            # Recorded by the recorder; the comparison counts it.
+            pass
+
+    try:
+        await asyncio.gather(*(run(entry) for entry in entries))
+    finally:
+        client.recorder = previous
+        client._state = state
+        if interface is None:
+            del client._interface
+        else:
+            client._interface = interface
+    return compare(entries, recorder.entries)
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import dataclasses as dc
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+import pybaresip.baresip as pbs
+import pybaresip.identity as pbs_id
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    A consistent-hash ring with virtual nodes.
+
+    Each node is placed on the ring `vnodes` times. A key belongs to the first node
+    clockwise from the key's hash, so adding or removing a node only moves the keys
+    between that node's points and their predecessors.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 128) -> None:
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        self._nodes: set[str] = set()
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> frozenset[str]:
+        return frozenset(self._nodes)
+
+    def add(self, node: str) -> None:
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            idx = bisect.bisect(self._points, point)
+            self._points.insert(idx, point)
+            self._owners.insert(idx, node)
+
+    def remove(self, node: str) -> None:
+        if node not in self._nodes:
+            return
+        self._nodes.remove(node)
+        keep = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in keep]
+        self._owners = [o for _, o in keep]
+
+    def node_for(self, key: str) -> str:
+        if not self._points:
+            raise Exception("The hash ring has no nodes")
+        idx = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[idx]
+
+
+@dc.dataclass
+class Rebalance:
+    """
+    The accounts that changed instance, as (aor, old instance, new instance).
+    `old` is None for accounts that were not placed before, and the same as `new`
+    for accounts recreated in place because their settings changed.
+    """
+
+    moved: List[Tuple[str, str | None, str]] = dc.field(default_factory=list)
+    failed: List[Tuple[str, BaseException]] = dc.field(default_factory=list)
+
+
+class AccountSharder:
+    """
+    Places identities across several baresip instances by consistent hashing on
+    their AOR, and keeps each instance's User-Agents in line with its share.
+
+    Placement is cached in a dict, so `client_for()` (used to route inbound events
+    and `dial_as()`) is a single lookup. Adding or removing an instance only issues
+    `uadel`/`uanew` for the accounts whose owner changed.
+    """
+
+    def __init__(
+        self,
+        instances: Dict[str, pbs.PyBareSIP],
+        vnodes: int = 128,
+        concurrency: int = 16,
+    ) -> None:
+        self._instances = dict(instances)
+        self._ring = HashRing(self._instances, vnodes=vnodes)
+        self._identities: Dict[str, pbs_id.AnyIdentity] = {}
+        self._owner: Dict[str, str] = {}
+        self._concurrency = concurrency
+
+    @property
+    def instances(self) -> Dict[str, pbs.PyBareSIP]:
+        return dict(self._instances)
+
+    def owner(self, aor: str) -> str:
+        """
+        Returns the name of the instance that holds `aor`.
+        """
+        return self._owner[aor]
+
+    def client_for(self, aor: str) -> pbs.PyBareSIP:
+        return self._instances[self._owner[aor]]
+
+    def accounts_on(self, name: str) -> List[str]:
+        return [aor for aor, owner in self._owner.items() if owner == name]
+
+    async def add_identities(
+        self, identities: Iterable[pbs_id.AnyIdentity]
+    ) -> Rebalance:
+        """
+        Places new identities and creates them on their instances. An identity
+        already placed is recreated where it is if its flags changed.
+        """
+        moves: List[Tuple[str, str | None, str]] = []
+        for identity in identities:
+            previous = self._identities.get(identity.aor)
+            self._identities[identity.aor] = identity
+            owner = self._owner.get(identity.aor)
+            if owner is None:
+                moves.append((identity.aor, None, self._ring.node_for(identity.aor)))
+            elif previous is None or previous.sip != identity.sip:
+                moves.append((identity.aor, owner, owner))
+        return await self._apply(moves)
+
+    async def remove_identities(self, aors: Iterable[str]) -> Rebalance:
+        result = Rebalance()
+        for aor in aors:
+            self._identities.pop(aor, None)
+            owner = self._owner.pop(aor, None)
+            if owner is None:
+                continue
+            try:
+                await self._instances[owner].uadel(aor)
+            except Exception as e:
+                result.failed.append((aor, e))
+        return result
+
+    async def add_instance(self, name: str, client: pbs.PyBareSIP) -> Rebalance:
+        """
+        Adds an instance and moves onto it the accounts it now owns.
+        """
+        self._instances[name] = client
+        self._ring.add(name)
+        return await self._rebalance()
+
+    async def remove_instance(self, name: str) -> Rebalance:
+        """
+        Removes an instance and recreates its accounts on their new owners. The
+        removed instance is not contacted, as it is usually gone already.
+        """
+        self._ring.remove(name)
+        for aor in self.accounts_on(name):
+            del self._owner[aor]
+        del self._instances[name]
+        return await self._rebalance()
+
+    async def dial_as(
+        self, aor: str, destination: str, deadline: float | None = None
+    ) -> str:
+        """
+        Dials from `aor` on the instance that holds it.
+        """
+        return await self.client_for(aor).dial_as(aor, destination, deadline=deadline)
+
+    async def _rebalance(self) -> Rebalance:
+        moves: List[Tuple[str, str | None, str]] = []
+        for aor in self._identities:
+            old = self._owner.get(aor)
+            new = self._ring.node_for(aor)
+            if old != new:
+                moves.append((aor, old, new))
+        return await self._apply(moves)
+
+    async def _apply(self, moves: List[Tuple[str, str | None, str]]) -> Rebalance:
+        result = Rebalance()
+        limit = asyncio.Semaphore(self._concurrency)
+
+        async def move(aor: str, old: str | None, new: str) -> None:
+            async with limit:
+                try:
+                    if old is not None:
+                        await self._instances[old].uadel(aor)
+                        # Until uanew succeeds the account is on no instance.
+                        del self._owner[aor]
+                    # Not uanew(), whose check rejects users such as E.164 numbers.
+                    sip = self._identities[aor].sip
+                    await self._instances[new].invoke(f"uanew {sip}")
+                except Exception as e:
+                    logger.warning(
+                        pbs_id.redact(f"Moving {aor} from {old} to {new} failed: {e}")
+                    )
+                    result.failed.append((aor, e))
+                    return
+                self._owner[aor] = new
+                result.moved.append((aor, old, new))
+
+        await asyncio.gather(*(move(*m) for m in moves))
+        return result
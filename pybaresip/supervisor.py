@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import shutil
+import signal
+import tempfile
+from typing import Callable, Iterator
+
+import dbus_next as dn
+import dbus_next.aio as aio_dn
+
+import pybaresip.config as pbs_conf
+import pybaresip.reconnect as pbs_rc
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class BaresipSupervisor:
+    """
+    Runs baresip as an asyncio subprocess and keeps it running.
+
+    `start()` returns as soon as baresip's bus name appears, so a `PyBareSIP` client
+    can `connect()` straight away instead of sleeping. If baresip exits unexpectedly
+    it is restarted with exponential backoff. `stop()` asks baresip to `quit` over the
+    bus, then escalates to SIGTERM and finally SIGKILL.
+
+    Usage:
+
+        async with BaresipSupervisor() as supervisor:
+            client = PyBareSIP(bus_name=supervisor.bus_name)
+            await client.connect()
+    """
+
+    def __init__(
+        self,
+        baresip_exe: str | None = None,
+        config: pbs_conf.BaresipConfig | None = None,
+        config_dir: str | None = None,
+        bus_name: str = "com.github.Baresip",
+        path: str = "/baresip",
+        on_output: Callable[[str], None] | None = None,
+        ready_timeout: float = 10.0,
+        stop_timeout: float = 5.0,
+        restart_initial_delay: float = 0.5,
+        restart_max_delay: float = 30.0,
+    ) -> None:
+        """
+        baresip_exe: Override auto-detection of the baresip cli tool
+
+        config_dir: Where the generated configuration is written. A temporary
+        directory is used, and removed on stop, when this is not given.
+
+        on_output: Called with each line baresip writes to stdout or stderr. Lines are
+        logged at debug level when it is not given.
+        """
+        self._baresip_exe = self._resolve_baresip_exe(baresip_exe)
+        self.config = config or pbs_conf.BaresipConfig()
+        self._config_dir = config_dir
+        self._owns_config_dir = config_dir is None
+        self.bus_name = bus_name
+        self.path = path
+        self._on_output = on_output or self._log_output
+        self.ready_timeout = ready_timeout
+        self.stop_timeout = stop_timeout
+        self._restart_initial_delay = restart_initial_delay
+        self._restart_max_delay = restart_max_delay
+        self._bus: aio_dn.MessageBus | None = None
+        self._proc: asyncio.subprocess.Process | None = None
+        self._ready: asyncio.Event | None = None
+        self._reader: asyncio.Future | None = None
+        self._watcher: asyncio.Future | None = None
+        self._stopping = False
+        self.restarts = 0
+
+    def _resolve_baresip_exe(self, baresip_exe: str | None) -> str:
+        if not baresip_exe:
+            baresip_exe = shutil.which(cmd="baresip")
+            if not baresip_exe:
+                raise Exception("'baresip' not found via PATH environment")
+        elif not os.path.isfile(baresip_exe):
+            raise Exception(f"{baresip_exe} not found")
+        return baresip_exe
+
+    @property
+    def config_dir(self) -> str | None:
+        return self._config_dir
+
+    @property
+    def pid(self) -> int | None:
+        return self._proc.pid if self._proc else None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready is not None and self._ready.is_set()
+
+    async def __aenter__(self) -> BaresipSupervisor:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        """
+        Generates the configuration, launches baresip and waits until it is on the bus.
+        """
+        self._stopping = False
+        self._ready = asyncio.Event()
+        if self._config_dir is None:
+            self._config_dir = tempfile.mkdtemp(prefix="pybaresip-")
+        pbs_conf.write_config_dir(self._config_dir, self.config)
+        await self._open_bus()
+        if await self._has_owner():
+            raise Exception(
+                f"{self.bus_name} is already owned on the bus; another baresip is "
+                "running"
+            )
+        try:
+            await self._launch()
+        except BaseException:
+            await self.stop()
+            raise
+        self._watcher = asyncio.ensure_future(self._watch())
+
+    async def wait_ready(self) -> None:
+        """
+        Waits until baresip owns its bus name, or raises if it exits first.
+        """
+        assert self._ready is not None and self._proc is not None
+        ready = asyncio.ensure_future(self._ready.wait())
+        exited = asyncio.ensure_future(self._proc.wait())
+        try:
+            done, _ = await asyncio.wait(
+                {ready, exited},
+                timeout=self.ready_timeout,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            ready.cancel()
+            exited.cancel()
+            await asyncio.gather(ready, exited, return_exceptions=True)
+        if ready not in done:
+            if exited in done:
+                raise Exception(
+                    f"baresip exited with {self._proc.returncode} before it was ready"
+                )
+            raise asyncio.TimeoutError(
+                f"baresip did not claim {self.bus_name} within {self.ready_timeout}s"
+            )
+
+    async def stop(self) -> None:
+        """
+        Shuts baresip down: `quit` over the bus, then SIGTERM, then SIGKILL.
+        """
+        self._stopping = True
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+        proc = self._proc
+        if proc is not None and proc.returncode is None:
+            if self.ready:
+                try:
+                    await asyncio.wait_for(self._send_quit(), self.stop_timeout)
+                    await asyncio.wait_for(proc.wait(), self.stop_timeout)
+                except Exception as e:
+                    logger.warning(f"baresip did not quit cleanly: {e!r}")
+            for sig in (signal.SIGTERM, signal.SIGKILL):
+                if proc.returncode is not None:
+                    break
+                logger.info(f"Sending {sig.name} to baresip ({proc.pid})")
+                proc.send_signal(sig)
+                try:
+                    await asyncio.wait_for(proc.wait(), self.stop_timeout)
+                except asyncio.TimeoutError:
+                    pass
+        if self._reader is not None:
+            await self._reader
+            self._reader = None
+        if self._bus is not None:
+            self._bus.disconnect()
+            self._bus = None
+        if self._owns_config_dir and self._config_dir is not None:
+            shutil.rmtree(self._config_dir, ignore_errors=True)
+            self._config_dir = None
+
+    async def _launch(self) -> None:
+        assert self._ready is not None and self._config_dir is not None
+        self._ready.clear()
+        logger.info(f"Starting baresip via {self._baresip_exe}")
+        self._proc = await asyncio.create_subprocess_exec(
+            self._baresip_exe,
+            "-f",
+            self._config_dir,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        self._reader = asyncio.ensure_future(self._read_output(self._proc))
+        await self.wait_ready()
+
+    async def _watch(self) -> None:
+        """
+        Restarts baresip with backoff whenever it exits while it is meant to be up.
+        The backoff resets once a restart has stayed up for `restart_max_delay`.
+        """
+        loop = asyncio.get_running_loop()
+        delays = self._delays()
+        while not self._stopping:
+            assert self._proc is not None
+            started = loop.time()
+            rc = await self._proc.wait()
+            if self._stopping:
+                return
+            if loop.time() - started > self._restart_max_delay:
+                delays = self._delays()
+            delay = next(delays)
+            logger.warning(f"baresip exited with {rc}; restarting in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            try:
+                await self._launch()
+                self.restarts += 1
+            except Exception as e:
+                logger.error(f"Restarting baresip failed: {e}")
+                if self._proc.returncode is None:
+                    self._proc.kill()
+
+    def _delays(self) -> Iterator[float]:
+        return pbs_rc.backoff_delays(
+            self._restart_initial_delay, self._restart_max_delay
+        )
+
+    async def _read_output(self, proc: asyncio.subprocess.Process) -> None:
+        assert proc.stdout is not None
+        async for line in proc.stdout:
+            self._on_output(line.decode(errors="replace").rstrip("\r\n"))
+
+    def _log_output(self, line: str) -> None:
+        logger.debug("baresip: %s", line)
+
+    async def _open_bus(self) -> None:
+        """
+        Connects to the session bus and watches for baresip claiming its name.
+        """
+        if self._bus is not None:
+            return
+        self._bus = await aio_dn.MessageBus().connect()
+        path = "/org/freedesktop/DBus"
+        name = "org.freedesktop.DBus"
+        api = await self._bus.introspect(name, path)
+        self._dbus = self._bus.get_proxy_object(name, path, api).get_interface(name)
+        self._dbus.on_name_owner_changed(self._name_owner_changed)  # type: ignore[attr-defined]
+
+    async def _has_owner(self) -> bool:
+        return await self._dbus.call_name_has_owner(self.bus_name)  # type: ignore[attr-defined]
+
+    def _name_owner_changed(self, name: str, old_owner: str, new_owner: str) -> None:
+        if name != self.bus_name or self._ready is None:
+            return
+        if new_owner:
+            self._ready.set()
+        else:
+            self._ready.clear()
+
+    async def _send_quit(self) -> None:
+        assert self._bus is not None
+        await self._bus.call(
+            dn.Message(
+                destination=self.bus_name,
+                path=self.path,
+                interface=self.bus_name,
+                member="invoke",
+                signature="s",
+                body=["quit"],
+            )
+        )
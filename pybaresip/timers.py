@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class Timer:
+    """
+    A callback scheduled with a TimerScheduler or TimerWheel. Cancelling is O(1).
+    """
+
+    __slots__ = ("when", "callback", "args", "_scheduler")
+
+    def __init__(
+        self,
+        when: float,
+        callback: Callable[..., Any],
+        args: Tuple,
+        scheduler: AnyScheduler,
+    ) -> None:
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self._scheduler: AnyScheduler | None = scheduler
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        True once the timer has been cancelled or has fired.
+        """
+        return self._scheduler is None
+
+    def cancel(self) -> None:
+        scheduler, self._scheduler = self._scheduler, None
+        if scheduler is not None:
+            scheduler._discarded(self)
+
+
+class TimerScheduler:
+    """
+    Runs many timed callbacks off a single event loop timer.
+
+    Deadlines are kept in a heap and only the earliest is registered with the loop,
+    so thousands of pending timeouts cost one loop handle and a heap entry each,
+    rather than a loop handle (or a task) each.
+    """
+
+    def __init__(self) -> None:
+        self._heap: List[Tuple[float, int, Timer]] = []
+        self._seq = itertools.count()
+        self._handle: asyncio.TimerHandle | None = None
+        self._armed: float | None = None
+        self._cancelled = 0
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._cancelled
+
+    def call_later(
+        self, delay: float, callback: Callable[..., Any], *args: Any
+    ) -> Timer:
+        loop = asyncio.get_running_loop()
+        return self.call_at(loop.time() + delay, callback, *args)
+
+    def call_at(self, when: float, callback: Callable[..., Any], *args: Any) -> Timer:
+        timer = Timer(when, callback, args, self)
+        heapq.heappush(self._heap, (when, next(self._seq), timer))
+        if self._armed is None or when < self._armed:
+            self._arm(when)
+        return timer
+
+    def _discarded(self, timer: Timer) -> None:
+        # The entry stays in the heap until it reaches the front. Rebuild once most
+        # of the heap is dead, so it stays proportional to the live timers.
+        self._cancelled += 1
+        if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+            self._heap = [e for e in self._heap if not e[2].cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = self._armed = None
+        for _, _, timer in self._heap:
+            timer._scheduler = None
+        self._heap.clear()
+        self._cancelled = 0
+
+    def _arm(self, when: float) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+        self._armed = when
+        self._handle = asyncio.get_running_loop().call_at(when, self._run)
+
+    def _run(self) -> None:
+        self._handle = self._armed = None
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, _, timer = heapq.heappop(heap)
+            if timer.cancelled:
+                self._cancelled -= 1
+                continue
+            timer._scheduler = None
+            try:
+                timer.callback(*timer.args)
+            except Exception:
+                logger.exception(f"Timer callback {timer.callback!r} failed")
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+            self._cancelled -= 1
+        if heap:
+            self._arm(heap[0][0])
+
+
+class _WheelTimer(Timer):
+    __slots__ = ("tick", "_slot")
+
+    def __init__(
+        self,
+        when: float,
+        callback: Callable[..., Any],
+        args: Tuple,
+        scheduler: TimerWheel,
+        tick: int,
+    ) -> None:
+        super().__init__(when, callback, args, scheduler)
+        self.tick = tick
+        self._slot: Dict[_WheelTimer, None] | None = None
+
+
+class TimerWheel:
+    """
+    Runs many timed callbacks off one periodic loop tick, with O(1) scheduling and
+    cancelling.
+
+    Time is cut into ticks of `resolution` seconds. A hierarchical wheel holds
+    `levels` rings of `slots` slots: the first has a slot per tick, each following
+    one a slot per turn of the ring below it, so 4 rings of 64 slots reach 64**4
+    ticks (19 days at 0.1s) ahead. A timer goes into the slot covering its tick at
+    the lowest level that reaches it, and is moved down a level each time the ring
+    below comes round to it, so it is touched at most `levels` times before it
+    fires. Cancelling removes it from its slot.
+
+    Timers fire on the first tick at or after their deadline, so up to
+    `resolution` late; use TimerScheduler where that matters. The loop is only
+    ticked while timers are pending.
+    """
+
+    def __init__(self, resolution: float = 0.1, slots: int = 64, levels: int = 4):
+        if slots < 2 or slots & (slots - 1):
+            raise ValueError(f"slots must be a power of two, not {slots}")
+        self.resolution = resolution
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        self._span = slots**levels
+        self._wheel: List[List[Dict[_WheelTimer, None]]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ]
+        self._origin: float | None = None
+        # The next tick to process.
+        self._tick = 0
+        self._count = 0
+        self._handle: asyncio.TimerHandle | None = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def call_later(
+        self, delay: float, callback: Callable[..., Any], *args: Any
+    ) -> Timer:
+        loop = asyncio.get_running_loop()
+        return self._schedule(loop, loop.time() + delay, callback, args)
+
+    def call_at(self, when: float, callback: Callable[..., Any], *args: Any) -> Timer:
+        return self._schedule(asyncio.get_running_loop(), when, callback, args)
+
+    def _schedule(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        when: float,
+        callback: Callable[..., Any],
+        args: Tuple,
+    ) -> Timer:
+        if self._origin is None:
+            self._origin = loop.time()
+        if not self._count:
+            # Nothing is pending, so the ticks passed while idle can be skipped.
+            now = math.floor((loop.time() - self._origin) / self.resolution) + 1
+            self._tick = max(self._tick, now)
+        tick = math.ceil((when - self._origin) / self.resolution)
+        if tick < self._tick:
+            tick = self._tick
+        timer = _WheelTimer(when, callback, args, self, tick)
+        self._place(timer)
+        self._count += 1
+        if self._handle is None:
+            self._arm(loop)
+        return timer
+
+    def _place(self, timer: _WheelTimer) -> None:
+        tick = timer.tick
+        delta = tick - self._tick
+        if delta >= self._span:
+            # Parked at the far end; it moves back up when it is cascaded.
+            tick = self._tick + self._span - 1
+            delta = self._span - 1
+        level = 0
+        bits = self._bits
+        delta >>= bits
+        while delta:
+            level += 1
+            delta >>= bits
+        slot = self._wheel[level][(tick >> (bits * level)) & self._mask]
+        slot[timer] = None
+        timer._slot = slot
+
+    def _discarded(self, timer: Timer) -> None:
+        assert isinstance(timer, _WheelTimer)
+        if timer._slot is not None:
+            del timer._slot[timer]
+            timer._slot = None
+        self._count -= 1
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        for ring in self._wheel:
+            for slot in ring:
+                for timer in slot:
+                    timer._scheduler = timer._slot = None
+                slot.clear()
+        self._count = 0
+
+    def _arm(self, loop: asyncio.AbstractEventLoop) -> None:
+        assert self._origin is not None
+        when = self._origin + self._tick * self.resolution
+        self._handle = loop.call_at(when, self._run)
+
+    def _run(self) -> None:
+        self._handle = None
+        assert self._origin is not None
+        loop = asyncio.get_running_loop()
+        now = math.floor((loop.time() - self._origin) / self.resolution)
+        # Catches up tick by tick if the loop was held up.
+        while self._tick <= now and self._count:
+            self._advance()
+        # A callback may already have armed the next tick.
+        if self._count and self._handle is None:
+            self._arm(loop)
+
+    def _advance(self) -> None:
+        tick = self._tick
+        mask = self._mask
+        index = tick & mask
+        level = 1
+        while not index and level < len(self._wheel):
+            index = (tick >> (self._bits * level)) & mask
+            ring = self._wheel[level]
+            slot, ring[index] = ring[index], {}
+            for timer in slot:
+                self._place(timer)
+            level += 1
+        ring = self._wheel[0]
+        slot, ring[tick & mask] = ring[tick & mask], {}
+        # Timers scheduled by the callbacks go on the following ticks.
+        self._tick = tick + 1
+        for timer in list(slot):
+            if timer._slot is not slot:
+                # Cancelled by an earlier callback.
+                continue
+            timer._scheduler = timer._slot = None
+            self._count -= 1
+            try:
+                timer.callback(*timer.args)
+            except Exception:
+                logger.exception(f"Timer callback {timer.callback!r} failed")
+
+
+AnyScheduler = Union[TimerScheduler, TimerWheel]
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import concurrent.futures
+import dataclasses as dc
+import hashlib
+import logging
+import os
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import pybaresip.config as pbs_cfg
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Renders text in a voice to audio in a format, e.g. ("Hello", "en-GB", "wav").
+# With a process pool, this must be a module-level function so it can be pickled.
+Synthesizer = Callable[[str, str, str], bytes]
+
+
+@dc.dataclass
+class TtsStats:
+    hits: int = 0
+    synthesized: int = 0
+    evicted: int = 0
+
+
+def cache_key(text: str, voice: str, fmt: str) -> str:
+    """
+    The name of the cache entry for `text` in `voice` and `fmt`.
+    """
+    digest = hashlib.sha256()
+    for part in (voice, fmt, text):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class AudioCache:
+    """
+    A content-addressed directory of rendered audio, capped at `max_bytes`.
+
+    Entries are named by `cache_key()` and spread over subdirectories by the first
+    two characters of the key. Files are written atomically, so baresip never
+    plays a partly written one. When the cache grows past `max_bytes` the least
+    recently used entries are removed; use is recorded in the file's mtime, so the
+    order survives restarts.
+    """
+
+    def __init__(self, directory: str, fmt: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.fmt = fmt
+        self.max_bytes = max_bytes
+        self.size = 0
+        # key -> size, least recently used first
+        self._entries: collections.OrderedDict[str, int] = collections.OrderedDict()
+        self._scan()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.{self.fmt}")
+
+    def get(self, key: str) -> str | None:
+        """
+        Returns the file holding `key`, marking it as used, or None.
+        """
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Removed behind our back.
+            self.size -= self._entries.pop(key)
+            return None
+        return path
+
+    def write(self, key: str, audio: bytes) -> str:
+        """
+        Writes an entry's file. Safe to call from a worker thread; `add()` it on the
+        loop afterwards.
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with pbs_cfg.atomic_writer(path, "wb") as f:
+            f.write(audio)
+        return path
+
+    def add(self, key: str, size: int) -> List[str]:
+        """
+        Records a written entry and returns the keys evicted to make room for it.
+        """
+        if key in self._entries:
+            self.size -= self._entries[key]
+        self._entries[key] = size
+        self._entries.move_to_end(key)
+        self.size += size
+        evicted = []
+        # The newest entry stays, even when it is larger than the cap by itself.
+        while self.size > self.max_bytes and len(self._entries) > 1:
+            old, old_size = self._entries.popitem(last=False)
+            self.size -= old_size
+            try:
+                os.unlink(self.path(old))
+            except FileNotFoundError:
+                pass
+            evicted.append(old)
+        return evicted
+
+    def _scan(self) -> None:
+        suffix = f".{self.fmt}"
+        found: List[Tuple[float, str, int]] = []
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+            return
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.is_file() and entry.name.endswith(suffix):
+                    st = entry.stat()
+                    key = os.path.splitext(entry.name)[0]
+                    found.append((st.st_mtime, key, st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.size += size
+
+
+class TextToSpeech:
+    """
+    Renders prompts with a synthesizer callback and caches the audio on disk.
+
+    The synthesizer runs in `executor` (the loop's default thread pool when None;
+    pass a ProcessPoolExecutor for synthesizers that hold the GIL), so it never
+    blocks the bus loop. Rendered audio is kept in an AudioCache under `cache_dir`,
+    keyed by text, voice and format, so a prompt is synthesized once and every
+    later request for it is a dict lookup. Concurrent requests for a prompt that is
+    still rendering share the one synthesis.
+
+    Pass an instance to `PyBareSIP(tts=...)` to use `play(text=...)`.
+    """
+
+    def __init__(
+        self,
+        synthesizer: Synthesizer,
+        cache_dir: str,
+        voice: str = "default",
+        fmt: str = "wav",
+        max_bytes: int = 256 * 1024 * 1024,
+        executor: concurrent.futures.Executor | None = None,
+    ) -> None:
+        self.voice = voice
+        self.fmt = fmt
+        self.stats = TtsStats()
+        self._synthesizer = synthesizer
+        self._executor = executor
+        self._cache = AudioCache(cache_dir, fmt, max_bytes)
+        self._rendering: Dict[str, asyncio.Future[str]] = {}
+
+    @property
+    def cache(self) -> AudioCache:
+        return self._cache
+
+    async def render(self, text: str, voice: str | None = None) -> str:
+        """
+        Returns the path of a file holding `text` spoken in `voice`, synthesizing it
+        only if it is not cached.
+        """
+        voice = voice or self.voice
+        key = cache_key(text, voice, self.fmt)
+        path = self._cache.get(key)
+        if path is not None:
+            self.stats.hits += 1
+            return path
+        rendering = self._rendering.get(key)
+        if rendering is None:
+            rendering = asyncio.ensure_future(self._synthesize(key, text, voice))
+            self._rendering[key] = rendering
+            rendering.add_done_callback(lambda _: self._rendering.pop(key, None))
+        else:
+            self.stats.hits += 1
+        return await asyncio.shield(rendering)
+
+    async def prerender(self, texts: Iterable[str], voice: str | None = None) -> int:
+        """
+        Renders prompts ahead of use, e.g. at startup, and returns how many needed
+        synthesizing. Failures are logged and skipped.
+        """
+        before = self.stats.synthesized
+        results = await asyncio.gather(
+            *(self.render(text, voice) for text in set(texts)), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning(f"Could not pre-render a prompt: {result}")
+        return self.stats.synthesized - before
+
+    async def _synthesize(self, key: str, text: str, voice: str) -> str:
+        loop = asyncio.get_running_loop()
+        audio = await loop.run_in_executor(
+            self._executor, self._synthesizer, text, voice, self.fmt
+        )
+        # Written from the default pool: a process pool would have to be sent the
+        # audio again.
+        path = await loop.run_in_executor(None, self._cache.write, key, audio)
+        self.stats.synthesized += 1
+        self.stats.evicted += len(self._cache.add(key, len(audio)))
+        logger.debug("Synthesized %d bytes for %r (%s)", len(audio), text[:40], voice)
+        return path
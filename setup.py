@@ -6,6 +6,7 @@ setup(
     packages=["pybaresip"],
     url="https://github.com/cricalix/pybaresip",
     install_requires=[],
+    extras_require={"yaml": ["pyyaml"], "audio": ["numpy"]},
     license="MIT",
     author="cricalix",
     author_email="pybaresip@cricalix.net",
@@ -0,0 +1,114 @@
+import os
+import tempfile
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.baresip as bs
+import pybaresip.config as config
+import pybaresip.provisioning as prov
+
+from .provisioning import REGINFO, RegInfoInterface, ident
+
+RELOADED = REGINFO.replace("(2)", "(3)") + "  sip:carol@example.com:5060  zzz\n"
+
+
+class ReloadingInterface(RegInfoInterface):
+    """
+    Lists carol once the accounts file has been reloaded, unless `broken`.
+    """
+
+    def __init__(self, broken: bool = False) -> None:
+        super().__init__()
+        self.broken = broken
+
+    async def call_invoke(self, action: str) -> str:
+        if action == "reginfo" and "conf_reload" in self.calls and not self.broken:
+            self.calls.append(action)
+            return RELOADED
+        return await super().call_invoke(action)
+
+
+@tdsl.context
+def accounts_file(context: DSLContext) -> None:
+    @context.before
+    def before(self: ContextData) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "accounts")
+
+    @context.after
+    def after(self: ContextData) -> None:
+        self.tmp.cleanup()
+
+    @context.example
+    def it_writes_one_line_per_identity(self: ContextData) -> None:
+        identities = [ident("alice"), ident("bob")]
+        self.assertEqual(2, config.write_accounts(self.path, iter(identities)))
+        with open(self.path) as f:
+            self.assertEqual([i.sip for i in identities], f.read().splitlines())
+
+    @context.example
+    def it_leaves_the_old_file_alone_when_writing_fails(self: ContextData) -> None:
+        config.write_accounts(self.path, [ident("alice")])
+
+        def broken():
+            yield ident("bob")
+            raise ValueError("bad identity")
+
+        with self.assertRaises(ValueError):
+            config.write_accounts(self.path, broken())
+        with open(self.path) as f:
+            self.assertEqual([ident("alice").sip], f.read().splitlines())
+        self.assertEqual(["accounts"], os.listdir(self.tmp.name))
+
+
+@tdsl.context
+def accounts_provisioner(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.bs = bs.PyBareSIP()
+        self.interface = ReloadingInterface()
+        self.bs._interface = self.interface
+        self.bs._state.record(f"uanew {ident('alice').sip}")
+        self.bs._state.record(f"uanew {ident('bob').sip}")
+        self.identities = [ident("alice"), ident("bob"), ident("carol")]
+
+    @context.after
+    async def after(self: ContextData) -> None:
+        self.tmp.cleanup()
+
+    @context.example
+    async def it_sends_small_changes_as_commands(self: ContextData) -> None:
+        provisioner = prov.AccountsProvisioner(self.bs, self.tmp.name, threshold=2)
+        report = await provisioner.provision(self.identities)
+        self.assertEqual(prov.ProvisionMethod.INCREMENTAL, report.method)
+        self.assertEqual(
+            ["reginfo", f"uanew {ident('carol').sip}"], self.interface.calls
+        )
+        self.assertEqual(3, report.written)
+
+    @context.example
+    async def it_reloads_the_accounts_file_for_large_changes(
+        self: ContextData,
+    ) -> None:
+        provisioner = prov.AccountsProvisioner(self.bs, self.tmp.name, threshold=1)
+        report = await provisioner.provision(self.identities)
+        self.assertEqual(prov.ProvisionMethod.FILE, report.method)
+        self.assertEqual(["reginfo", "conf_reload", "reginfo"], self.interface.calls)
+        with open(provisioner.accounts_path) as f:
+            self.assertEqual([i.sip for i in self.identities], f.read().splitlines())
+        self.assertIn(ident("carol").aor, self.bs._state.user_agents)
+        self.assertEqual([], report.missing)
+
+    @context.example
+    async def it_reports_accounts_the_reload_did_not_load(
+        self: ContextData,
+    ) -> None:
+        self.interface.broken = True
+        provisioner = prov.AccountsProvisioner(self.bs, self.tmp.name, threshold=1)
+        report = await provisioner.provision(self.identities)
+        self.assertEqual([ident("carol").aor], report.missing)
+        self.assertNotIn(ident("carol").aor, self.bs._state.user_agents)
+        self.assertIn(ident("alice").aor, self.bs._state.user_agents)
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import struct
+import tempfile
+
+import numpy
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.amd as amd
+
+from .pool import QuietClient, call_event
+
+RATE = 8000
+
+
+def speech(seconds: float) -> numpy.ndarray:
+    t = numpy.arange(int(RATE * seconds)) / RATE
+    voice = sum(numpy.sin(2 * numpy.pi * 150 * k * t) / k for k in range(1, 5))
+    return (6000 * voice).astype("<i2")
+
+
+def silence(seconds: float) -> numpy.ndarray:
+    rng = numpy.random.default_rng(1)
+    return rng.normal(0, 20, int(RATE * seconds)).astype("<i2")
+
+
+def human() -> numpy.ndarray:
+    return numpy.concatenate((silence(0.4), speech(0.6), silence(1.2)))
+
+
+def machine() -> numpy.ndarray:
+    return numpy.concatenate((silence(0.3), speech(3.0)))
+
+
+def wav_header() -> bytes:
+    # As written by a recorder that has not closed the file: the sizes are unknown.
+    fmt = struct.pack("<HHIIHH", 1, 1, RATE, RATE * 2, 2, 16)
+    unknown = struct.pack("<I", 0xFFFFFFFF)
+    parts = (b"RIFF", unknown, b"WAVEfmt ", struct.pack("<I", len(fmt)), fmt)
+    return b"".join(parts + (b"data", unknown))
+
+
+@tdsl.context
+def amd_detector(context: DSLContext) -> None:
+    @context.example
+    def it_hears_a_human_pause_after_a_short_greeting(self: ContextData) -> None:
+        detector = amd.AmdDetector(RATE)
+        results = [detector.feed(chunk) for chunk in numpy.split(human(), 22)]
+        result = [r for r in results if r is not None][0]
+        self.assertEqual(amd.Verdict.HUMAN, result.verdict)
+        self.assertLess(result.after, 2.0)
+
+    @context.example
+    def it_hears_a_machine_greeting(self: ContextData) -> None:
+        result = amd.AmdDetector(RATE).feed(machine())
+        self.assertEqual(amd.Verdict.MACHINE, result.verdict)
+        self.assertEqual("long greeting", result.reason)
+
+    @context.example
+    def it_calls_long_initial_silence_a_machine(self: ContextData) -> None:
+        result = amd.AmdDetector(RATE).feed(silence(3.0))
+        self.assertEqual(amd.Verdict.MACHINE, result.verdict)
+
+    @context.example
+    def it_is_unknown_without_enough_audio(self: ContextData) -> None:
+        detector = amd.AmdDetector(RATE)
+        self.assertIsNone(detector.feed(silence(1.0)))
+        self.assertEqual(amd.Verdict.UNKNOWN, detector.finish().verdict)
+
+
+@tdsl.context
+def amd_monitor(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.monitor = amd.AmdMonitor(
+            poll_interval=0.01,
+            path_for=lambda event: os.path.join(self.tmp.name, f"{event['id']}.wav"),
+        )
+
+    @context.after
+    async def after(self: ContextData) -> None:
+        await self.monitor.close()
+        self.tmp.cleanup()
+
+    @context.example
+    async def it_reads_the_recording_as_it_grows(self: ContextData) -> None:
+        path = os.path.join(self.tmp.name, "c1.wav")
+        verdict = self.monitor.watch("c1", path)
+        await asyncio.sleep(0.02)
+        audio = human().tobytes()
+        with open(path, "wb", buffering=0) as f:
+            f.write(wav_header()[:20])
+            await asyncio.sleep(0.02)
+            f.write(wav_header()[20:])
+            # Odd-sized writes, so samples are split between reads.
+            while audio:
+                chunk, audio = audio[:1601], audio[1601:]
+                f.write(chunk)
+                await asyncio.sleep(0.005)
+        result = await asyncio.wait_for(verdict, 1.0)
+        self.assertEqual(amd.Verdict.HUMAN, result.verdict)
+        self.assertEqual(result, await self.monitor.verdict("c1"))
+        await self.monitor.close()
+
+    @context.example
+    async def it_gives_up_on_a_header_that_never_parses(self: ContextData) -> None:
+        monitor = amd.AmdMonitor(amd.AmdParams(total=0.05), poll_interval=0.01)
+        path = os.path.join(self.tmp.name, "c1.wav")
+        with open(path, "wb") as f:
+            f.write(b"not a wav file at all")
+        result = await asyncio.wait_for(monitor.watch("c1", path), 1.0)
+        self.assertEqual(amd.Verdict.UNKNOWN, result.verdict)
+        self.assertEqual("no audio", result.reason)
+        await monitor.close()
+
+    @context.example
+    async def it_watches_answered_calls(self: ContextData) -> None:
+        client = QuietClient()
+        client.add_event_listener(self.monitor)
+        with open(os.path.join(self.tmp.name, "c1.wav"), "wb") as f:
+            f.write(wav_header() + machine().tobytes())
+        call_event(client, "CALL_ESTABLISHED", "c1")
+        call_event(client, "CALL_ESTABLISHED", "c2")
+        result = await self.monitor.verdict("c1")
+        self.assertEqual(amd.Verdict.MACHINE, result.verdict)
+        pending = asyncio.ensure_future(self.monitor.verdict("c2"))
+        await asyncio.sleep(0)
+        call_event(client, "CALL_CLOSED", "c2")
+        self.assertEqual(amd.Verdict.UNKNOWN, (await pending).verdict)
+        await self.monitor.close()
@@ -16,8 +16,39 @@ def baresip_accept(context: DSLContext) -> None:
         async def before(self: ContextData) -> None:
             self.mock_async_callable(target=self.bs, method="invoke").to_return_value(
                 "None"
-            ).for_call("accept").and_assert_called_once()
+            ).for_call("accept", deadline=None).and_assert_called_once()
 
         @context.example
         async def it_calls_invoke_with_accept(self: ContextData) -> None:
             await self.bs.accept()
+
+    @context.sub_context
+    def when_accept_is_called_with_a_call_id(context: DSLContext) -> None:
+        @context.before
+        async def before(self: ContextData) -> None:
+            self.mock_async_callable(target=self.bs, method="callfind").for_call(
+                "abc123", deadline=None
+            ).to_return_value("").and_assert_called_once()
+            self.mock_async_callable(target=self.bs, method="invoke").to_return_value(
+                "None"
+            ).for_call("accept", deadline=None).and_assert_called_once()
+
+        @context.example
+        async def it_selects_the_call_then_accepts(self: ContextData) -> None:
+            await self.bs.accept("abc123")
+
+    @context.sub_context
+    def when_the_call_does_not_exist(context: DSLContext) -> None:
+        @context.before
+        async def before(self: ContextData) -> None:
+            self.mock_async_callable(target=self.bs, method="callfind").to_return_value(
+                "call abc123 not found"
+            ).and_assert_called_once()
+            self.mock_async_callable(target=self.bs, method="invoke").to_return_value(
+                ""
+            ).and_assert_not_called()
+
+        @context.example
+        async def it_raises_an_exception(self: ContextData) -> None:
+            with self.assertRaises(Exception):
+                await self.bs.accept("abc123")
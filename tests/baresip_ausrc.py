@@ -16,7 +16,7 @@ def baresip_ausrc(context: DSLContext) -> None:
         async def before(self: ContextData) -> None:
             self.mock_async_callable(target=self.bs, method="invoke").to_return_value(
                 "None"
-            ).for_call("ausrc")
+            ).for_call("ausrc", deadline=None)
 
         @context.example
         async def it_calls_invoke_with_ausrc(self: ContextData) -> None:
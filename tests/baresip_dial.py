@@ -16,7 +16,9 @@ def baresip_dial(context: DSLContext) -> None:
         async def before(self: ContextData) -> None:
             self.mock_async_callable(target=self.bs, method="invoke").to_return_value(
                 "None"
-            ).for_call("dial sip:test@localhost").and_assert_called_once()
+            ).for_call(
+                "dial sip:test@localhost", deadline=None
+            ).and_assert_called_once()
 
         @context.example
         async def it_calls_invoke_with_dial(self: ContextData) -> None:
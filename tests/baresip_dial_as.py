@@ -0,0 +1,42 @@
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+from .context import PyBareSIPContext
+
+
+@tdsl.context
+def baresip_dial_as(context: DSLContext) -> None:
+    context.shared_context(PyBareSIPContext)
+    context.merge_context("PyBareSIPContext")
+
+    @context.sub_context
+    def when_the_user_agent_exists(context: DSLContext) -> None:
+        @context.before
+        async def before(self: ContextData) -> None:
+            self.mock_async_callable(target=self.bs, method="uafind").for_call(
+                "sip:me@localhost", deadline=None
+            ).to_return_value("").and_assert_called_once()
+            self.mock_async_callable(target=self.bs, method="dial").for_call(
+                "sip:test@localhost", deadline=None
+            ).to_return_value("").and_assert_called_once()
+
+        @context.example
+        async def it_selects_the_agent_then_dials(self: ContextData) -> None:
+            await self.bs.dial_as("sip:me@localhost", "sip:test@localhost")
+
+    @context.sub_context
+    def when_the_user_agent_does_not_exist(context: DSLContext) -> None:
+        @context.before
+        async def before(self: ContextData) -> None:
+            self.mock_async_callable(target=self.bs, method="uafind").to_return_value(
+                "could not find UA"
+            ).and_assert_called_once()
+            self.mock_async_callable(target=self.bs, method="dial").to_return_value(
+                ""
+            ).and_assert_not_called()
+
+        @context.example
+        async def it_raises_an_exception(self: ContextData) -> None:
+            with self.assertRaises(Exception):
+                await self.bs.dial_as("sip:me@localhost", "sip:test@localhost")
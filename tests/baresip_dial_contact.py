@@ -16,7 +16,7 @@ def baresip_dial_contact(context: DSLContext) -> None:
         async def before(self: ContextData) -> None:
             self.mock_async_callable(target=self.bs, method="invoke").to_return_value(
                 "None"
-            ).for_call("dial_contact").and_assert_called_once()
+            ).for_call("dial_contact", deadline=None).and_assert_called_once()
 
         @context.example
         async def it_calls_invoke_with_dial_contact(self: ContextData) -> None:
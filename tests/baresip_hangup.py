@@ -16,8 +16,22 @@ def baresip_hangup(context: DSLContext) -> None:
         async def before(self: ContextData) -> None:
             self.mock_async_callable(target=self.bs, method="invoke").to_return_value(
                 "None"
-            ).for_call("hangup").and_assert_called_once()
+            ).for_call("hangup", deadline=None).and_assert_called_once()
 
         @context.example
         async def it_calls_invoke_with_hangup(self: ContextData) -> None:
             await self.bs.hangup()
+
+    @context.sub_context
+    def when_a_call_is_rejected(context: DSLContext) -> None:
+        @context.before
+        async def before(self: ContextData) -> None:
+            self.mock_async_callable(target=self.bs, method="invoke").to_return_value(
+                "None"
+            ).for_call(
+                "hangup abc123 486 Busy Here", deadline=None
+            ).and_assert_called_once()
+
+        @context.example
+        async def it_passes_the_call_id_code_and_reason(self: ContextData) -> None:
+            await self.bs.hangup("abc123", code=486, reason="Busy Here")
@@ -0,0 +1,94 @@
+import asyncio
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.baresip as bs
+import pybaresip.exceptions as pbs_ex
+import pybaresip.scheduler as sched
+
+
+class FakeInterface:
+    """
+    Stands in for the dbus_next proxy interface, answering after `delay` seconds.
+    """
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.calls: list[str] = []
+
+    async def call_invoke(self, action: str) -> str:
+        self.calls.append(action)
+        await asyncio.sleep(self.delay)
+        return "OK"
+
+
+@tdsl.context
+def baresip_invoke(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.bs = bs.PyBareSIP(timeouts={"uastat": 0.01})
+        self.interface = FakeInterface()
+        self.bs._interface = self.interface
+
+    @context.sub_context
+    def when_baresip_answers_in_time(context: DSLContext) -> None:
+        @context.example
+        async def it_returns_the_response(self: ContextData) -> None:
+            self.assertEqual("OK", await self.bs.invoke("uastat"))
+
+    @context.sub_context
+    def when_baresip_does_not_answer_in_time(context: DSLContext) -> None:
+        @context.before
+        async def before(self: ContextData) -> None:
+            self.interface.delay = 1.0
+
+        @context.example
+        async def it_raises_a_timeout_error(self: ContextData) -> None:
+            with self.assertRaises(pbs_ex.BaresipTimeoutError) as e:
+                await self.bs.invoke("uastat")
+            self.assertEqual("uastat", e.exception.action)
+
+        @context.example
+        async def it_masks_passwords_in_the_error(self: ContextData) -> None:
+            with self.assertRaises(pbs_ex.BaresipTimeoutError) as e:
+                await self.bs.invoke("uanew sip:a@x;auth_pass=s3cret", deadline=0.0)
+            self.assertNotIn("s3cret", str(e.exception))
+            self.assertNotIn("s3cret", e.exception.action)
+
+        @context.example
+        async def it_honours_an_earlier_deadline(self: ContextData) -> None:
+            with self.assertRaises(pbs_ex.BaresipTimeoutError):
+                await self.bs.invoke("about", deadline=bs.deadline_after(0.01))
+
+        @context.example
+        async def it_carries_the_deadline_through_helpers(
+            self: ContextData,
+        ) -> None:
+            with self.assertRaises(pbs_ex.BaresipTimeoutError):
+                await self.bs.loaded_modules(deadline=bs.deadline_after(0.01))
+            self.assertEqual(["modules"], self.interface.calls)
+
+    @context.sub_context
+    def when_the_deadline_has_already_passed(context: DSLContext) -> None:
+        @context.example
+        async def it_does_not_send_the_command(self: ContextData) -> None:
+            with self.assertRaises(pbs_ex.BaresipTimeoutError):
+                await self.bs.version(deadline=bs.deadline_after(-1))
+            self.assertEqual([], self.interface.calls)
+
+    @context.sub_context
+    def when_a_queued_command_times_out(context: DSLContext) -> None:
+        @context.example
+        async def it_gives_back_its_scheduler_slot(self: ContextData) -> None:
+            scheduler = sched.CommandScheduler(max_in_flight=1)
+            self.bs._scheduler = scheduler
+            self.interface.delay = 0.05
+            first = asyncio.ensure_future(self.bs.invoke("about"))
+            await asyncio.sleep(0)
+            with self.assertRaises(pbs_ex.BaresipTimeoutError):
+                await self.bs.invoke("uastat")
+            self.assertEqual("OK", await first)
+            stats = scheduler.stats()[sched.Priority.NORMAL]
+            self.assertEqual((0, 0), (stats.queued, stats.in_flight))
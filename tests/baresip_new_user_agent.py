@@ -17,7 +17,7 @@ def baresip_new_user_agent(context: DSLContext) -> None:
             @context.before
             async def before(self: ContextData) -> None:
                 self.mock_async_callable(target=self.bs, method="uanew").for_call(
-                    account="does not matter", flags=None
+                    account="does not matter", flags=None, deadline=None
                 ).to_return_value("").and_assert_called_once()
 
             @context.example
@@ -31,7 +31,7 @@ def baresip_new_user_agent(context: DSLContext) -> None:
             @context.before
             async def before(self: ContextData) -> None:
                 self.mock_async_callable(target=self.bs, method="uanew").for_call(
-                    account="does not matter", flags={"regint": "0"}
+                    account="does not matter", flags={"regint": "0"}, deadline=None
                 ).to_return_value("").and_assert_called_once()
 
             @context.example
@@ -45,6 +45,7 @@ def baresip_new_user_agent(context: DSLContext) -> None:
                 self.mock_async_callable(target=self.bs, method="uanew").for_call(
                     account="does not matter",
                     flags={"regint": "0", "auth_pass": "fred"},
+                    deadline=None,
                 ).to_return_value("").and_assert_called_once()
 
             @context.example
@@ -62,7 +63,9 @@ def baresip_new_user_agent(context: DSLContext) -> None:
             @context.before
             async def before(self: ContextData) -> None:
                 self.mock_async_callable(target=self.bs, method="uanew").for_call(
-                    account="does not matter", flags={"auth_pass": "hello"}
+                    account="does not matter",
+                    flags={"auth_pass": "hello"},
+                    deadline=None,
                 ).to_return_value("").and_assert_called_once()
 
             @context.example
@@ -19,7 +19,7 @@ def baresip_rmmod(context: DSLContext) -> None:
                 self.mock_async_callable(
                     target=self.bs, method="invoke"
                 ).to_return_value("None").for_call(
-                    "rmmod auconv"
+                    "rmmod auconv", deadline=None
                 ).and_assert_called_once()
 
             @context.example
@@ -33,7 +33,7 @@ def baresip_rmmod(context: DSLContext) -> None:
                 self.mock_async_callable(
                     target=self.bs, method="invoke"
                 ).to_return_value("None").for_call(
-                    "rmmod auconv"
+                    "rmmod auconv", deadline=None
                 ).and_assert_called_once()
 
             @context.example
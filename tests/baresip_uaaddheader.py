@@ -16,7 +16,9 @@ def baresip_uaaddheader(context: DSLContext) -> None:
         async def before(self: ContextData) -> None:
             self.mock_async_callable(target=self.bs, method="invoke").to_return_value(
                 "None"
-            ).for_call("uaaddheader akey=avalue").and_assert_called_once()
+            ).for_call(
+                "uaaddheader akey=avalue", deadline=None
+            ).and_assert_called_once()
 
         @context.example
         async def it_calls_invoke_with_uaaddheader(self: ContextData) -> None:
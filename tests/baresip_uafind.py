@@ -16,7 +16,9 @@ def baresip_uafind(context: DSLContext) -> None:
         async def before(self: ContextData) -> None:
             self.mock_async_callable(target=self.bs, method="invoke").to_return_value(
                 "None"
-            ).for_call("uafind sip:test@localhost:5060").and_assert_called_once()
+            ).for_call(
+                "uafind sip:test@localhost:5060", deadline=None
+            ).and_assert_called_once()
 
         @context.example
         async def it_calls_invoke_with_uafind(self: ContextData) -> None:
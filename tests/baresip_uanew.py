@@ -21,7 +21,7 @@ def baresip_uanew(context: DSLContext) -> None:
                 self.mock_async_callable(
                     target=self.bs, method="invoke"
                 ).to_return_value("None").for_call(
-                    "uanew sip:test@localhost"
+                    "uanew sip:test@localhost", deadline=None
                 ).and_assert_called_once()
                 self.mock_callable(target=bs.logger, method="warning").to_return_value(
                     None
@@ -38,7 +38,7 @@ def baresip_uanew(context: DSLContext) -> None:
                 self.mock_async_callable(
                     target=self.bs, method="invoke"
                 ).to_return_value("None").for_call(
-                    "uanew sip:test@localhost"
+                    "uanew sip:test@localhost", deadline=None
                 ).and_assert_called_once()
 
             @context.example
@@ -56,7 +56,7 @@ def baresip_uanew(context: DSLContext) -> None:
                     self.mock_async_callable(
                         target=self.bs, method="invoke"
                     ).to_return_value("None").for_call(
-                        "uanew sip:test@localhost;regint=0"
+                        "uanew sip:test@localhost;regint=0", deadline=None
                     ).and_assert_called_once()
 
                 @context.example
@@ -72,7 +72,8 @@ def baresip_uanew(context: DSLContext) -> None:
                     self.mock_async_callable(
                         target=self.bs, method="invoke"
                     ).to_return_value("None").for_call(
-                        "uanew sip:test@localhost;regint=0;auth_pass=fred"
+                        "uanew sip:test@localhost;regint=0;auth_pass=fred",
+                        deadline=None,
                     ).and_assert_called_once()
 
                 @context.example
@@ -32,7 +32,7 @@ def baresip_version(context: DSLContext) -> None:
         async def before(self: ContextData) -> None:
             self.mock_async_callable(target=self.bs, method="invoke").to_return_value(
                 BANNER
-            ).for_call("about").and_assert_called_once()
+            ).for_call("about", deadline=None).and_assert_called_once()
 
         @context.example
         async def it_returns_a_BaresipVersion_object(self: ContextData) -> None:
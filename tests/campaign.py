@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import tempfile
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.campaign as campaign
+
+from .baresip_invoke import FakeInterface
+from .pool import QuietClient, call_event
+
+
+class CalleeInterface(FakeInterface):
+    """
+    Answers calls to odd numbers for a moment and lets even numbers ring out.
+    Like baresip, it reports a bare number as a URI on its default domain.
+    """
+
+    def __init__(self, client: QuietClient) -> None:
+        super().__init__()
+        self.client = client
+        self.active = 0
+        self.most_active = 0
+
+    async def call_invoke(self, action: str) -> str:
+        self.calls.append(action)
+        uri = action.split(" ", 1)[1]
+        if "@" not in uri:
+            uri = f"sip:{uri}@gw.example.com"
+        call_id = str(len(self.calls))
+        self.active += 1
+        self.most_active = max(self.most_active, self.active)
+        call_event(self.client, "CALL_OUTGOING", call_id, peeruri=uri)
+        asyncio.get_running_loop().call_later(0.01, self.finish, uri, call_id)
+        return "OK"
+
+    def finish(self, uri: str, call_id: str) -> None:
+        if int(uri.split("@")[0][-1]) % 2:
+            call_event(self.client, "CALL_ESTABLISHED", call_id)
+            asyncio.get_running_loop().call_later(0.01, self.hangup, call_id)
+        else:
+            self.hangup(call_id)
+
+    def hangup(self, call_id: str) -> None:
+        self.active -= 1
+        call_event(self.client, "CALL_CLOSED", call_id)
+
+
+@tdsl.context
+def checkpoint(context: DSLContext) -> None:
+    @context.example
+    def it_advances_past_leads_that_finished_out_of_order(
+        self: ContextData,
+    ) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "checkpoint")
+            cp = campaign.Checkpoint(path, interval=0)
+            cp.finish(1)
+            self.assertEqual(0, cp.position)
+            cp.finish(0)
+            cp.finish(3)
+            with open(path) as f:
+                self.assertEqual({"position": 2, "done": [3]}, json.load(f))
+            self.assertTrue(campaign.Checkpoint(path).finished(3))
+
+
+@tdsl.context
+def predictive_campaign(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client = QuietClient()
+        self.interface = CalleeInterface(self.client)
+        self.client._interface = self.interface
+        self.leads = [f"sip:{n}@example.com" for n in range(20)]
+        self.results = []
+
+    @context.after
+    async def after(self: ContextData) -> None:
+        self.tmp.cleanup()
+
+    @context.example
+    async def it_dials_every_lead_and_records_the_outcome(
+        self: ContextData,
+    ) -> None:
+        run = campaign.Campaign(
+            self.client,
+            iter(self.leads),
+            capacity=3,
+            max_channels=4,
+            on_result=lambda lead, result: self.results.append(result),
+        )
+        stats = await asyncio.wait_for(run.run(), 5)
+        self.assertEqual(20, stats.dialed)
+        self.assertEqual(10, stats.answered)
+        self.assertEqual(10, stats.no_answer)
+        self.assertEqual(20, len(self.results))
+        self.assertLessEqual(self.interface.most_active, 4)
+        self.assertLess(stats.answer_rate, 0.5 + 0.1)
+
+    @context.example
+    async def it_matches_calls_to_bare_numbers(self: ContextData) -> None:
+        leads = ["+4420794600", "+4420794601", "+4420794602"]
+        stats = await asyncio.wait_for(
+            campaign.Campaign(self.client, iter(leads), capacity=2).run(), 5
+        )
+        self.assertEqual([f"dial {lead}" for lead in leads], self.interface.calls)
+        self.assertEqual(1, stats.answered)
+        self.assertEqual(2, stats.no_answer)
+        self.assertEqual(0, stats.failed)
+
+    @context.example
+    async def it_resumes_from_a_checkpoint(self: ContextData) -> None:
+        path = os.path.join(self.tmp.name, "checkpoint")
+        with open(path, "w") as f:
+            json.dump({"position": 18, "done": [19]}, f)
+        run = campaign.Campaign(
+            self.client, iter(self.leads), capacity=3, checkpoint=path
+        )
+        stats = await asyncio.wait_for(run.run(), 5)
+        self.assertEqual(["dial sip:18@example.com"], self.interface.calls)
+        self.assertEqual(19, stats.skipped)
+        self.assertEqual(20, campaign.Checkpoint(path).position)
+
+    @context.example
+    async def it_reads_leads_from_a_file(self: ContextData) -> None:
+        path = os.path.join(self.tmp.name, "leads")
+        with open(path, "w") as f:
+            f.write("# numbers\n\nsip:1@example.com\n")
+        stats = await asyncio.wait_for(
+            campaign.Campaign(self.client, path, capacity=1).run(), 5
+        )
+        self.assertEqual(1, stats.answered)
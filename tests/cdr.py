@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import tempfile
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.calls as calls
+import pybaresip.cdr as cdr
+
+from .pool import QuietClient, call_event
+
+
+@tdsl.context
+def cdr_recorder(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cdr.db")
+        self.client = QuietClient()
+        self.tracker = calls.CallTracker()
+        self.client.add_event_listener(self.tracker)
+        self.writer = cdr.CdrWriter(self.path)
+        self.recorder = cdr.CdrRecorder(self.tracker, self.writer)
+
+    @context.after
+    async def after(self: ContextData) -> None:
+        self.recorder.close()
+        self.writer.close()
+        self.tmp.cleanup()
+
+    @context.example
+    async def it_writes_a_record_per_closed_call(self: ContextData) -> None:
+        call_event(
+            self.client,
+            "CALL_OUTGOING",
+            "1",
+            accountaor="sip:a@x",
+            peeruri="sip:100@gw",
+        )
+        call_event(self.client, "CALL_ESTABLISHED", "1")
+        call_event(self.client, "CALL_CLOSED", "1", param="Connection reset by user")
+        call_event(
+            self.client,
+            "CALL_INCOMING",
+            "2",
+            accountaor="sip:b@x",
+            direction="incoming",
+        )
+        call_event(self.client, "CALL_CLOSED", "2", param="486 Busy Here")
+        call_event(self.client, "CALL_OUTGOING", "3", accountaor="sip:a@x")
+        call_event(self.client, "CALL_CLOSED", "3", param="503 Service Unavailable")
+        self.writer.flush()
+
+        records = cdr.query(self.path)
+        self.assertEqual(["1", "2", "3"], [r.call_id for r in records])
+        self.assertEqual(
+            [cdr.Disposition.ANSWERED, cdr.Disposition.BUSY, cdr.Disposition.FAILED],
+            [r.disposition for r in records],
+        )
+        first = records[0]
+        self.assertEqual("sip:100@gw", first.peer)
+        self.assertEqual("outgoing", first.direction)
+        self.assertIsNotNone(first.answered)
+        self.assertLessEqual(first.setup, first.ended)
+        self.assertEqual("incoming", records[1].direction)
+        self.assertIsNone(records[1].answered)
+        self.assertEqual(0.0, records[1].duration)
+        self.assertEqual(3, self.writer.stats.written)
+
+    @context.example
+    async def it_queries_by_account_and_time(self: ContextData) -> None:
+        for i in range(1000):
+            self.writer.write(
+                cdr.Cdr(
+                    call_id=str(i),
+                    aor=f"sip:{i % 4}@x",
+                    peer="sip:100@gw",
+                    direction="outgoing",
+                    setup=float(i),
+                    answered=None,
+                    ended=float(i) + 1,
+                    duration=0.0,
+                    disposition=cdr.Disposition.NO_ANSWER,
+                    reason="",
+                )
+            )
+        self.writer.flush()
+        self.assertEqual(1000, self.writer.stats.written)
+        self.assertLess(self.writer.stats.batches, 1000)
+
+        records = cdr.query(self.path, aor="sip:1@x", start=100, end=200)
+        self.assertEqual(
+            [str(i) for i in range(101, 200, 4)], [r.call_id for r in records]
+        )
+        self.assertEqual(2, len(cdr.query(self.path, start=998)))
+        self.assertEqual(5, len(cdr.query(self.path, peer="sip:100@gw", limit=5)))
+
+    @context.example
+    async def it_drops_records_when_the_queue_is_full(self: ContextData) -> None:
+        writer = cdr.CdrWriter(self.path, max_queued=1)
+        # Lock the database, so the writer thread holds up on its first batch.
+        lock = sqlite3.connect(self.path)
+        lock.execute("BEGIN EXCLUSIVE")
+        try:
+            record = cdr.Cdr(
+                "1", "a", "b", "outgoing", 0, None, 1, 0, cdr.Disposition.FAILED, ""
+            )
+            results = [writer.write(record) for _ in range(3)]
+        finally:
+            lock.rollback()
+            lock.close()
+        writer.close()
+        self.assertIn(False, results)
+        self.assertEqual(results.count(False), writer.stats.dropped)
+        self.assertEqual(results.count(True), writer.stats.written)
+
+
+@tdsl.context
+def cdr_disposition(context: DSLContext) -> None:
+    @context.example
+    def it_classifies_calls(self: ContextData) -> None:
+        self.assertEqual(cdr.Disposition.ANSWERED, cdr.disposition(True, "486 Busy"))
+        self.assertEqual(cdr.Disposition.BUSY, cdr.disposition(False, "600 Busy"))
+        self.assertEqual(
+            cdr.Disposition.NO_ANSWER, cdr.disposition(False, "487 Request Terminated")
+        )
+        self.assertEqual(cdr.Disposition.NO_ANSWER, cdr.disposition(False, ""))
+        self.assertEqual(
+            cdr.Disposition.FAILED, cdr.disposition(False, "404 Not Found")
+        )
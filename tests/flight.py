@@ -0,0 +1,70 @@
+import io
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.baresip as bs
+import pybaresip.flight as flight
+
+from .pool import FailingInterface, QuietClient, call_event
+
+
+@tdsl.context
+def flight_recorder(context: DSLContext) -> None:
+    @context.example
+    def it_keeps_the_newest_entries(self: ContextData) -> None:
+        recorder = flight.FlightRecorder(size=3)
+        for i in range(5):
+            recorder.record("invoke", f"uastat {i}")
+        self.assertEqual(3, len(recorder))
+        self.assertEqual(
+            [("uastat 2",), ("uastat 3",), ("uastat 4",)],
+            [fields for _, _, fields in recorder.entries()],
+        )
+        out = io.StringIO()
+        recorder.dump("asked", out)
+        self.assertIn("asked (3 entries, 2 older lost)", out.getvalue())
+        self.assertIn("invoke   uastat 4", out.getvalue())
+
+    @context.example
+    def it_dumps_at_most_once_per_interval(self: ContextData) -> None:
+        recorder = flight.FlightRecorder(min_interval=60.0)
+        self.assertTrue(recorder.trigger("first"))
+        self.assertFalse(recorder.trigger("second"))
+        self.assertEqual(1, recorder.dumps)
+
+
+@tdsl.context
+def client_flight_recorder(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.client = QuietClient(flight=flight.FlightRecorder(size=16))
+        self.client._interface = FailingInterface()
+
+    @context.example
+    async def it_records_commands_and_events(self: ContextData) -> None:
+        call_event(self.client, "CALL_INCOMING", "1")
+        with self.assertRaises(ConnectionError):
+            await self.client.invoke("accept 1")
+        kinds = [kind for _, kind, _ in self.client.flight.entries()]
+        self.assertEqual(["event", "invoke", "error"], kinds)
+        self.assertEqual(1, self.client.flight.dumps)
+
+    @context.example
+    async def it_masks_passwords_in_dumps(self: ContextData) -> None:
+        with self.assertRaises(ConnectionError):
+            await self.client.uanew("sip:a@x;auth_pass=secret;regint=0")
+        out = io.StringIO()
+        self.client.flight.dump("asked", out)
+        self.assertNotIn("secret", out.getvalue())
+        self.assertIn("auth_pass=***", out.getvalue())
+
+    @context.example
+    async def it_dumps_when_a_listener_fails(self: ContextData) -> None:
+        def broken(client: bs.PyBareSIP, event: bs.EventParams) -> None:
+            raise RuntimeError("oops")
+
+        self.client.add_event_listener(broken)
+        call_event(self.client, "CALL_INCOMING", "1")
+        self.assertEqual(1, self.client.flight.dumps)
@@ -55,3 +55,63 @@ def identity_class(context: DSLContext) -> None:
                 self.assertEqual(
                     x.sip, "sip:test@example.com:5060;regint=0;auth_pass=test"
                 )
+
+    @context.sub_context
+    def the_aor_property(context: DSLContext) -> None:
+        @context.example
+        def it_leaves_out_the_flags(self: ContextData) -> None:
+            x = identity.Identity(
+                user="test",
+                password="test",
+                gateway="example.com",
+                flags=[{"regint": "0"}],
+            )
+            self.assertEqual(x.aor, "sip:test@example.com:5060")
+
+
+@tdsl.context
+def compact_identity(context: DSLContext) -> None:
+    @context.example
+    def it_builds_the_same_sip_string_as_identity(self: ContextData) -> None:
+        x = identity.CompactIdentity(
+            user="test", password="test", gateway="example.com", flags={"regint": "0"}
+        )
+        self.assertEqual(x.sip, "sip:test@example.com:5060;regint=0;auth_pass=test")
+        self.assertEqual(x.aor, "sip:test@example.com:5060")
+
+    @context.example
+    def it_converts_an_identity(self: ContextData) -> None:
+        x = identity.Identity(
+            user="test", password="test", gateway="example.com", flags=[{"a": "1"}]
+        )
+        self.assertEqual(x.sip, identity.CompactIdentity.from_identity(x).sip)
+
+    @context.example
+    def it_is_immutable(self: ContextData) -> None:
+        x = identity.CompactIdentity(user="test", password="t", gateway="example.com")
+        with self.assertRaises(AttributeError):
+            x.user = "other"
+
+    @context.example
+    def it_rejects_auth_pass_as_a_flag(self: ContextData) -> None:
+        with self.assertRaises(identity.IdentityFlagError):
+            identity.CompactIdentity(
+                user="test", password="t", gateway="x.com", flags={"auth_pass": "p"}
+            )
+
+    @context.example
+    def it_rejects_values_that_would_break_the_account_line(
+        self: ContextData,
+    ) -> None:
+        for kwargs in (
+            {"user": "te;st"},
+            {"gateway": "exa mple.com"},
+            {"port": 70000},
+            {"flags": {"regint": "0;x=1"}},
+            {"flags": {"regint": 0}},
+            {"password": None},
+        ):
+            fields = dict(user="test", password="t", gateway="example.com")
+            fields.update(kwargs)
+            with self.assertRaises(identity.IdentityValidationError):
+                identity.CompactIdentity(**fields)
@@ -0,0 +1,131 @@
+import asyncio
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.ivr as ivr
+import pybaresip.timers as timers
+
+from .baresip_invoke import FakeInterface
+from .pool import QuietClient, call_event
+
+
+def dtmf(client: QuietClient, call_id: str, digits: str) -> None:
+    for key in digits:
+        call_event(client, "CALL_DTMF_START", call_id, param=key)
+
+
+@tdsl.context
+def ivr_engine(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.client = QuietClient()
+        self.client._interface = FakeInterface()
+        self.handled: list[str] = []
+
+        async def agent(session: ivr.Session) -> str | None:
+            self.handled.append(session.call_id)
+            return None
+
+        async def lost(session: ivr.Session) -> str:
+            return "nowhere"
+
+        self.engine = ivr.IvrEngine(
+            [
+                ivr.Menu(
+                    "main",
+                    {"1": "sales", "2": agent, "4": lost},
+                    prompt="welcome.wav",
+                    timeout=0.02,
+                    retries=1,
+                    invalid_prompt="invalid.wav",
+                ),
+                ivr.Menu(
+                    "sales",
+                    {"12": "main", "3": ivr.HANGUP},
+                    prompt="sales.wav",
+                    max_digits=2,
+                    digit_timeout=0.02,
+                ),
+            ],
+            root="main",
+            timers=timers.TimerWheel(resolution=0.005),
+        )
+        self.client.add_event_listener(self.engine)
+
+    @context.example
+    async def it_plays_the_root_prompt_when_answered(self: ContextData) -> None:
+        call_event(self.client, "CALL_ESTABLISHED", "c1")
+        await self.engine.close()
+        self.assertEqual(["play welcome.wav"], self.client._interface.calls)
+
+    @context.example
+    async def it_follows_options_to_other_menus(self: ContextData) -> None:
+        call_event(self.client, "CALL_ESTABLISHED", "c1")
+        dtmf(self.client, "c1", "1")
+        self.assertEqual("sales", self.engine.sessions["c1"].menu.name)
+        dtmf(self.client, "c1", "12")
+        self.assertEqual("main", self.engine.sessions["c1"].menu.name)
+        await self.engine.close()
+
+    @context.example
+    async def it_ends_short_options_with_the_terminator(self: ContextData) -> None:
+        call_event(self.client, "CALL_ESTABLISHED", "c1")
+        dtmf(self.client, "c1", "13#")
+        await self.engine.close()
+        self.assertNotIn("c1", self.engine.sessions)
+        self.assertEqual("hangup c1", self.client._interface.calls[-1])
+
+    @context.example
+    async def it_ends_short_options_after_the_digit_timeout(
+        self: ContextData,
+    ) -> None:
+        call_event(self.client, "CALL_ESTABLISHED", "c1")
+        dtmf(self.client, "c1", "13")
+        await asyncio.sleep(0.06)
+        await self.engine.close()
+        self.assertEqual("hangup c1", self.client._interface.calls[-1])
+
+    @context.example
+    async def it_runs_handlers(self: ContextData) -> None:
+        call_event(self.client, "CALL_ESTABLISHED", "c1")
+        dtmf(self.client, "c1", "2")
+        await self.engine.close()
+        self.assertEqual(["c1"], self.handled)
+        self.assertNotIn("c1", self.engine.sessions)
+
+    @context.example
+    async def it_hangs_up_when_a_handler_returns_an_unknown_menu(
+        self: ContextData,
+    ) -> None:
+        call_event(self.client, "CALL_ESTABLISHED", "c1")
+        dtmf(self.client, "c1", "4")
+        await asyncio.sleep(0.01)
+        await self.engine.close()
+        self.assertEqual("hangup c1", self.client._interface.calls[-1])
+        self.assertNotIn("c1", self.engine.sessions)
+
+    @context.example
+    async def it_rejects_an_unknown_failure_menu(self: ContextData) -> None:
+        with self.assertRaises(ValueError):
+            ivr.IvrEngine([ivr.Menu("main", {}, on_failure="nowhere")], root="main")
+
+    @context.example
+    async def it_hangs_up_after_too_many_failures(self: ContextData) -> None:
+        call_event(self.client, "CALL_ESTABLISHED", "c1")
+        dtmf(self.client, "c1", "9")
+        await asyncio.sleep(0.06)
+        await self.engine.close()
+        self.assertEqual(
+            ["play welcome.wav", "play invalid.wav", "hangup c1"],
+            self.client._interface.calls,
+        )
+
+    @context.example
+    async def it_forgets_calls_that_close(self: ContextData) -> None:
+        call_event(self.client, "CALL_ESTABLISHED", "c1")
+        call_event(self.client, "CALL_CLOSED", "c1")
+        self.assertEqual({}, self.engine.sessions)
+        self.assertEqual(0, len(self.engine._timers))
+        await self.engine.close()
@@ -0,0 +1,125 @@
+import asyncio
+import errno
+import os
+import tempfile
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.calls as calls
+import pybaresip.journal as journal
+
+from .pool import QuietClient, call_event
+
+
+class FullJournal(journal.EventJournal):
+    def event(self, klass: str, evtype: str, param: str) -> None:
+        raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+    def message(self, ua: str, peer: str, ctype: str, body: str) -> None:
+        raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+
+@tdsl.context
+def event_journal(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tmp.name, "journal")
+
+    @context.after
+    async def after(self: ContextData) -> None:
+        self.tmp.cleanup()
+
+    @context.example
+    async def it_records_signals_as_they_arrive(self: ContextData) -> None:
+        log = journal.EventJournal(self.dir)
+        client = QuietClient(journal=log)
+        call_event(client, "CALL_OUTGOING", "1", accountaor="sip:a@x")
+        client._changed_message("sip:a@x", "sip:b@x", "text/plain", "hi\nthere")
+        log.close()
+
+        records = list(journal.read(self.dir))
+        self.assertEqual(
+            [journal.RecordKind.EVENT, journal.RecordKind.MESSAGE],
+            [r.kind for r in records],
+        )
+        self.assertEqual(("call", "CALL_OUTGOING"), records[0].fields[:2])
+        self.assertIn('"accountaor": "sip:a@x"', records[0].fields[2])
+        self.assertEqual(
+            ("sip:a@x", "sip:b@x", "text/plain", "hi\nthere"), records[1].fields
+        )
+        self.assertLessEqual(records[0].time, records[1].time)
+
+    @context.example
+    async def it_still_delivers_when_writing_fails(self: ContextData) -> None:
+        log = FullJournal(self.dir)
+        client = QuietClient(journal=log)
+        tracker = calls.CallTracker()
+        client.add_event_listener(tracker)
+        with self.assertLogs("pybaresip", "ERROR"):
+            call_event(client, "CALL_OUTGOING", "1", accountaor="sip:a@x")
+            client._changed_message("sip:a@x", "sip:b@x", "text/plain", "hi")
+        log.close()
+        self.assertEqual(1, tracker.active_for("sip:a@x"))
+
+    @context.example
+    async def it_rotates_and_compresses_segments(self: ContextData) -> None:
+        log = journal.EventJournal(self.dir, max_bytes=1000, max_segments=3)
+        for i in range(100):
+            log.event("call", "CALL_RINGING", f'{{"id": "{i}"}}')
+        log.close()
+
+        paths = journal.segments(self.dir)
+        self.assertEqual(3, len(paths))
+        self.assertTrue(all(p.endswith(".log.gz") for p in paths[:-1]))
+        ids = [r.fields[2] for r in journal.read(self.dir)]
+        # The oldest segments were pruned; what is left is the end, in order.
+        self.assertEqual('{"id": "99"}', ids[-1])
+        self.assertEqual([f'{{"id": "{i}"}}' for i in range(100 - len(ids), 100)], ids)
+
+        log = journal.EventJournal(self.dir)
+        log.event("call", "CALL_CLOSED", "{}")
+        log.close()
+        self.assertEqual(4, len(journal.segments(self.dir)))
+
+    @context.example
+    async def it_stops_at_a_partial_record(self: ContextData) -> None:
+        log = journal.EventJournal(self.dir, compress=False)
+        log.event("call", "CALL_RINGING", "{}")
+        log.event("call", "CALL_CLOSED", "{}")
+        log.close()
+        (path,) = journal.segments(self.dir)
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 1)
+        self.assertEqual(1, len(list(journal.read(self.dir))))
+
+    @context.example
+    async def it_replays_through_the_dispatch_path(self: ContextData) -> None:
+        log = journal.EventJournal(self.dir)
+        recorded = QuietClient(journal=log)
+        for i in range(50):
+            call_event(recorded, "CALL_OUTGOING", str(i), accountaor="sip:a@x")
+        for i in range(0, 50, 2):
+            call_event(recorded, "CALL_CLOSED", str(i))
+        log.close()
+
+        client = QuietClient()
+        tracker = calls.CallTracker()
+        client.add_event_listener(tracker)
+        self.assertEqual(75, await journal.replay(client, self.dir, batch=10))
+        self.assertEqual(25, tracker.active_for("sip:a@x"))
+
+    @context.example
+    async def it_replays_at_the_original_pace(self: ContextData) -> None:
+        log = journal.EventJournal(self.dir)
+        log.event("call", "CALL_RINGING", '{"class": "call"}')
+        await asyncio.sleep(0.1)
+        log.event("call", "CALL_CLOSED", '{"class": "call"}')
+        log.close()
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await journal.replay(QuietClient(), self.dir, speed=2.0)
+        self.assertGreaterEqual(loop.time() - start, 0.045)
@@ -0,0 +1,72 @@
+import io
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.identity as identity
+import pybaresip.loaders as loaders
+
+CSV = """user,password,gateway,port,regint
+alice,pw,example.com,,0
+bob,pw,example.com,5061,
+"""
+
+JSONL = """{"user": "alice", "password": "pw", "gateway": "example.com"}
+
+{"user": "bob", "password": "pw", "gateway": "example.com", "flags": {"regint": 0}}
+"""
+
+YAML = """user: alice
+password: pw
+gateway: example.com
+---
+- user: bob
+  password: pw
+  gateway: example.com
+  port: 5061
+"""
+
+
+@tdsl.context
+def identity_loaders(context: DSLContext) -> None:
+    @context.example
+    def it_loads_csv_with_extra_columns_as_flags(self: ContextData) -> None:
+        alice, bob = loaders.load_csv(io.StringIO(CSV))
+        self.assertEqual("sip:alice@example.com:5060;regint=0;auth_pass=pw", alice.sip)
+        self.assertEqual("sip:bob@example.com:5061;auth_pass=pw", bob.sip)
+
+    @context.example
+    def it_loads_jsonl(self: ContextData) -> None:
+        alice, bob = loaders.load_jsonl(io.StringIO(JSONL))
+        self.assertEqual("sip:alice@example.com:5060", alice.aor)
+        self.assertEqual({"regint": "0", "auth_pass": "pw"}, dict(bob.flags))
+
+    @context.example
+    def it_loads_yaml_documents(self: ContextData) -> None:
+        alice, bob = loaders.load_yaml(io.StringIO(YAML))
+        self.assertEqual("sip:alice@example.com:5060", alice.aor)
+        self.assertEqual(5061, bob.port)
+
+    @context.example
+    def it_rejects_a_null_password(self: ContextData) -> None:
+        source = io.StringIO('{"user": "a", "password": null, "gateway": "x.com"}')
+        with self.assertRaises(identity.IdentityValidationError):
+            list(loaders.load_jsonl(source))
+
+    @context.example
+    def it_reads_lazily(self: ContextData) -> None:
+        source = io.StringIO(JSONL + "not json\n")
+        first = next(loaders.load_jsonl(source))
+        self.assertEqual("alice", first.user)
+
+    @context.example
+    def it_names_the_line_of_an_invalid_record(self: ContextData) -> None:
+        source = io.StringIO(JSONL + '{"user": "carol", "gateway": "example.com"}\n')
+        with self.assertRaisesRegex(identity.IdentityValidationError, "line 4"):
+            list(loaders.load_jsonl(source))
+
+    @context.example
+    def it_skips_invalid_records_unless_strict(self: ContextData) -> None:
+        source = io.StringIO(CSV + "carol,pw,example.com,notaport,\n")
+        self.assertEqual(2, len(list(loaders.load_csv(source, strict=False))))
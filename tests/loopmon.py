@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.baresip as bs
+import pybaresip.loopmon as loopmon
+
+from .baresip_invoke import FakeInterface
+from .pool import QuietClient, call_event
+
+
+def blocking_listener(client: bs.PyBareSIP, event: bs.EventParams) -> None:
+    time.sleep(0.15)
+
+
+@tdsl.context
+def loop_monitor(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.stalled: list[loopmon.Stall] = []
+        self.monitor = loopmon.LoopMonitor(
+            threshold=0.05, interval=0.01, on_stall=self.stalled.append
+        )
+        self.monitor.start()
+
+    @context.after
+    async def after(self: ContextData) -> None:
+        self.monitor.close()
+        self.assertEqual(0, loopmon.marker.active)
+
+    @context.example
+    async def it_attributes_a_stall_to_the_listener(self: ContextData) -> None:
+        client = QuietClient()
+        client.add_event_listener(blocking_listener)
+        call_event(client, "CALL_INCOMING", "1")
+        await asyncio.sleep(0.03)
+
+        self.assertEqual(1, len(self.stalled))
+        stall = self.stalled[0]
+        self.assertEqual(f"{__name__}.blocking_listener", stall.handler)
+        self.assertGreaterEqual(stall.duration, 0.1)
+        self.assertTrue(stall.stacks)
+        self.assertIn("time.sleep(0.15)", "".join(stall.stacks[0]))
+        self.assertEqual({stall.handler: 1}, self.monitor.counts)
+        self.assertIsNone(loopmon.marker.current)
+
+    @context.example
+    async def it_attributes_a_stall_after_an_invoke(self: ContextData) -> None:
+        client = bs.PyBareSIP()
+        client._interface = FakeInterface()
+        await client.invoke("uastat")
+        time.sleep(0.1)
+        await asyncio.sleep(0.03)
+
+        self.assertEqual(["after invoke uastat"], [s.handler for s in self.stalled])
+
+    @context.example
+    async def it_measures_lag_without_stalls(self: ContextData) -> None:
+        await asyncio.sleep(0.1)
+        self.assertGreater(self.monitor.stats.beats, 3)
+        self.assertEqual(0, self.monitor.stats.stalls)
+        self.assertEqual([], list(self.monitor.stalls))
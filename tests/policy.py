@@ -0,0 +1,110 @@
+import asyncio
+import datetime
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.calls as calls
+import pybaresip.policy as policy
+
+from .baresip_invoke import FakeInterface
+from .pool import QuietClient, call_event
+
+ME = "sip:me@example.com"
+
+
+def at(hour: int, minute: int = 0) -> datetime.datetime:
+    # 2024-01-01 was a Monday
+    return datetime.datetime(2024, 1, 1, hour, minute)
+
+
+@tdsl.context
+def policy_rules(context: DSLContext) -> None:
+    @context.example
+    def it_uses_the_first_matching_rule(self: ContextData) -> None:
+        engine = policy.PolicyEngine(
+            [
+                policy.Rule(policy.Action.REJECT, caller=r"^sip:spam@"),
+                policy.Rule(policy.Action.ACCEPT, aor=ME),
+            ]
+        )
+        self.assertEqual(policy.Action.REJECT, engine.decide(ME, "sip:spam@x").action)
+        self.assertEqual(policy.Action.ACCEPT, engine.decide(ME, "sip:bob@x").action)
+        self.assertIsNone(engine.decide("sip:other@example.com", "sip:bob@x"))
+
+    @context.example
+    def it_handles_time_windows_across_midnight(self: ContextData) -> None:
+        now = at(23, 30)
+        engine = policy.PolicyEngine(
+            [
+                policy.Rule(
+                    policy.Action.REJECT,
+                    start=datetime.time(22),
+                    end=datetime.time(6),
+                    days=frozenset({0}),
+                )
+            ],
+            now=lambda: now,
+        )
+        self.assertIsNotNone(engine.decide(ME, "sip:bob@x"))
+        now = at(12)
+        self.assertIsNone(engine.decide(ME, "sip:bob@x"))
+
+    @context.example
+    def it_only_matches_load_rules_below_the_limit(self: ContextData) -> None:
+        client = QuietClient()
+        tracker = calls.CallTracker()
+        client.add_event_listener(tracker)
+        engine = policy.PolicyEngine(
+            [policy.Rule(policy.Action.ACCEPT, max_active=0)], tracker=tracker
+        )
+        call_event(client, "CALL_INCOMING", "1")
+        self.assertIsNotNone(engine.decide(ME, "sip:bob@x", "1"))
+        call_event(client, "CALL_INCOMING", "2")
+        self.assertIsNone(engine.decide(ME, "sip:bob@x", "2"))
+
+    @context.example
+    def it_never_matches_load_rules_without_a_tracker(self: ContextData) -> None:
+        engine = policy.PolicyEngine(
+            [
+                policy.Rule(policy.Action.ACCEPT, max_active=10),
+                policy.Rule(policy.Action.REJECT),
+            ]
+        )
+        self.assertEqual(policy.Action.REJECT, engine.decide(ME, "sip:bob@x").action)
+
+
+@tdsl.context
+def policy_engine(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.client = QuietClient()
+        self.client._interface = FakeInterface()
+        self.engine = policy.PolicyEngine(
+            [
+                policy.Rule(policy.Action.REJECT, caller="spam", code=603, reason="No"),
+                policy.Rule(policy.Action.ACCEPT, aor=ME),
+            ]
+        )
+        self.client.add_event_listener(self.engine)
+
+    @context.example
+    async def it_accepts_the_call_that_arrived(self: ContextData) -> None:
+        call_event(self.client, "CALL_INCOMING", "c1", accountaor=ME)
+        await self.engine.close()
+        self.assertEqual(["callfind c1", "accept"], self.client._interface.calls)
+        self.assertEqual(1, self.engine.stats.respond[policy.Action.ACCEPT].count)
+
+    @context.example
+    async def it_rejects_with_the_rule_response(self: ContextData) -> None:
+        call_event(self.client, "CALL_INCOMING", "c1", peeruri="sip:spam@x")
+        await self.engine.close()
+        self.assertEqual(["hangup c1 603 No"], self.client._interface.calls)
+
+    @context.example
+    async def it_leaves_unmatched_calls_ringing(self: ContextData) -> None:
+        call_event(self.client, "CALL_INCOMING", "c1", accountaor="sip:x@y")
+        await asyncio.sleep(0)
+        self.assertEqual([], self.client._interface.calls)
+        self.assertEqual(1, self.engine.stats.actions[policy.Action.RING])
@@ -0,0 +1,237 @@
+import asyncio
+import json
+from typing import List
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.baresip as bs
+import pybaresip.calls as calls
+import pybaresip.pool as pool
+import pybaresip.timers as timers
+
+from .baresip_invoke import FakeInterface
+
+
+class FailingInterface(FakeInterface):
+    async def call_invoke(self, action: str) -> str:
+        self.calls.append(action)
+        raise ConnectionError("gone")
+
+
+def call_event(client: bs.PyBareSIP, evtype: str, call_id: str, **extra) -> None:
+    event = {"class": "call", "type": evtype, "id": call_id, **extra}
+    client._changed_event("call", evtype, json.dumps(event))
+
+
+class QuietClient(bs.PyBareSIP):
+    def handle_event(self, klass: str, event_type: str, event: bs.EventParams) -> None:
+        pass
+
+
+@tdsl.context
+def call_tracker(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.client = QuietClient()
+        self.tracker = calls.CallTracker()
+        self.client.add_event_listener(self.tracker)
+
+    @context.example
+    async def it_counts_calls_until_they_close(self: ContextData) -> None:
+        call_event(self.client, "CALL_OUTGOING", "1", accountaor="sip:a@x")
+        call_event(self.client, "CALL_INCOMING", "2", accountaor="sip:a@x")
+        self.assertEqual(2, self.tracker.active)
+        self.assertEqual(2, self.tracker.active_for("sip:a@x"))
+        call_event(self.client, "CALL_CLOSED", "1")
+        self.assertEqual(1, self.tracker.active)
+        self.assertEqual(1, self.tracker.active_for("sip:a@x"))
+
+    @context.example
+    async def it_records_when_a_call_was_answered(self: ContextData) -> None:
+        call_event(self.client, "CALL_INCOMING", "1", direction="incoming")
+        call_event(self.client, "CALL_ESTABLISHED", "1")
+        call = self.tracker.calls["1"]
+        self.assertTrue(call.incoming)
+        self.assertEqual(calls.CallState.ESTABLISHED, call.state)
+        self.assertIsNotNone(call.answered)
+
+
+@tdsl.context
+def call_tracker_timeouts(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.client = QuietClient()
+        self.client._interface = FakeInterface()
+        self.tracker = calls.CallTracker(
+            ring_timeout=0.02,
+            max_duration=0.04,
+            timers=timers.TimerWheel(resolution=0.005),
+        )
+        self.client.add_event_listener(self.tracker)
+
+    @context.example
+    async def it_hangs_up_calls_that_ring_too_long(self: ContextData) -> None:
+        call_event(self.client, "CALL_OUTGOING", "1")
+        call_event(self.client, "CALL_OUTGOING", "2")
+        call_event(self.client, "CALL_CLOSED", "2")
+        await asyncio.sleep(0.05)
+        await self.tracker.close()
+        self.assertEqual(["hangup 1"], self.client._interface.calls)
+        self.assertEqual(1, self.tracker.timed_out)
+
+    @context.example
+    async def it_hangs_up_calls_that_last_too_long(self: ContextData) -> None:
+        call_event(self.client, "CALL_OUTGOING", "1")
+        await asyncio.sleep(0.01)
+        call_event(self.client, "CALL_ESTABLISHED", "1")
+        await asyncio.sleep(0.02)
+        self.assertEqual([], self.client._interface.calls)
+        await asyncio.sleep(0.04)
+        await self.tracker.close()
+        self.assertEqual(["hangup 1"], self.client._interface.calls)
+
+
+class FakeBus:
+    """
+    Stands in for dbus_next's MessageBus, with nothing on it.
+    """
+
+    buses: List["FakeBus"] = []
+
+    def __init__(self) -> None:
+        self.connected = False
+        FakeBus.buses.append(self)
+
+    async def connect(self) -> "FakeBus":
+        self.connected = True
+        return self
+
+    async def introspect(self, name: str, path: str) -> None:
+        raise Exception(f"{name} was not provided")
+
+    def disconnect(self) -> None:
+        self.connected = False
+
+
+@tdsl.context
+def client_connect(context: DSLContext) -> None:
+    @context.example
+    async def it_disconnects_the_bus_when_baresip_is_missing(
+        self: ContextData,
+    ) -> None:
+        self.mock_constructor(bs.aio_dn, "MessageBus").with_implementation(
+            lambda: FakeBus()
+        )
+        FakeBus.buses.clear()
+        client = bs.PyBareSIP()
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                await client.connect()
+        self.assertEqual(2, len(FakeBus.buses))
+        self.assertFalse(any(bus.connected for bus in FakeBus.buses))
+
+
+@tdsl.context
+def baresip_pool(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.clients = [QuietClient(bus_name=f"test.Baresip{i}") for i in range(3)]
+        for client in self.clients:
+            client._interface = FakeInterface()
+        self.pool = pool.BaresipPool(
+            self.clients, failure_threshold=2, probe_interval=0.01
+        )
+
+    @context.after
+    async def after(self: ContextData) -> None:
+        await self.pool.close()
+
+    @context.sub_context
+    def when_dialing(context: DSLContext) -> None:
+        @context.example
+        async def it_uses_the_instance_with_the_fewest_calls(
+            self: ContextData,
+        ) -> None:
+            call_event(self.clients[0], "CALL_INCOMING", "a")
+            call_event(self.clients[1], "CALL_INCOMING", "b")
+            client, response = await self.pool.dial("sip:x@y")
+            self.assertIs(self.clients[2], client)
+            self.assertEqual(["dial sip:x@y"], self.clients[2]._interface.calls)
+
+    @context.sub_context
+    def when_broadcasting(context: DSLContext) -> None:
+        @context.example
+        async def it_sends_the_command_to_every_instance(self: ContextData) -> None:
+            results = await self.pool.insmod("g722")
+            self.assertEqual(set(self.clients), set(results))
+            for client in self.clients:
+                self.assertEqual(["insmod g722"], client._interface.calls)
+
+    @context.sub_context
+    def when_an_instance_keeps_failing(context: DSLContext) -> None:
+        @context.before
+        async def before(self: ContextData) -> None:
+            self.clients[0]._interface = FailingInterface()
+            for _ in range(2):
+                await self.pool.conf_reload()
+
+        @context.example
+        async def it_is_ejected(self: ContextData) -> None:
+            self.assertEqual(self.clients[1:], self.pool.healthy)
+
+        @context.example
+        async def it_is_readmitted_once_it_answers_again(self: ContextData) -> None:
+            self.clients[0]._interface = FakeInterface()
+            for _ in range(100):
+                if len(self.pool.healthy) == 3:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(self.clients, self.pool.healthy)
+
+    @context.sub_context
+    def when_an_instance_cannot_be_reached_at_first(context: DSLContext) -> None:
+        @context.before
+        async def before(self: ContextData) -> None:
+            attempts: list[int] = []
+            unreachable = self.clients[0]
+            del unreachable._interface
+
+            async def connect() -> None:
+                attempts.append(1)
+                if len(attempts) == 1:
+                    raise Exception("test.Baresip0 was not found on DBus")
+                unreachable._interface = FakeInterface()
+
+            async def connected() -> None:
+                pass
+
+            unreachable.connect = connect
+            for client in self.clients[1:]:
+                client.connect = connected
+            await self.pool.connect()
+
+        @context.example
+        async def it_is_admitted_once_it_connects(self: ContextData) -> None:
+            self.assertEqual(self.clients[1:], self.pool.healthy)
+            for _ in range(100):
+                if len(self.pool.healthy) == 3:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(self.clients, self.pool.healthy)
+            client, _ = await self.pool.dial("sip:x@y")
+            self.assertEqual(["dial sip:x@y"], client._interface.calls)
+
+    @context.sub_context
+    def when_subscribed_to_events(context: DSLContext) -> None:
+        @context.example
+        async def it_merges_events_from_all_instances(self: ContextData) -> None:
+            events = self.pool.events()
+            first = asyncio.ensure_future(events.__anext__())
+            await asyncio.sleep(0)
+            call_event(self.clients[1], "CALL_INCOMING", "b")
+            client, event = await first
+            self.assertIs(self.clients[1], client)
+            self.assertEqual("b", event["id"])
+            await events.aclose()
@@ -0,0 +1,129 @@
+import array
+import concurrent.futures
+import math
+import os
+import tempfile
+import wave
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.config as config
+import pybaresip.prompts as prompts
+
+
+def write_wav(
+    path: str, rate: int, channels: int, seconds: float = 0.5, frequency: float = 440
+) -> None:
+    frames = int(rate * seconds)
+    samples = array.array(
+        "h",
+        (
+            int(16384 * math.sin(i * 2 * math.pi * frequency / rate))
+            for i in range(frames)
+            for _ in range(channels)
+        ),
+    )
+    with wave.open(path, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(samples.tobytes())
+
+
+@tdsl.context
+def prompt_library(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "source")
+        self.output = os.path.join(self.tmp.name, "output")
+        os.makedirs(os.path.join(self.source, "menus"))
+        write_wav(os.path.join(self.source, "welcome.wav"), 16000, 2)
+        write_wav(os.path.join(self.source, "menus", "main.wav"), 8000, 1)
+        with open(os.path.join(self.source, "broken.wav"), "wb") as f:
+            f.write(b"not a wav file")
+        self.executor = concurrent.futures.ThreadPoolExecutor(2)
+
+    @context.after
+    async def after(self: ContextData) -> None:
+        self.executor.shutdown()
+        self.tmp.cleanup()
+
+    @context.example
+    async def it_normalises_prompts_to_the_target_format(
+        self: ContextData,
+    ) -> None:
+        library = prompts.PromptLibrary(self.source, self.output)
+        report = await library.scan()
+        self.assertEqual((3, 2, 1), (report.total, report.normalised, report.failed))
+        self.assertEqual(["menus/main.wav", "welcome.wav"], library.names())
+        with wave.open(library.path("welcome.wav"), "rb") as w:
+            self.assertEqual(
+                (1, 2, 8000), (w.getnchannels(), w.getsampwidth(), w.getframerate())
+            )
+        info = library.info("welcome.wav")
+        self.assertTrue(info.converted)
+        self.assertAlmostEqual(0.5, info.duration, places=2)
+        self.assertAlmostEqual(-6.0, info.peak_dbfs, places=0)
+        self.assertFalse(library.info("menus/main.wav").converted)
+
+    @context.example
+    async def it_only_rescans_files_that_changed(self: ContextData) -> None:
+        library = prompts.PromptLibrary(self.source, self.output)
+        await library.scan(self.executor)
+        os.unlink(os.path.join(self.source, "broken.wav"))
+        # Touched but not changed: found to be the same by its hash.
+        os.utime(os.path.join(self.source, "welcome.wav"), (1, 1))
+        write_wav(os.path.join(self.source, "menus", "main.wav"), 8000, 1, 1.0)
+        again = prompts.PromptLibrary(self.source, self.output)
+        report = await again.scan(self.executor)
+        self.assertEqual((2, 1, 1), (report.total, report.unchanged, report.normalised))
+        self.assertAlmostEqual(1.0, again.info("menus/main.wav").duration, places=2)
+
+    @context.example
+    async def it_forgets_removed_prompts(self: ContextData) -> None:
+        library = prompts.PromptLibrary(self.source, self.output)
+        await library.scan(self.executor)
+        path = library.path("welcome.wav")
+        os.unlink(os.path.join(self.source, "welcome.wav"))
+        report = await library.scan(self.executor)
+        self.assertEqual(1, report.removed)
+        self.assertNotIn("welcome.wav", library)
+        self.assertFalse(os.path.exists(path))
+
+    @context.example
+    async def it_takes_the_format_from_the_config(self: ContextData) -> None:
+        cfg = config.BaresipConfig(extra={"auplay_srate": "16000"})
+        self.assertEqual(
+            prompts.PromptFormat(16000, 1), prompts.PromptFormat.from_config(cfg)
+        )
+
+
+@tdsl.context
+def prompt_resampling(context: DSLContext) -> None:
+    @context.function
+    def level_after_normalising(self: ContextData, frequency: float) -> float:
+        """
+        The RMS level in dBFS of a 48 kHz tone resampled to 8 kHz, leaving out the
+        clicks where it starts and stops.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "source.wav")
+            destination = os.path.join(tmp, "out", "prompt.wav")
+            write_wav(source, 48000, 1, frequency=frequency)
+            prompts.normalise(source, destination, prompts.PromptFormat())
+            with wave.open(destination, "rb") as w:
+                frames = w.readframes(w.getnframes())
+        samples = array.array("h", frames)[400:-400]
+        rms = math.sqrt(sum(s * s for s in samples) / len(samples))
+        return 20 * math.log10(max(rms, 1) / 32768)
+
+    @context.example
+    def it_keeps_the_telephony_band(self: ContextData) -> None:
+        self.assertAlmostEqual(-9.0, self.level_after_normalising(1000), places=0)
+
+    @context.example
+    def it_does_not_fold_tones_above_nyquist_into_it(self: ContextData) -> None:
+        self.assertLess(self.level_after_normalising(6000), -60.0)
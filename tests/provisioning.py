@@ -0,0 +1,142 @@
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.baresip as bs
+import pybaresip.identity as identity
+import pybaresip.provisioning as prov
+
+from .baresip_invoke import FakeInterface
+
+REGINFO = """
+--- User Agents (2) ---
+> sip:alice@example.com:5060                  OK  (3600 s, UDP, 1.2.3.4)
+  sip:bob@example.com:5060                    zzz
+"""
+
+
+class RegInfoInterface(FakeInterface):
+    async def call_invoke(self, action: str) -> str:
+        await super().call_invoke(action)
+        return REGINFO if action == "reginfo" else "OK"
+
+
+class RejectingInterface(RegInfoInterface):
+    async def call_invoke(self, action: str) -> str:
+        if action.startswith("uanew"):
+            raise RuntimeError(f"'{action}' rejected")
+        return await super().call_invoke(action)
+
+
+def ident(user: str, **flags: str) -> identity.Identity:
+    return identity.Identity(
+        user=user,
+        password="pw",
+        gateway="example.com",
+        flags=[{k: v} for k, v in flags.items()],
+    )
+
+
+@tdsl.context
+def plan_sync(context: DSLContext) -> None:
+    @context.before
+    def before(self: ContextData) -> None:
+        self.alice = ident("alice")
+        self.bob = ident("bob")
+        self.applied = {
+            self.alice.aor: f"uanew {self.alice.sip}",
+            self.bob.aor: f"uanew {self.bob.sip}",
+        }
+
+    @context.example
+    def it_has_nothing_to_do_when_everything_matches(self: ContextData) -> None:
+        plan = prov.plan_sync(
+            [self.alice.aor, self.bob.aor], self.applied, [self.alice, self.bob]
+        )
+        self.assertEqual(0, plan.changes)
+        self.assertEqual(2, plan.unchanged)
+
+    @context.example
+    def it_updates_identities_whose_flags_changed(self: ContextData) -> None:
+        changed = ident("bob", regint="0")
+        plan = prov.plan_sync(
+            [self.alice.aor, self.bob.aor], self.applied, [self.alice, changed]
+        )
+        self.assertEqual([changed], plan.update)
+
+    @context.example
+    def it_creates_missing_and_deletes_extra_identities(
+        self: ContextData,
+    ) -> None:
+        carol = ident("carol")
+        plan = prov.plan_sync([self.alice.aor, self.bob.aor], self.applied, [carol])
+        self.assertEqual([carol], plan.create)
+        self.assertEqual(sorted([self.alice.aor, self.bob.aor]), plan.delete)
+
+    @context.example
+    def it_keeps_extra_identities_without_prune(self: ContextData) -> None:
+        plan = prov.plan_sync([self.alice.aor], self.applied, [], prune=False)
+        self.assertEqual([], plan.delete)
+
+    @context.example
+    def it_leaves_agents_it_did_not_create_alone(self: ContextData) -> None:
+        plan = prov.plan_sync([self.alice.aor], {}, [self.alice])
+        self.assertEqual([self.alice.aor], plan.unverified)
+        self.assertEqual(0, plan.changes)
+
+
+@tdsl.context
+def sync_identities(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.bs = bs.PyBareSIP()
+        self.interface = RegInfoInterface()
+        self.bs._interface = self.interface
+        self.alice = ident("alice")
+        self.bs._state.record(f"uanew {self.alice.sip}")
+        self.bs._state.record(f"uanew {ident('bob').sip}")
+
+    @context.example
+    async def it_lists_the_user_agents_from_reginfo(self: ContextData) -> None:
+        self.assertEqual(
+            ["sip:alice@example.com:5060", "sip:bob@example.com:5060"],
+            await self.bs.user_agents(),
+        )
+
+    @context.example
+    async def it_costs_one_round_trip_when_nothing_changed(
+        self: ContextData,
+    ) -> None:
+        report = await self.bs.sync_identities([self.alice, ident("bob")])
+        self.assertEqual(["reginfo"], self.interface.calls)
+        self.assertEqual(2, report.unchanged)
+
+    @context.example
+    async def it_applies_only_the_differences(self: ContextData) -> None:
+        bob = ident("bob", regint="0")
+        carol = ident("carol")
+        report = await self.bs.sync_identities([bob, carol])
+        self.assertEqual(
+            sorted(
+                [
+                    "reginfo",
+                    f"uadel {self.alice.aor}",
+                    f"uadel {bob.aor}",
+                    f"uanew {bob.sip}",
+                    f"uanew {carol.sip}",
+                ]
+            ),
+            sorted(self.interface.calls),
+        )
+        self.assertEqual([self.alice.aor], report.deleted)
+        self.assertEqual([bob.aor], report.updated)
+        self.assertEqual([carol.aor], report.created)
+
+    @context.example
+    async def it_reports_failures_without_passwords(self: ContextData) -> None:
+        self.bs._interface = RejectingInterface()
+        report = await self.bs.sync_identities([self.alice, ident("bob"), ident("eve")])
+        [(aor, error)] = report.failed
+        self.assertEqual(ident("eve").aor, aor)
+        self.assertIn("auth_pass=***", error)
+        self.assertNotIn("pw", error)
@@ -0,0 +1,125 @@
+import asyncio
+import time
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.calls as calls
+import pybaresip.exceptions as ex
+import pybaresip.ratelimit as rl
+
+from .pool import QuietClient, call_event
+
+
+@tdsl.context
+def token_bucket(context: DSLContext) -> None:
+    @context.example
+    def it_allows_a_burst_up_to_its_capacity(self: ContextData) -> None:
+        bucket = rl.TokenBucket(rate=1.0, capacity=3)
+        self.assertEqual(
+            [True, True, True, False], [bucket.try_acquire() for _ in range(4)]
+        )
+
+    @context.example
+    def it_reports_how_long_until_a_token_is_available(self: ContextData) -> None:
+        bucket = rl.TokenBucket(rate=10.0, capacity=1)
+        bucket.try_acquire()
+        self.assertTrue(0.0 < bucket.delay() <= 0.1)
+
+    @context.example
+    async def it_paces_waiting_acquirers(self: ContextData) -> None:
+        bucket = rl.TokenBucket(rate=100.0, capacity=1)
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(4)))
+        self.assertGreaterEqual(time.monotonic() - start, 0.025)
+
+
+@tdsl.context
+def admission_controller(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.client = QuietClient()
+        self.tracker = calls.CallTracker()
+        self.client.add_event_listener(self.tracker)
+
+    def controller(self: ContextData, **kwargs) -> rl.AdmissionController:
+        return rl.AdmissionController(self.tracker, **kwargs)
+
+    @context.sub_context
+    def in_reject_mode(context: DSLContext) -> None:
+        @context.example
+        async def it_refuses_calls_over_an_identity_cap(self: ContextData) -> None:
+            admission = controller(
+                self,
+                identity_limit=rl.CallLimit(max_concurrent=1),
+                mode=rl.AdmissionMode.REJECT,
+            )
+            call_event(self.client, "CALL_OUTGOING", "1", accountaor="sip:a@x")
+            with self.assertRaises(ex.AdmissionError) as e:
+                async with admission.admit("sip:a@x", "gw"):
+                    pass
+            self.assertEqual(rl.AdmissionScope.IDENTITY, e.exception.scope)
+            async with admission.admit("sip:b@x", "gw"):
+                pass
+
+        @context.example
+        async def it_counts_dials_that_are_still_in_progress(
+            self: ContextData,
+        ) -> None:
+            admission = controller(
+                self,
+                gateway_limit=rl.CallLimit(max_concurrent=1),
+                mode=rl.AdmissionMode.REJECT,
+            )
+            async with admission.admit("sip:a@x", "gw"):
+                with self.assertRaises(ex.AdmissionError):
+                    async with admission.admit("sip:b@x", "gw"):
+                        pass
+
+        @context.example
+        async def it_refuses_calls_over_the_call_rate(self: ContextData) -> None:
+            admission = controller(
+                self,
+                global_limit=rl.CallLimit(rate=1.0, burst=1),
+                mode=rl.AdmissionMode.REJECT,
+            )
+            async with admission.admit("sip:a@x", "gw"):
+                pass
+            with self.assertRaises(ex.AdmissionError):
+                async with admission.admit("sip:b@x", "gw"):
+                    pass
+            self.assertEqual(1, admission.stats.rejected)
+
+    @context.sub_context
+    def in_queue_mode(context: DSLContext) -> None:
+        @context.example
+        async def it_admits_a_waiting_call_when_another_closes(
+            self: ContextData,
+        ) -> None:
+            admission = controller(self, global_limit=rl.CallLimit(max_concurrent=1))
+            call_event(self.client, "CALL_OUTGOING", "1", accountaor="sip:a@x")
+            admitted = asyncio.Event()
+
+            async def dial() -> None:
+                async with admission.admit("sip:a@x", "gw"):
+                    admitted.set()
+
+            task = asyncio.ensure_future(dial())
+            await asyncio.sleep(0.01)
+            self.assertFalse(admitted.is_set())
+            call_event(self.client, "CALL_CLOSED", "1")
+            await asyncio.wait_for(task, 1)
+            self.assertTrue(admitted.is_set())
+            self.assertEqual(1, admission.stats.queued)
+
+        @context.example
+        async def it_gives_up_after_max_wait(self: ContextData) -> None:
+            admission = controller(
+                self, global_limit=rl.CallLimit(max_concurrent=1), max_wait=0.01
+            )
+            call_event(self.client, "CALL_OUTGOING", "1", accountaor="sip:a@x")
+            with self.assertRaises(ex.AdmissionError):
+                async with admission.admit("sip:a@x", "gw"):
+                    pass
+            self.assertEqual({}, admission._waiters)
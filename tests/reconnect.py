@@ -0,0 +1,157 @@
+import asyncio
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.baresip as bs
+import pybaresip.exceptions as pbs_ex
+import pybaresip.reconnect as rc
+
+from .baresip_invoke import FakeInterface
+from .baresip_version import BANNER
+
+
+class BannerInterface(FakeInterface):
+    async def call_invoke(self, action: str) -> str:
+        await super().call_invoke(action)
+        if action == "insmod nosuch":
+            raise RuntimeError("module not found")
+        return BANNER if action == "about" else "OK"
+
+
+@tdsl.context
+def reconnect_policy(context: DSLContext) -> None:
+    @context.example
+    def it_backs_off_exponentially_up_to_the_maximum(self: ContextData) -> None:
+        policy = rc.ReconnectPolicy(
+            initial_delay=1.0, max_delay=4.0, multiplier=2.0, jitter=0.0
+        )
+        delays = policy.delays()
+        self.assertEqual([1.0, 2.0, 4.0, 4.0], [next(delays) for _ in range(4)])
+
+    @context.example
+    def it_applies_jitter_below_the_nominal_delay(self: ContextData) -> None:
+        policy = rc.ReconnectPolicy(initial_delay=1.0, jitter=0.5)
+        delay = next(policy.delays())
+        self.assertTrue(0.5 <= delay <= 1.0)
+
+
+@tdsl.context
+def client_state(context: DSLContext) -> None:
+    @context.before
+    def before(self: ContextData) -> None:
+        self.state = rc.ClientState()
+
+    @context.example
+    def it_replays_modules_then_user_agents_then_headers(self: ContextData) -> None:
+        self.state.record("uaaddheader X-Foo=bar")
+        self.state.record("uanew sip:a@example.com;regint=0")
+        self.state.record("insmod g711")
+        self.assertEqual(
+            [
+                "insmod g711",
+                "uanew sip:a@example.com;regint=0",
+                "uaaddheader X-Foo=bar",
+            ],
+            self.state.replay_commands(),
+        )
+
+    @context.example
+    def it_forgets_deleted_user_agents_and_removed_modules(
+        self: ContextData,
+    ) -> None:
+        self.state.record("uanew sip:a@example.com;regint=0")
+        self.state.record("insmod g711")
+        self.state.record("uadel sip:a@example.com")
+        self.state.record("rmmod g711")
+        self.assertEqual([], self.state.replay_commands())
+
+    @context.example
+    def it_ignores_queries(self: ContextData) -> None:
+        self.state.record("uastat")
+        self.assertEqual([], self.state.replay_commands())
+
+
+@tdsl.context
+def resilient_client(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.bs = bs.PyBareSIP(
+            reconnect=rc.ReconnectPolicy(initial_delay=0.001, max_queued=1)
+        )
+        self.interface = BannerInterface()
+        self.bs._interface = self.interface
+        self.bs._available = asyncio.Event()
+        self.bs._available.set()
+
+        async def attach() -> None:
+            self.bs._interface = self.interface
+
+        self.bs._attach = attach
+
+    @context.sub_context
+    def when_baresip_leaves_the_bus(context: DSLContext) -> None:
+        @context.before
+        async def before(self: ContextData) -> None:
+            self.bs._name_owner_changed(self.bs.bus_name, ":1.1", "")
+
+        @context.example
+        async def it_fails_realtime_commands_fast(self: ContextData) -> None:
+            with self.assertRaises(pbs_ex.BaresipUnavailableError):
+                await self.bs.hangup()
+
+        @context.example
+        async def it_rejects_commands_beyond_the_queue_bound(
+            self: ContextData,
+        ) -> None:
+            queued = asyncio.ensure_future(self.bs.uastat())
+            await asyncio.sleep(0)
+            with self.assertRaises(pbs_ex.BaresipUnavailableError):
+                await self.bs.reginfo()
+            queued.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await queued
+
+        @context.sub_context
+        def and_comes_back(context: DSLContext) -> None:
+            @context.example
+            async def it_sends_queued_commands_after_replaying_state(
+                self: ContextData,
+            ) -> None:
+                self.bs._state.record("uanew sip:a@example.com")
+                queued = asyncio.ensure_future(self.bs.uastat())
+                await asyncio.sleep(0)
+                self.bs._name_owner_changed(self.bs.bus_name, "", ":1.2")
+                self.assertEqual("OK", await queued)
+                self.assertEqual(
+                    ["about", "uanew sip:a@example.com", "uastat"],
+                    self.interface.calls,
+                )
+                self.assertEqual(2, self.bs.ver.major)
+
+            @context.example
+            async def it_carries_on_past_a_failing_replayed_command(
+                self: ContextData,
+            ) -> None:
+                self.bs._state.record("insmod nosuch")
+                self.bs._state.record("uanew sip:a@example.com")
+                queued = asyncio.ensure_future(self.bs.uastat())
+                await asyncio.sleep(0)
+                self.bs._name_owner_changed(self.bs.bus_name, "", ":1.2")
+                self.assertEqual("OK", await queued)
+                self.assertEqual(
+                    ["about", "insmod nosuch", "uanew sip:a@example.com", "uastat"],
+                    self.interface.calls,
+                )
+                self.assertTrue(self.bs._available.is_set())
+
+    @context.sub_context
+    def when_a_user_agent_is_created(context: DSLContext) -> None:
+        @context.example
+        async def it_records_it_for_replay(self: ContextData) -> None:
+            await self.bs.uanew("sip:a@example.com", flags={"regint": "0"})
+            self.assertEqual(
+                ["uanew sip:a@example.com;regint=0"],
+                self.bs._state.replay_commands(),
+            )
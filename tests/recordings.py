@@ -0,0 +1,234 @@
+import asyncio
+import concurrent.futures
+import json
+import os
+import tempfile
+import time
+import wave
+from typing import Any, Dict
+
+import numpy
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.recordings as recordings
+
+from .pool import QuietClient, call_event
+
+RATE = 8000
+
+
+def write_recording(path: str) -> None:
+    # One second of silence, half a second of tone, one second of silence.
+    t = numpy.arange(RATE // 2) / RATE
+    tone = 8000 * numpy.sin(2 * numpy.pi * 440 * t)
+    quiet = numpy.zeros(RATE)
+    audio = numpy.concatenate((quiet, tone, quiet)).astype("<i2")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes(audio.tobytes())
+
+
+def slow(path: str, info: Dict[str, Any]) -> str:
+    time.sleep(0.01)
+    return path
+
+
+def broken(path: str, info: Dict[str, Any]) -> str:
+    raise ValueError("no good")
+
+
+@tdsl.context
+def recording_pipeline(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manifest = os.path.join(self.tmp.name, "manifest.jsonl")
+        self.executor = concurrent.futures.ThreadPoolExecutor(2)
+
+    @context.after
+    async def after(self: ContextData) -> None:
+        self.executor.shutdown()
+        self.tmp.cleanup()
+
+    @context.function
+    def recording(self: ContextData, call_id: str) -> str:
+        path = os.path.join(self.tmp.name, f"{call_id}.wav")
+        write_recording(path)
+        return path
+
+    @context.function
+    def rows(self: ContextData) -> list:
+        with open(self.manifest) as f:
+            return [json.loads(line) for line in f]
+
+    @context.example
+    async def it_processes_recordings_when_calls_close(self: ContextData) -> None:
+        pipeline = recordings.RecordingPipeline(
+            [
+                recordings.TrimSilence(pad=0.1),
+                recordings.LevelStats(),
+                recordings.Compress(
+                    suffix=".copy", command=("cp", "{input}", "{output}")
+                ),
+            ],
+            self.manifest,
+            paths_for=lambda event: [os.path.join(self.tmp.name, f"{event['id']}.wav")],
+        )
+        client = QuietClient()
+        client.add_event_listener(pipeline)
+        source = self.recording("c1")
+        call_event(client, "CALL_CLOSED", "c1")
+        call_event(client, "CALL_CLOSED", "no-recording")
+        await pipeline.drain()
+        await pipeline.close()
+        [row] = self.rows()
+        self.assertEqual("c1", row["call_id"])
+        [entry] = row["files"]
+        self.assertAlmostEqual(1.8, entry["trimmed"], places=2)
+        self.assertAlmostEqual(0.7, entry["duration"], places=2)
+        self.assertAlmostEqual(-12.3, entry["peak_dbfs"], places=0)
+        self.assertFalse(os.path.exists(source))
+        self.assertTrue(os.path.exists(entry["output"]))
+
+    @context.example
+    async def it_records_stage_failures(self: ContextData) -> None:
+        pipeline = recordings.RecordingPipeline(
+            [broken, recordings.LevelStats()],
+            self.manifest,
+            paths_for=lambda event: [],
+            executor=self.executor,
+        )
+        pipeline.submit("c1", [self.recording("c1")])
+        await pipeline.drain()
+        await pipeline.close()
+        [row] = self.rows()
+        self.assertEqual("ValueError: no good", row["files"][0]["error"])
+        self.assertNotIn("duration", row["files"][0])
+        self.assertEqual(1, pipeline.stats.failed)
+
+    @context.example
+    async def it_spools_calls_beyond_the_queue(self: ContextData) -> None:
+        pipeline = recordings.RecordingPipeline(
+            [slow],
+            self.manifest,
+            paths_for=lambda event: [],
+            max_in_flight=1,
+            max_queued=2,
+            batch_size=3,
+            executor=self.executor,
+        )
+        path = self.recording("c")
+        for i in range(10):
+            pipeline.submit(str(i), [path])
+        self.assertEqual(8, pipeline.stats.spooled)
+        self.assertTrue(os.path.exists(pipeline.spool))
+        await pipeline.drain()
+        await pipeline.close()
+        self.assertEqual(
+            [str(i) for i in range(10)], [r["call_id"] for r in self.rows()]
+        )
+        self.assertFalse(os.path.exists(pipeline.spool))
+
+    @context.example
+    async def it_keeps_spooling_while_reading_the_spool_back(
+        self: ContextData,
+    ) -> None:
+        pipeline = recordings.RecordingPipeline(
+            [slow],
+            self.manifest,
+            paths_for=lambda event: [],
+            max_in_flight=1,
+            max_queued=2,
+            batch_size=1,
+            executor=self.executor,
+        )
+        path = self.recording("c")
+        for i in range(6):
+            pipeline.submit(str(i), [path])
+        while pipeline.stats.processed < 3:
+            await asyncio.sleep(0.005)
+        pipeline.submit("6", [path])
+        pipeline.submit("7", [path])
+        await pipeline.close()
+        again = recordings.RecordingPipeline(
+            [slow],
+            self.manifest,
+            paths_for=lambda event: [],
+            max_in_flight=1,
+            executor=self.executor,
+        )
+        await again.drain()
+        await again.close()
+        self.assertEqual(
+            [str(i) for i in range(8)], [r["call_id"] for r in self.rows()]
+        )
+        self.assertFalse(os.path.exists(pipeline.spool))
+
+    @context.example
+    async def it_leaves_unprocessed_calls_for_the_next_run(self: ContextData) -> None:
+        pipeline = recordings.RecordingPipeline(
+            [slow],
+            self.manifest,
+            paths_for=lambda event: [],
+            max_in_flight=1,
+            max_queued=2,
+            executor=self.executor,
+        )
+        path = self.recording("c")
+        for i in range(5):
+            pipeline.submit(str(i), [path])
+        await asyncio.sleep(0)
+        await pipeline.close()
+        done = len(self.rows()) if os.path.exists(self.manifest) else 0
+        again = recordings.RecordingPipeline(
+            [slow], self.manifest, paths_for=lambda event: [], executor=self.executor
+        )
+        await again.drain()
+        await again.close()
+        self.assertEqual(5, len(self.rows()))
+        self.assertLess(done, 5)
+
+
+@tdsl.context
+def recording_pipeline_outside_a_loop(context: DSLContext) -> None:
+    @context.example
+    def it_can_be_built_before_the_loop_runs(self: ContextData) -> None:
+        with tempfile.TemporaryDirectory() as tmp, concurrent.futures.ThreadPoolExecutor(
+            1
+        ) as executor:
+            pipeline = recordings.RecordingPipeline(
+                [slow],
+                os.path.join(tmp, "manifest.jsonl"),
+                paths_for=lambda event: [],
+                executor=executor,
+            )
+
+            async def use() -> None:
+                pipeline.submit("c1", [os.path.join(tmp, "c1.wav")])
+                await pipeline.drain()
+                await pipeline.close()
+
+            asyncio.run(use())
+            self.assertEqual(1, pipeline.stats.processed)
+
+
+@tdsl.context
+def trim_silence(context: DSLContext) -> None:
+    @context.example
+    def it_leaves_recordings_shorter_than_a_window_alone(self: ContextData) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "short.wav")
+            with wave.open(path, "wb") as w:
+                w.setnchannels(1)
+                w.setsampwidth(2)
+                w.setframerate(RATE)
+                w.writeframes(numpy.zeros(RATE // 100, dtype="<i2").tobytes())
+            info: Dict[str, Any] = {}
+            recordings.TrimSilence(window=0.02)(path, info)
+            self.assertEqual(0.0, info["trimmed"])
+            with wave.open(path, "rb") as w:
+                self.assertEqual(RATE // 100, w.getnframes())
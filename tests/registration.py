@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.registration as registration
+import pybaresip.timers as timers
+
+from .pool import QuietClient
+
+ME = "sip:me@example.com"
+
+
+def register_event(client: QuietClient, evtype: str, aor: str) -> None:
+    event = {"class": "register", "type": evtype, "accountaor": aor, "param": ""}
+    client._changed_event("register", evtype, json.dumps(event))
+
+
+@tdsl.context
+def registration_monitor(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.client = QuietClient()
+        self.changes: list[tuple[str, registration.RegistrationState]] = []
+        self.monitor = registration.RegistrationMonitor(
+            interval=0.02,
+            grace=0.0,
+            timers=timers.TimerWheel(resolution=0.005),
+            on_change=lambda aor, state: self.changes.append((aor, state)),
+        )
+        self.client.add_event_listener(self.monitor)
+
+    @context.after
+    async def after(self: ContextData) -> None:
+        self.monitor.close()
+
+    @context.example
+    async def it_tracks_registrations(self: ContextData) -> None:
+        register_event(self.client, "REGISTERING", ME)
+        self.assertEqual(
+            registration.RegistrationState.REGISTERING, self.monitor.state(ME)
+        )
+        register_event(self.client, "REGISTER_OK", ME)
+        register_event(self.client, "REGISTER_FAIL", ME)
+        self.assertEqual(
+            [
+                (ME, registration.RegistrationState.REGISTERED),
+                (ME, registration.RegistrationState.FAILED),
+            ],
+            self.changes,
+        )
+
+    @context.example
+    async def it_marks_accounts_that_do_not_reregister(self: ContextData) -> None:
+        register_event(self.client, "REGISTER_OK", ME)
+        register_event(self.client, "REGISTER_OK", "sip:other@example.com")
+        for _ in range(4):
+            await asyncio.sleep(0.01)
+            register_event(self.client, "REGISTER_OK", ME)
+        self.assertEqual(
+            registration.RegistrationState.REGISTERED, self.monitor.state(ME)
+        )
+        self.assertEqual(1, self.monitor.count(registration.RegistrationState.LAPSED))
+
+    @context.example
+    async def it_forgets_unregistered_accounts(self: ContextData) -> None:
+        register_event(self.client, "REGISTER_OK", ME)
+        register_event(self.client, "UNREGISTERING", ME)
+        await asyncio.sleep(0.04)
+        self.assertIsNone(self.monitor.state(ME))
+        self.assertEqual(0, len(self.monitor._timers))
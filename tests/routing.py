@@ -0,0 +1,120 @@
+import os
+import tempfile
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.routing as routing
+
+from .baresip_invoke import FakeInterface
+from .pool import QuietClient
+
+
+class UnknownAgentInterface(FakeInterface):
+    async def call_invoke(self, action: str) -> str:
+        await super().call_invoke(action)
+        if action == "uafind sip:broken@a.example":
+            return "could not find UA"
+        return "OK"
+
+
+@tdsl.context
+def e164_normalisation(context: DSLContext) -> None:
+    @context.example
+    def it_strips_formatting_and_international_prefixes(self: ContextData) -> None:
+        self.assertEqual("442079460000", routing.normalize_e164("+44 (20) 7946-0000"))
+        self.assertEqual("442079460000", routing.normalize_e164("0044 20 7946 0000"))
+        self.assertEqual(
+            "442079460000", routing.normalize_e164("sip:+442079460000@example.com")
+        )
+
+    @context.example
+    def it_replaces_the_national_prefix(self: ContextData) -> None:
+        self.assertEqual(
+            "442079460000", routing.normalize_e164("020 7946 0000", country_code="44")
+        )
+
+    @context.example
+    def it_rejects_things_that_are_not_numbers(self: ContextData) -> None:
+        for number in ("sip:alice@example.com", "1234567890123456", ""):
+            with self.assertRaises(routing.InvalidNumberError):
+                routing.normalize_e164(number)
+
+
+@tdsl.context
+def routing_table(context: DSLContext) -> None:
+    @context.before
+    def before(self: ContextData) -> None:
+        self.default = routing.Target(gateway="default.example")
+        self.uk = routing.Target(gateway="uk.example")
+        self.london = routing.Target(account="sip:ldn@ldn.example:5060")
+        self.table = routing.RoutingTable(
+            [("", self.default), ("44", self.uk), ("4420", self.london)]
+        )
+
+    @context.example
+    def it_matches_the_longest_prefix(self: ContextData) -> None:
+        self.assertEqual(("4420", (self.london,)), self.table.lookup("442079460000"))
+        self.assertEqual(("44", (self.uk,)), self.table.lookup("441619460000"))
+        self.assertEqual(("", (self.default,)), self.table.lookup("15551234567"))
+
+    @context.example
+    def it_raises_without_a_default_route(self: ContextData) -> None:
+        with self.assertRaises(routing.NoRouteError):
+            routing.RoutingTable([("44", self.uk)]).lookup("15551234567")
+
+    @context.example
+    def it_builds_uris_from_the_account_host(self: ContextData) -> None:
+        self.assertEqual("sip:+4420@ldn.example:5060", self.london.uri("4420"))
+
+    @context.example
+    def it_loads_from_a_file(self: ContextData) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "routes.csv")
+            with open(path, "w") as f:
+                f.write("# prefix,account,gateway,weight\n")
+                f.write("44,,uk.example,3\n44,,backup.example,\n")
+            table = routing.RoutingTable.from_file(path)
+        _, targets = table.lookup("4420")
+        self.assertEqual(
+            (
+                routing.Target(gateway="uk.example", weight=3),
+                routing.Target(gateway="backup.example"),
+            ),
+            targets,
+        )
+
+
+@tdsl.context
+def router(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.client = QuietClient()
+        self.client._interface = UnknownAgentInterface()
+        self.table = routing.RoutingTable(
+            [
+                ("44", routing.Target(account="sip:broken@a.example", weight=1000)),
+                ("44", routing.Target(account="sip:ok@b.example")),
+            ]
+        )
+        self.router = routing.Router(self.client, self.table, country_code="44")
+
+    @context.example
+    async def it_fails_over_to_the_next_target(self: ContextData) -> None:
+        target, _ = await self.router.dial("020 7946 0000")
+        self.assertEqual("sip:ok@b.example", target.account)
+        self.assertEqual(
+            "dial sip:+442079460000@b.example", self.client._interface.calls[-1]
+        )
+
+    @context.example
+    async def it_reports_every_failure(self: ContextData) -> None:
+        self.router.swap(
+            routing.RoutingTable(
+                [("44", routing.Target(account="sip:broken@a.example"))]
+            )
+        )
+        with self.assertRaises(routing.RoutesExhaustedError) as e:
+            await self.router.dial("+442079460000")
+        self.assertEqual(1, len(e.exception.failures))
@@ -0,0 +1,118 @@
+import asyncio
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.baresip as bs
+import pybaresip.scheduler as sched
+
+
+@tdsl.context
+def command_scheduler(context: DSLContext) -> None:
+    @context.sub_context
+    def the_command_priority_function(context: DSLContext) -> None:
+        @context.example
+        def it_treats_call_control_as_realtime(self: ContextData) -> None:
+            self.assertEqual(sched.Priority.REALTIME, sched.command_priority("accept"))
+            self.assertEqual(
+                sched.Priority.REALTIME, sched.command_priority("dial sip:x@y")
+            )
+
+        @context.example
+        def it_treats_provisioning_as_bulk(self: ContextData) -> None:
+            self.assertEqual(
+                sched.Priority.BULK, sched.command_priority("uanew sip:x@y")
+            )
+
+        @context.example
+        def it_defaults_to_normal(self: ContextData) -> None:
+            self.assertEqual(sched.Priority.NORMAL, sched.command_priority("uastat"))
+
+    @context.sub_context
+    def when_all_slots_are_busy(context: DSLContext) -> None:
+        @context.before
+        async def before(self: ContextData) -> None:
+            self.scheduler = sched.CommandScheduler(
+                max_in_flight=1,
+                limits={
+                    sched.Priority.REALTIME: sched.ClassLimits(1, 3),
+                    sched.Priority.BULK: sched.ClassLimits(1, 1),
+                },
+            )
+            self.order = []
+
+            async def run(action: str, gate: asyncio.Event) -> None:
+                async with self.scheduler.slot(action):
+                    self.order.append(action)
+                    await gate.wait()
+
+            self.run = run
+
+        @context.example
+        async def it_shares_slots_by_weight(self: ContextData) -> None:
+            gate = asyncio.Event()
+            blocker = asyncio.ensure_future(self.run("uastat", gate))
+            await asyncio.sleep(0)
+            tasks = [
+                asyncio.ensure_future(self.run(f"uanew sip:{i}@x", gate))
+                for i in range(2)
+            ] + [asyncio.ensure_future(self.run(f"hangup {i}", gate)) for i in range(4)]
+            await asyncio.sleep(0)
+            gate.set()
+            await asyncio.gather(blocker, *tasks)
+            self.assertEqual(
+                [x.split()[0] for x in self.order],
+                ["uastat", "hangup", "hangup", "uanew", "hangup", "hangup", "uanew"],
+            )
+
+        @context.example
+        async def it_reports_queue_depth(self: ContextData) -> None:
+            gate = asyncio.Event()
+            blocker = asyncio.ensure_future(self.run("uastat", gate))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(self.run("uanew sip:a@b", gate))
+            await asyncio.sleep(0)
+            stats = self.scheduler.stats()
+            self.assertEqual(1, stats[sched.Priority.BULK].queued)
+            self.assertEqual(1, stats[sched.Priority.NORMAL].in_flight)
+            gate.set()
+            await asyncio.gather(blocker, waiter)
+            stats = self.scheduler.stats()
+            self.assertEqual(0, stats[sched.Priority.BULK].queued)
+            self.assertEqual(1, stats[sched.Priority.BULK].dispatched)
+            self.assertGreaterEqual(stats[sched.Priority.BULK].max_wait, 0.0)
+
+        @context.example
+        async def it_drops_cancelled_waiters(self: ContextData) -> None:
+            gate = asyncio.Event()
+            blocker = asyncio.ensure_future(self.run("uastat", gate))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(self.run("uanew sip:a@b", gate))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.sleep(0)
+            self.assertEqual(0, self.scheduler.stats()[sched.Priority.BULK].queued)
+            gate.set()
+            await blocker
+            self.assertEqual(["uastat"], self.order)
+            self.assertEqual(0, self.scheduler.stats()[sched.Priority.NORMAL].in_flight)
+
+    @context.sub_context
+    def when_attached_to_pybaresip(context: DSLContext) -> None:
+        @context.example
+        async def it_routes_invoke_through_a_slot(self: ContextData) -> None:
+            scheduler = sched.CommandScheduler()
+            client = bs.PyBareSIP(scheduler=scheduler)
+            interface = type("Interface", (), {})()
+
+            async def call_invoke(action: str) -> str:
+                self.assertEqual(
+                    1, scheduler.stats()[sched.Priority.REALTIME].in_flight
+                )
+                return "OK"
+
+            interface.call_invoke = call_invoke
+            client._interface = interface
+            self.assertEqual("OK", await client.invoke("accept"))
+            self.assertEqual(0, scheduler.stats()[sched.Priority.REALTIME].in_flight)
@@ -0,0 +1,89 @@
+import os
+import random
+import tempfile
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.policy as policy
+import pybaresip.screening as screening
+
+
+@tdsl.context
+def number_files(context: DSLContext) -> None:
+    @context.before
+    def before(self: ContextData) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "blocked")
+        random.seed(7)
+        self.numbers = {random.randrange(10**10, 10**12) for _ in range(5000)}
+        # Small chunks so that the external merge is exercised.
+        self.count = screening.build_number_file(
+            self.path, list(self.numbers) * 2, chunk_size=1000
+        )
+        self.numbers_file = screening.NumberSet(self.path)
+
+    @context.after
+    def after(self: ContextData) -> None:
+        self.numbers_file.close()
+        self.tmp.cleanup()
+
+    @context.example
+    def it_removes_duplicates(self: ContextData) -> None:
+        self.assertEqual(len(self.numbers), self.count)
+        self.assertEqual(len(self.numbers), len(self.numbers_file))
+
+    @context.example
+    def it_finds_every_number_in_the_list(self: ContextData) -> None:
+        for number in self.numbers:
+            self.assertIn(number, self.numbers_file)
+
+    @context.example
+    def it_finds_no_numbers_that_are_not_in_the_list(self: ContextData) -> None:
+        others = (n for n in range(10**12, 10**12 + 5000))
+        self.assertFalse(any(n in self.numbers_file for n in others))
+
+    @context.example
+    def it_accepts_uris_and_formatted_numbers(self: ContextData) -> None:
+        number = min(self.numbers)
+        self.assertIn(f"sip:+{number}@example.com", self.numbers_file)
+        self.assertNotIn("sip:alice@example.com", self.numbers_file)
+
+
+@tdsl.context
+def screener(context: DSLContext) -> None:
+    @context.before
+    def before(self: ContextData) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.blocked = os.path.join(self.tmp.name, "blocked")
+        self.allowed = os.path.join(self.tmp.name, "allowed")
+        screening.build_number_file(self.blocked, ["+441", "+442"])
+        screening.build_number_file(self.allowed, ["+442"])
+        self.screener = screening.Screener(self.blocked, self.allowed)
+
+    @context.after
+    def after(self: ContextData) -> None:
+        self.screener.close()
+        self.tmp.cleanup()
+
+    @context.example
+    def it_blocks_listed_callers_unless_allowed(self: ContextData) -> None:
+        self.assertTrue(self.screener.blocked("sip:+441@x"))
+        self.assertFalse(self.screener.blocked("sip:+442@x"))
+        self.assertFalse(self.screener.blocked("sip:+443@x"))
+
+    @context.example
+    def it_picks_up_rebuilt_lists_on_reload(self: ContextData) -> None:
+        screening.build_number_file(self.blocked, ["+443"])
+        self.assertFalse(self.screener.blocked("sip:+443@x"))
+        self.screener.reload()
+        self.assertTrue(self.screener.blocked("sip:+443@x"))
+
+    @context.example
+    def it_drives_policy_rules(self: ContextData) -> None:
+        engine = policy.PolicyEngine(
+            [policy.Rule(policy.Action.REJECT, screen=self.screener.blocked)]
+        )
+        self.assertIsNotNone(engine.decide("sip:me@x", "sip:+441@x"))
+        self.assertIsNone(engine.decide("sip:me@x", "sip:+443@x"))
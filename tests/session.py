@@ -0,0 +1,136 @@
+import asyncio
+import os
+import tempfile
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.baresip as bs
+import pybaresip.exceptions as pbs_ex
+import pybaresip.session as session
+
+from .baresip_invoke import FakeInterface
+
+
+class SlowCallfind(FakeInterface):
+    async def call_invoke(self, action: str) -> str:
+        if action.startswith("callfind"):
+            await asyncio.sleep(1.0)
+        return await super().call_invoke(action) + f" {action}"
+
+
+@tdsl.context
+def session_recorder(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.recorder = session.SessionRecorder()
+        self.client = bs.PyBareSIP(timeouts={"callfind": 0.02}, recorder=self.recorder)
+        self.client._interface = SlowCallfind(delay=0.01)
+
+    @context.example
+    async def it_records_commands_and_latencies(self: ContextData) -> None:
+        await asyncio.gather(self.client.uastat(), self.client.dial("sip:1@x"))
+        with self.assertRaises(pbs_ex.BaresipTimeoutError):
+            await self.client.callfind("1")
+
+        entries = self.recorder.entries
+        self.assertEqual(
+            ["uastat", "dial sip:1@x", "callfind 1"], [e.action for e in entries]
+        )
+        self.assertEqual("OK uastat", entries[0].response)
+        self.assertGreaterEqual(entries[0].bus, 0.01)
+        self.assertGreaterEqual(entries[0].latency, entries[0].bus)
+        self.assertIsNone(entries[2].response)
+        self.assertTrue(entries[2].error.startswith("BaresipTimeoutError"))
+        self.assertGreaterEqual(entries[2].offset, entries[0].latency)
+
+    @context.example
+    async def it_masks_passwords(self: ContextData) -> None:
+        await self.client.uanew("sip:a@x;auth_pass=secret;regint=0")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "session.jsonl")
+            self.recorder.save(path)
+            with open(path) as f:
+                saved = f.read()
+        self.assertNotIn("secret", saved)
+        self.assertEqual(
+            "uanew sip:a@x;auth_pass=***;regint=0", self.recorder.entries[0].action
+        )
+
+    @context.example
+    async def it_saves_and_loads_a_session(self: ContextData) -> None:
+        await self.client.uastat()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "session.jsonl")
+            self.recorder.save(path)
+            self.assertEqual(self.recorder.entries, session.load(path))
+
+
+@tdsl.context
+def session_replay(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.entries = [
+            session.SessionEntry(0.0, "uastat", "one", latency=0.02, bus=0.02),
+            session.SessionEntry(0.01, "uastat", "two", latency=0.02, bus=0.02),
+            session.SessionEntry(0.02, "dial sip:1@x", "OK", latency=0.01, bus=0.01),
+            session.SessionEntry(
+                0.03,
+                "hangup",
+                error="BaresipTimeoutError: 'hangup' did not complete",
+                latency=0.05,
+                bus=0.05,
+            ),
+        ]
+
+    @context.example
+    async def it_answers_as_the_session_did(self: ContextData) -> None:
+        interface = session.ReplayInterface(self.entries, latency_scale=0.0)
+        answers = [await interface.call_invoke("uastat") for _ in range(3)]
+        self.assertEqual(["one", "two", "two"], answers)
+        self.assertEqual("OK", await interface.call_invoke("dial sip:2@x"))
+        self.assertEqual("", await interface.call_invoke("about"))
+
+    @context.example
+    async def it_reports_against_the_original(self: ContextData) -> None:
+        client = bs.PyBareSIP(timeouts={"hangup": 0.03})
+        interface = FakeInterface()
+        client._interface = interface
+        report = await session.replay(client, self.entries, speed=2.0, seed=1)
+
+        self.assertEqual(4, report.replayed.commands)
+        self.assertEqual(1, report.replayed.errors)
+        self.assertIsNone(client.recorder)
+        old, new = report.commands["uastat"]
+        self.assertEqual(2, new.commands)
+        self.assertGreaterEqual(new.p50, 0.02)
+        self.assertIn("uastat", report.format())
+        self.assertEqual({"uastat", "dial", "hangup"}, set(report.commands))
+        self.assertIs(interface, client._interface)
+        self.assertEqual([], interface.calls)
+
+    @context.example
+    async def it_replays_as_fast_as_possible(self: ContextData) -> None:
+        client = bs.PyBareSIP()
+        entries = [
+            session.SessionEntry(i * 0.1, "uastat", "OK", latency=0.01, bus=0.01)
+            for i in range(20)
+        ]
+        start = asyncio.get_running_loop().time()
+        report = await session.replay(client, entries, speed=None)
+        self.assertLess(asyncio.get_running_loop().time() - start, 0.5)
+        self.assertGreater(report.replayed.throughput, report.original.throughput)
+
+    @context.example
+    async def it_leaves_the_client_state_alone(self: ContextData) -> None:
+        client = bs.PyBareSIP()
+        client._interface = FakeInterface()
+        await client.uanew("sip:a@x;auth_pass=secret")
+        entries = [
+            session.SessionEntry(0.0, "uanew sip:b@x;auth_pass=***", "OK"),
+        ]
+        await session.replay(client, entries, speed=None, latency_scale=0.0)
+        self.assertEqual(
+            ["uanew sip:a@x;auth_pass=secret"], list(client._state.replay_commands())
+        )
@@ -0,0 +1,125 @@
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.baresip as bs
+import pybaresip.identity as identity
+import pybaresip.sharding as sharding
+
+from .baresip_invoke import FakeInterface
+
+
+def make_client() -> bs.PyBareSIP:
+    client = bs.PyBareSIP()
+    client._interface = FakeInterface()
+    return client
+
+
+@tdsl.context
+def hash_ring(context: DSLContext) -> None:
+    @context.before
+    def before(self: ContextData) -> None:
+        self.ring = sharding.HashRing(["a", "b", "c"])
+        self.keys = [f"sip:user{i}@example.com:5060" for i in range(2000)]
+
+    @context.example
+    def it_spreads_keys_over_all_nodes(self: ContextData) -> None:
+        owners = [self.ring.node_for(k) for k in self.keys]
+        for node in "abc":
+            self.assertGreater(owners.count(node), len(self.keys) / 6)
+
+    @context.example
+    def it_only_moves_keys_to_an_added_node(self: ContextData) -> None:
+        before = {k: self.ring.node_for(k) for k in self.keys}
+        self.ring.add("d")
+        moved = {k for k in self.keys if self.ring.node_for(k) != before[k]}
+        self.assertTrue(moved)
+        self.assertEqual({"d"}, {self.ring.node_for(k) for k in moved})
+        self.assertLess(len(moved), len(self.keys) / 2)
+
+    @context.example
+    def it_only_moves_keys_off_a_removed_node(self: ContextData) -> None:
+        before = {k: self.ring.node_for(k) for k in self.keys}
+        self.ring.remove("b")
+        for k in self.keys:
+            if before[k] != "b":
+                self.assertEqual(before[k], self.ring.node_for(k))
+
+
+@tdsl.context
+def account_sharder(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.clients = {name: make_client() for name in ("a", "b")}
+        self.sharder = sharding.AccountSharder(self.clients)
+        self.identities = [
+            identity.Identity(user=f"user{i}", password="pw", gateway="example.com")
+            for i in range(50)
+        ]
+        await self.sharder.add_identities(self.identities)
+
+    @context.example
+    async def it_creates_each_identity_on_its_owner(self: ContextData) -> None:
+        for ident in self.identities:
+            client = self.sharder.client_for(ident.aor)
+            self.assertIn(f"uanew {ident.sip}", client._interface.calls)
+
+    @context.example
+    async def it_moves_only_the_accounts_a_new_instance_owns(
+        self: ContextData,
+    ) -> None:
+        new = make_client()
+        result = await self.sharder.add_instance("c", new)
+        self.assertTrue(result.moved)
+        for aor, old, target in result.moved:
+            self.assertEqual("c", target)
+            self.assertIn(f"uadel {aor}", self.clients[old]._interface.calls)
+        self.assertEqual(
+            sorted(aor for aor, _, _ in result.moved),
+            sorted(self.sharder.accounts_on("c")),
+        )
+
+    @context.example
+    async def it_recreates_accounts_of_a_removed_instance(
+        self: ContextData,
+    ) -> None:
+        lost = self.sharder.accounts_on("a")
+        self.clients["b"]._interface.calls.clear()
+        await self.sharder.remove_instance("a")
+        self.assertEqual(
+            sorted(f"uanew {i.sip}" for i in self.identities if i.aor in lost),
+            sorted(self.clients["b"]._interface.calls),
+        )
+
+    @context.example
+    async def it_recreates_accounts_whose_flags_changed_in_place(
+        self: ContextData,
+    ) -> None:
+        for client in self.clients.values():
+            client._interface.calls.clear()
+        changed = identity.Identity(user="user0", password="new", gateway="example.com")
+        result = await self.sharder.add_identities([changed, self.identities[1]])
+        owner = self.sharder.owner(changed.aor)
+        self.assertEqual([(changed.aor, owner, owner)], result.moved)
+        self.assertEqual(
+            [f"uadel {changed.aor}", f"uanew {changed.sip}"],
+            self.clients[owner]._interface.calls,
+        )
+
+    @context.example
+    async def it_places_e164_accounts(self: ContextData) -> None:
+        number = identity.CompactIdentity("+442079460000", "pw", "gw.example.com")
+        result = await self.sharder.add_identities([number])
+        self.assertEqual([], result.failed)
+        client = self.sharder.client_for(number.aor)
+        self.assertEqual(f"uanew {number.sip}", client._interface.calls[-1])
+
+    @context.example
+    async def it_dials_from_the_owning_instance(self: ContextData) -> None:
+        aor = self.identities[0].aor
+        client = self.sharder.client_for(aor)
+        client._interface.calls.clear()
+        await self.sharder.dial_as(aor, "sip:peer@example.com")
+        self.assertEqual(
+            [f"uafind {aor}", "dial sip:peer@example.com"], client._interface.calls
+        )
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import stat
+import sys
+import tempfile
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.config as pbs_conf
+import pybaresip.supervisor as sup
+
+FAKE_BARESIP = """#!{python}
+import signal, sys, time
+if "{mode}" == "stubborn":
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+print("config dir", sys.argv[2], flush=True)
+print("baresip is ready.", flush=True)
+if "{mode}" == "crash":
+    time.sleep(0.2)
+    sys.exit(3)
+time.sleep(60)
+"""
+
+
+class BuslessSupervisor(sup.BaresipSupervisor):
+    """
+    There is no session bus in the test environment.
+    """
+
+    async def _open_bus(self) -> None:
+        pass
+
+    async def _has_owner(self) -> bool:
+        return False
+
+
+@tdsl.context
+def generated_baresip_config(context: DSLContext) -> None:
+    @context.example
+    def it_renders_only_the_requested_modules(self: ContextData) -> None:
+        config = pbs_conf.BaresipConfig(
+            module_path="/mods", modules=["g711"], extra={"sip_listen": "0.0.0.0:0"}
+        )
+        self.assertEqual(
+            "module_path\t\t/mods\n"
+            "module\t\t\tg711.so\n"
+            "module_app\t\tctrl_dbus.so\n"
+            "sip_listen\t\t0.0.0.0:0\n",
+            config.render(),
+        )
+
+    @context.example
+    def it_writes_config_and_an_empty_accounts_file(self: ContextData) -> None:
+        with tempfile.TemporaryDirectory() as d:
+            pbs_conf.write_config_dir(d, pbs_conf.BaresipConfig())
+            self.assertEqual(["accounts", "config"], sorted(os.listdir(d)))
+            self.assertEqual(0, os.path.getsize(os.path.join(d, "accounts")))
+
+
+@tdsl.context
+def baresip_supervisor(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.lines = []
+
+        def on_output(line: str) -> None:
+            self.lines.append(line)
+            if line == "baresip is ready.":
+                # Stands in for the bus daemon announcing the new owner.
+                self.supervisor._name_owner_changed(
+                    self.supervisor.bus_name, "", ":1.9"
+                )
+
+        def make(mode: str) -> sup.BaresipSupervisor:
+            exe = os.path.join(self.tmp.name, f"baresip-{mode}")
+            with open(exe, "w") as f:
+                f.write(FAKE_BARESIP.format(python=sys.executable, mode=mode))
+            os.chmod(exe, os.stat(exe).st_mode | stat.S_IEXEC)
+            supervisor = BuslessSupervisor(
+                baresip_exe=exe,
+                on_output=on_output,
+                ready_timeout=5.0,
+                stop_timeout=0.5,
+                restart_initial_delay=0.01,
+            )
+            self.supervisor = supervisor
+            return supervisor
+
+        self.make = make
+
+    @context.after
+    async def after(self: ContextData) -> None:
+        self.tmp.cleanup()
+
+    @context.sub_context
+    def when_baresip_claims_its_bus_name(context: DSLContext) -> None:
+        @context.example
+        async def it_is_ready_and_captures_output(self: ContextData) -> None:
+            supervisor = self.make("normal")
+            await supervisor.start()
+            try:
+                self.assertTrue(supervisor.ready)
+                self.assertEqual(f"config dir {supervisor.config_dir}", self.lines[0])
+                self.assertTrue(
+                    os.path.exists(os.path.join(supervisor.config_dir, "config"))
+                )
+            finally:
+                await supervisor.stop()
+
+        @context.example
+        async def it_removes_the_generated_config_on_stop(
+            self: ContextData,
+        ) -> None:
+            supervisor = self.make("normal")
+            await supervisor.start()
+            config_dir = supervisor.config_dir
+            await supervisor.stop()
+            self.assertFalse(os.path.exists(config_dir))
+
+    @context.sub_context
+    def when_baresip_ignores_sigterm(context: DSLContext) -> None:
+        @context.example
+        async def it_escalates_to_sigkill(self: ContextData) -> None:
+            supervisor = self.make("stubborn")
+            await supervisor.start()
+            proc = supervisor._proc
+            await supervisor.stop()
+            self.assertEqual(-9, proc.returncode)
+
+    @context.sub_context
+    def when_baresip_crashes(context: DSLContext) -> None:
+        @context.example
+        async def it_restarts_it(self: ContextData) -> None:
+            supervisor = self.make("crash")
+            await supervisor.start()
+            first = supervisor.pid
+            try:
+                for _ in range(500):
+                    if supervisor.restarts:
+                        break
+                    await asyncio.sleep(0.01)
+                self.assertGreaterEqual(supervisor.restarts, 1)
+                self.assertNotEqual(first, supervisor.pid)
+            finally:
+                await supervisor.stop()
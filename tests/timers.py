@@ -0,0 +1,98 @@
+import asyncio
+import random
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.timers as timers
+
+
+@tdsl.context
+def timer_scheduler(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.timers = timers.TimerScheduler()
+        self.fired: list[str] = []
+
+    @context.after
+    async def after(self: ContextData) -> None:
+        self.timers.close()
+
+    @context.example
+    async def it_fires_timers_in_deadline_order(self: ContextData) -> None:
+        self.timers.call_later(0.02, self.fired.append, "b")
+        self.timers.call_later(0.01, self.fired.append, "a")
+        self.timers.call_later(0.03, self.fired.append, "c")
+        await asyncio.sleep(0.05)
+        self.assertEqual(["a", "b", "c"], self.fired)
+        self.assertEqual(0, len(self.timers))
+
+    @context.example
+    async def it_does_not_fire_cancelled_timers(self: ContextData) -> None:
+        first = self.timers.call_later(0.01, self.fired.append, "a")
+        self.timers.call_later(0.02, self.fired.append, "b")
+        first.cancel()
+        self.assertTrue(first.cancelled)
+        self.assertEqual(1, len(self.timers))
+        await asyncio.sleep(0.04)
+        self.assertEqual(["b"], self.fired)
+
+    @context.example
+    async def it_keeps_firing_after_a_callback_fails(self: ContextData) -> None:
+        self.timers.call_later(0.01, lambda: 1 / 0)
+        self.timers.call_later(0.01, self.fired.append, "a")
+        await asyncio.sleep(0.03)
+        self.assertEqual(["a"], self.fired)
+
+
+@tdsl.context
+def timer_wheel(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        # Four levels of four slots: 256 ticks, so these tests cascade and park.
+        self.timers = timers.TimerWheel(resolution=0.001, slots=4, levels=4)
+        self.fired: list[int] = []
+
+    @context.after
+    async def after(self: ContextData) -> None:
+        self.timers.close()
+
+    @context.example
+    async def it_fires_every_timer_not_cancelled(self: ContextData) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        late: list[float] = []
+
+        def fire(i: int, when: float) -> None:
+            self.fired.append(i)
+            late.append(loop.time() - when)
+
+        pending = [
+            self.timers.call_at(start + d, fire, i, start + d)
+            for i, d in enumerate(random.uniform(0, 0.3) for _ in range(500))
+        ]
+        for timer in pending[::3]:
+            timer.cancel()
+        self.assertEqual(333, len(self.timers))
+        await asyncio.sleep(0.4)
+        self.assertEqual(
+            sorted(set(range(500)) - set(range(0, 500, 3))), sorted(self.fired)
+        )
+        self.assertGreaterEqual(min(late), 0.0)
+        self.assertEqual(0, len(self.timers))
+
+    @context.example
+    async def it_fires_timers_set_by_callbacks(self: ContextData) -> None:
+        self.timers.call_later(
+            0.002, lambda: self.timers.call_later(0, self.fired.append, 2)
+        )
+        await asyncio.sleep(0.02)
+        self.assertEqual([2], self.fired)
+
+    @context.example
+    async def it_only_takes_slot_counts_that_are_powers_of_two(
+        self: ContextData,
+    ) -> None:
+        with self.assertRaises(ValueError):
+            timers.TimerWheel(slots=48)
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import tempfile
+
+import testslide.dsl as tdsl
+from testslide import _ContextData as ContextData
+from testslide.dsl import _DSLContext as DSLContext
+
+import pybaresip.tts as tts
+
+from .baresip_invoke import FakeInterface
+from .pool import QuietClient
+
+
+class Synthesizer:
+    def __init__(self) -> None:
+        self.rendered: list[str] = []
+
+    def __call__(self, text: str, voice: str, fmt: str) -> bytes:
+        self.rendered.append(text)
+        return f"{voice}:{text}".encode() * 10
+
+
+@tdsl.context
+def text_to_speech(context: DSLContext) -> None:
+    @context.before
+    async def before(self: ContextData) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.synthesizer = Synthesizer()
+        self.tts = tts.TextToSpeech(self.synthesizer, self.tmp.name, max_bytes=1000)
+
+    @context.after
+    async def after(self: ContextData) -> None:
+        self.tmp.cleanup()
+
+    @context.example
+    async def it_synthesizes_each_prompt_once(self: ContextData) -> None:
+        first = await self.tts.render("Hello")
+        self.assertEqual(first, await self.tts.render("Hello"))
+        with open(first, "rb") as f:
+            self.assertEqual(b"default:Hello" * 10, f.read())
+        await self.tts.render("Hello", voice="other")
+        self.assertEqual(["Hello", "Hello"], self.synthesizer.rendered)
+        self.assertEqual(1, self.tts.stats.hits)
+
+    @context.example
+    async def it_shares_a_synthesis_between_concurrent_requests(
+        self: ContextData,
+    ) -> None:
+        paths = await asyncio.gather(*(self.tts.render("Hello") for _ in range(5)))
+        self.assertEqual(1, len(set(paths)))
+        self.assertEqual(["Hello"], self.synthesizer.rendered)
+
+    @context.example
+    async def it_evicts_the_least_recently_used_prompts(self: ContextData) -> None:
+        self.assertEqual(3, await self.tts.prerender(["one", "two", "three"]))
+        two = await self.tts.render("two")
+        used = await self.tts.render("one")
+        # 90 bytes each, which pushes out "three" and then "two".
+        for i in range(9):
+            await self.tts.render(str(i))
+        self.assertLessEqual(self.tts.cache.size, 1000)
+        self.assertEqual(2, self.tts.stats.evicted)
+        self.assertFalse(os.path.exists(two))
+        self.assertTrue(os.path.exists(used))
+
+    @context.example
+    async def it_reuses_the_cache_after_a_restart(self: ContextData) -> None:
+        await self.tts.render("Hello")
+        again = tts.TextToSpeech(self.synthesizer, self.tmp.name)
+        await again.render("Hello")
+        self.assertEqual(["Hello"], self.synthesizer.rendered)
+
+    @context.example
+    async def it_plays_text_through_the_client(self: ContextData) -> None:
+        client = QuietClient(tts=self.tts)
+        client._interface = FakeInterface()
+        await client.play(text="Hello")
+        path = await self.tts.render("Hello")
+        self.assertEqual([f"play {path}"], client._interface.calls)